@@ -0,0 +1,121 @@
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+INDICATORS = ("sma", "ema", "rsi", "volatility", "drawdown", "returns")
+
+
+def parse_indicators(value: Optional[str]) -> List[str]:
+    """Sorted, de-duplicated indicator names; all of them when value is empty"""
+    if not value:
+        return list(INDICATORS)
+    names = sorted({name.strip().lower() for name in value.split(",") if name.strip()})
+    unknown = [name for name in names if name not in INDICATORS]
+    if unknown:
+        raise ValueError(
+            f"Unknown indicators: {', '.join(unknown)}; expected any of {', '.join(INDICATORS)}")
+    return names
+
+
+def sma(prices: np.ndarray, window: int) -> np.ndarray:
+    """Simple moving average; NaN until window points are available"""
+    out = np.full(len(prices), np.nan)
+    if len(prices) >= window:
+        sums = np.cumsum(np.insert(prices, 0, 0.0))
+        out[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return out
+
+
+def ema(prices: np.ndarray, window: int) -> np.ndarray:
+    """Exponential moving average with alpha = 2 / (window + 1), seeded with the first price"""
+    out = np.empty(len(prices))
+    if not len(prices):
+        return out
+    alpha = 2.0 / (window + 1)
+    # Each value depends on the previous one, so this stays a single pass
+    value = prices[0]
+    for i, price in enumerate(prices):
+        value += alpha * (price - value)
+        out[i] = value
+    return out
+
+
+def rsi(prices: np.ndarray, window: int) -> np.ndarray:
+    """Relative strength index over simple averages of gains and losses (Cutler's RSI)"""
+    out = np.full(len(prices), np.nan)
+    if len(prices) <= window:
+        return out
+    changes = np.diff(prices)
+    gains = sma(np.clip(changes, 0, None), window)[window - 1:]
+    losses = sma(np.clip(-changes, 0, None), window)[window - 1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[window:] = np.where(losses == 0, 100.0, 100.0 - 100.0 / (1.0 + gains / losses))
+    return out
+
+
+def log_returns(prices: np.ndarray) -> np.ndarray:
+    return np.diff(np.log(prices))
+
+
+def volatility(prices: np.ndarray, window: int) -> np.ndarray:
+    """Rolling standard deviation of log returns over window returns"""
+    out = np.full(len(prices), np.nan)
+    returns = log_returns(prices)
+    if len(returns) >= window:
+        out[window:] = sliding_window_view(returns, window).std(axis=1, ddof=1)
+    return out
+
+
+def drawdown(prices: np.ndarray) -> np.ndarray:
+    """Fractional distance below the running peak"""
+    # fmax skips NaN prices, so one missing point does not blank the rest
+    return prices / np.fmax.accumulate(prices) - 1.0
+
+
+def returns(prices: np.ndarray) -> np.ndarray:
+    """Simple return of each point over the previous one"""
+    out = np.full(len(prices), np.nan)
+    out[1:] = prices[1:] / prices[:-1] - 1.0
+    return out
+
+
+def _finite(value: float) -> Optional[float]:
+    # NaN and infinity are not valid JSON
+    return float(value) if np.isfinite(value) else None
+
+
+def _values(array: np.ndarray) -> List[Optional[float]]:
+    return [_finite(value) for value in array]
+
+
+def compute_indicators(timestamps: List[int], prices: Iterable[float], indicators: List[str],
+                       window: int) -> Dict[str, Any]:
+    """Indicator series aligned with timestamps, plus summary statistics.
+
+    A zero or missing price makes the points that depend on it inf or NaN;
+    those are reported as None.
+    """
+    series = np.asarray(list(prices), dtype=np.float64)
+    result: Dict[str, Any] = {"t": list(timestamps), "window": window, "indicators": {}, "summary": {}}
+    if not len(series):
+        return result
+    computed = result["indicators"]
+    summary = result["summary"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if "sma" in indicators:
+            computed["sma"] = _values(sma(series, window))
+        if "ema" in indicators:
+            computed["ema"] = _values(ema(series, window))
+        if "rsi" in indicators:
+            computed["rsi"] = _values(rsi(series, window))
+        if "volatility" in indicators:
+            computed["volatility"] = _values(volatility(series, window))
+            summary["volatility"] = _finite(np.std(log_returns(series), ddof=1)) if len(series) > 2 else None
+        if "drawdown" in indicators:
+            drawdowns = drawdown(series)
+            computed["drawdown"] = _values(drawdowns)
+            summary["max_drawdown"] = _finite(np.nanmin(drawdowns)) if not np.isnan(drawdowns).all() else None
+        if "returns" in indicators:
+            computed["returns"] = _values(returns(series))
+            summary["total_return"] = _finite(series[-1] / series[0] - 1.0)
+    return result
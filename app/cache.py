@@ -1,29 +1,573 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
 import redis.asyncio as redis
+from .codec import Codec, cache_codec
 from .config import settings
+from .events import publish_args, publish_event
+from .rate_limiter import SharedPriority, current_priority, shared_priority
 
-# Create Redis client
+logger = logging.getLogger(__name__)
+
+# Create Redis client. Responses stay as bytes because cached payloads are
+# binary (see app/codec.py).
 try:
     redis_client = redis.from_url(
         settings.redis_url,
         encoding="utf-8",
-        decode_responses=True
+        decode_responses=False
     )
 except Exception as e:
     print(f"Warning: Redis connection failed: {e}")
     redis_client = None
 
 
+class LocalCache:
+    """Bounded in-process cache with per-entry TTL and LRU eviction.
+
+    Entries are evicted least-recently-used first once either the entry
+    count or the total payload size (in bytes) exceeds its limit.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (expires_at, size, value)
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Any:
+        """Return the cached value, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: float, size: int) -> None:
+        """Store a value for ttl seconds, accounting size bytes against the limit"""
+        self._remove(key)
+        if value is None or ttl <= 0 or size > self.max_bytes:
+            return
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+
+# Process-wide L1 shared by every service
+local_cache = LocalCache(
+    max_entries=settings.cache_local_max_entries,
+    max_bytes=settings.cache_local_max_bytes
+)
+
+# Upstream fetches currently running in this process, keyed by cache key
+_inflight: Dict[str, "asyncio.Task"] = {}
+# Upstream priority of each in-flight fetch (see app/rate_limiter.py)
+_flight_priorities: Dict[str, SharedPriority] = {}
+
+# Redis hash holding the current generation of every cache namespace
+GENERATIONS_KEY = "cache:generations"
+
+# Sorted sets (member = relative key, score = last read) of tracked keys,
+# one per namespace; kept outside generations so invalidation keeps them
+HOT_KEYS_PREFIX = "cache:hot:"
+
+# namespace -> (expires_at, generation), so generations are not read per request
+_generations: Dict[str, Tuple[float, int]] = {}
+
+# Deletes a lease only if it is still held by the caller's token
+RELEASE_LEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class CacheEntry(NamedTuple):
+    """A cached value with the metadata needed for stale-while-revalidate"""
+    value: Any
+    fetched_at: float  # unix time the value was fetched upstream
+    soft_ttl: float  # seconds the value is considered fresh
+
+    @property
+    def is_stale(self) -> bool:
+        return time.time() - self.fetched_at >= self.soft_ttl
+
+
+ENVELOPE_KEYS = {"value", "fetched_at", "soft_ttl"}
+
+
+class TieredCache:
+    """Read-through cache with the in-process L1 in front of Redis.
+
+    Values are stored in an envelope recording when they were fetched. They
+    are fresh for their soft TTL and kept in Redis until a longer hard TTL,
+    so a stale copy can be served while a refresh runs in the background.
+
+    When a namespace is given, keys passed to every method are relative to
+    it and stored as "<namespace>:v<generation>:<key>". invalidate() bumps
+    the generation, which orphans every key in the namespace at once; the
+    orphans age out through their TTLs (see sweep_stale_generations).
+
+    With publish, every write is also published as an event on the
+    namespace's topic (see app/events.py).
+
+    Values returned from the L1 are shared between callers and must be
+    treated as read-only.
+    """
+
+    def __init__(self, redis_client: redis.Redis, namespace: Optional[str] = None,
+                 local: Optional[LocalCache] = None, codec: Optional[Codec] = None,
+                 publish: bool = False):
+        self.redis_client = redis_client
+        self.namespace = namespace
+        self.publish = publish and namespace is not None
+        self.local = local or local_cache
+        self.codec = codec or cache_codec
+        self.local_ttl = settings.cache_local_ttl
+        self.lease_ttl = settings.cache_lease_ttl
+        self.lease_wait = settings.cache_lease_wait
+
+    async def full_key(self, key: str) -> str:
+        """Resolve a namespace-relative key to its Redis key"""
+        if self.namespace is None:
+            return key
+        generation = await self.generation()
+        return f"{self.namespace}:v{generation}:{key}"
+
+    async def generation(self) -> int:
+        """Current generation of the namespace, cached briefly in-process"""
+        cached = _generations.get(self.namespace)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        try:
+            raw = await self.redis_client.hget(GENERATIONS_KEY, self.namespace)
+            generation = int(raw) if raw else 0
+        except Exception as e:
+            logger.warning(f"Could not read cache generation for {self.namespace}: {e}")
+            generation = cached[1] if cached is not None else 0
+        _generations[self.namespace] = (
+            time.monotonic() + settings.cache_generation_ttl, generation)
+        return generation
+
+    async def invalidate(self) -> int:
+        """Invalidate every key in the namespace with a single HINCRBY"""
+        if self.namespace is None:
+            raise ValueError("Only namespaced caches can be invalidated")
+        generation = int(await self.redis_client.hincrby(GENERATIONS_KEY, self.namespace, 1))
+        _generations[self.namespace] = (
+            time.monotonic() + settings.cache_generation_ttl, generation)
+        return generation
+
+    async def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Get an entry (fresh or stale) from L1, falling back to Redis"""
+        return await self._get_entry(await self.full_key(key))
+
+    async def get(self, key: str, allow_stale: bool = False) -> Any:
+        """Get a cached value; stale values are only returned if allow_stale"""
+        entry = await self.get_entry(key)
+        if entry is None or (entry.is_stale and not allow_stale):
+            return None
+        return entry.value
+
+    async def set(self, key: str, value: Any, ttl: int, stale_ttl: Optional[int] = None) -> None:
+        """Write a value to both tiers.
+
+        The value is fresh for ttl seconds and kept for stale_ttl seconds
+        (defaults to ttl, i.e. no stale window).
+        """
+        full_key = await self.full_key(key)
+        hard_ttl = max(ttl, stale_ttl or ttl)
+        entry = CacheEntry(value, time.time(), ttl)
+        raw, size = self.codec.encode_sized(entry._asdict())
+        # Populate L1 first so a Redis outage still serves this worker
+        self.local.set(full_key, entry, min(hard_ttl, self.local_ttl), size)
+        await self.redis_client.setex(full_key, hard_ttl, raw)
+        if self.publish:
+            try:
+                await publish_event(self.redis_client, self.namespace, key, value)
+            except Exception as e:
+                logger.warning(f"Failed to publish change to {full_key}: {e}")
+
+    async def get_many(self, keys: List[str], track: bool = False) -> Dict[str, CacheEntry]:
+        """Get entries (fresh or stale) for many keys with one MGET.
+
+        Keys found in the L1 are not requested from Redis; missing keys are
+        left out of the result. track works as in fetch.
+        """
+        full_keys = {key: await self.full_key(key) for key in keys}
+        entries: Dict[str, CacheEntry] = {}
+        remote: List[str] = []
+        for key, full_key in full_keys.items():
+            entry = self.local.get(full_key)
+            if entry is not None:
+                entries[key] = entry
+            else:
+                remote.append(key)
+        if not remote:
+            return entries
+
+        if track:
+            await self._record_hot(*remote)
+        raws = await self.redis_client.mget([full_keys[key] for key in remote])
+        for key, raw in zip(remote, raws):
+            if not raw:
+                continue
+            entry, size = _decode_sized_entry(raw, self.codec)
+            self.local.set(full_keys[key], entry, self.local_ttl, size)
+            entries[key] = entry
+        return entries
+
+    async def set_many(self, values: Dict[str, Any], ttl: int, stale_ttl: Optional[int] = None) -> None:
+        """Write many values to both tiers in one pipeline round trip"""
+        if not values:
+            return
+        hard_ttl = max(ttl, stale_ttl or ttl)
+        now = time.time()
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                full_key = await self.full_key(key)
+                entry = CacheEntry(value, now, ttl)
+                raw, size = self.codec.encode_sized(entry._asdict())
+                self.local.set(full_key, entry, min(hard_ttl, self.local_ttl), size)
+                pipe.setex(full_key, hard_ttl, raw)
+                if self.publish:
+                    pipe.eval(*publish_args(self.namespace, key, value))
+            await pipe.execute()
+
+    async def delete(self, *keys: str) -> None:
+        """Delete keys from both tiers"""
+        full_keys = [await self.full_key(key) for key in keys]
+        for full_key in full_keys:
+            self.local.delete(full_key)
+        if full_keys:
+            await self.redis_client.delete(*full_keys)
+
+    async def fetch(self, key: str, refresh: Callable[[], Awaitable[Any]], track: bool = False) -> Any:
+        """Serve key with stale-while-revalidate, fetching on a miss.
+
+        Fresh values are returned as-is. Stale values are returned immediately
+        and a background refresh is scheduled. On a miss the caller waits on
+        a single-flight refresh. refresh is expected to write to the cache.
+        With track, reads that miss the L1 record key in the namespace's hot
+        set (see hot_keys).
+        """
+        full_key = await self.full_key(key)
+        try:
+            entry = self.local.get(full_key)
+            if entry is None:
+                if track:
+                    await self._record_hot(key)
+                entry = await self._get_remote_entry(full_key)
+        except Exception as e:
+            logger.error(f"Error reading {full_key} from cache: {e}")
+            entry = None
+        if entry is not None:
+            if entry.is_stale:
+                self._refresh_in_background(full_key, refresh)
+            return entry.value
+        return await self._single_flight(full_key, refresh)
+
+    async def refresh_in_background(self, key: str, refresh: Callable[[], Awaitable[Any]]) -> None:
+        """Schedule a single-flight refresh of key without waiting for it"""
+        self._refresh_in_background(await self.full_key(key), refresh)
+
+    async def single_flight(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fetch at most once at a time per key.
+
+        Concurrent callers in this process share one in-flight task. Across
+        workers a Redis lease elects a single fetcher; the others serve the
+        previous value if there is one, or wait briefly for the fetcher to
+        populate the cache before falling back to fetching themselves.
+        fetch is expected to write its result to the cache. The shared task
+        runs at the highest upstream priority of its callers, so a user who
+        joins a scheduler's fetch is not held to background rate limits.
+        """
+        return await self._single_flight(await self.full_key(key), fetch)
+
+    async def hot_keys(self, limit: int, window: Optional[float] = None) -> List[str]:
+        """Most recently requested tracked keys, newest first.
+
+        Only keys read within window seconds (default cache_hot_window) are
+        returned; older ones are pruned from the set.
+        """
+        if self.namespace is None:
+            return []
+        name = f"{HOT_KEYS_PREFIX}{self.namespace}"
+        cutoff = time.time() - (window or settings.cache_hot_window)
+        await self.redis_client.zremrangebyscore(name, "-inf", cutoff)
+        keys = await self.redis_client.zrevrangebyscore(name, "+inf", cutoff, start=0, num=limit)
+        return [key.decode("utf-8") if isinstance(key, bytes) else key for key in keys]
+
+    async def _record_hot(self, *keys: str) -> None:
+        if self.namespace is None:
+            return
+        now = time.time()
+        try:
+            await self.redis_client.zadd(
+                f"{HOT_KEYS_PREFIX}{self.namespace}", {key: now for key in keys})
+        except Exception as e:
+            logger.warning(f"Could not record hot keys for {self.namespace}: {e}")
+
+    async def refresh_many(self, refreshers: Dict[str, Callable[[], Awaitable[Any]]]) -> int:
+        """Run single-flight refreshes for many keys concurrently.
+
+        Returns how many keys were refreshed. Refreshes write over the cached
+        values, so readers never see a gap. Raises the first failure if no
+        key could be refreshed.
+        """
+        results = await asyncio.gather(
+            *(self.single_flight(key, refresh) for key, refresh in refreshers.items()),
+            return_exceptions=True)
+        refreshed = 0
+        for key, result in zip(refreshers, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Refresh failed for {key}: {result}")
+            elif result:
+                refreshed += 1
+        if not refreshed and refreshers:
+            errors = [result for result in results if isinstance(result, Exception)]
+            raise errors[0] if errors else Exception("API unavailable")
+        return refreshed
+
+    async def _get_entry(self, full_key: str) -> Optional[CacheEntry]:
+        entry = self.local.get(full_key)
+        if entry is not None:
+            return entry
+        return await self._get_remote_entry(full_key)
+
+    async def _get_remote_entry(self, full_key: str) -> Optional[CacheEntry]:
+        raw = await self.redis_client.get(full_key)
+        if not raw:
+            return None
+        entry, size = _decode_sized_entry(raw, self.codec)
+        self.local.set(full_key, entry, self.local_ttl, size)
+        return entry
+
+    def _refresh_in_background(self, full_key: str, refresh: Callable[[], Awaitable[Any]]) -> None:
+        if full_key not in _inflight:
+            task = self._start_flight(full_key, refresh)
+            task.add_done_callback(lambda t: _log_background_failure(full_key, t))
+
+    async def _single_flight(self, full_key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        task = _inflight.get(full_key)
+        if task is not None:
+            # Joining a background fetch raises it to this caller's priority
+            priority = _flight_priorities.get(full_key)
+            if priority is not None:
+                priority.join(current_priority())
+        else:
+            task = self._start_flight(full_key, fetch)
+        # Shield so a cancelled caller does not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    def _start_flight(self, full_key: str, fetch: Callable[[], Awaitable[Any]]) -> "asyncio.Task":
+        priority = SharedPriority(current_priority())
+        task = asyncio.ensure_future(self._run_flight(priority, full_key, fetch))
+        _inflight[full_key] = task
+        _flight_priorities[full_key] = priority
+        task.add_done_callback(lambda t: _forget_inflight(full_key, t))
+        return task
+
+    async def _run_flight(self, priority: SharedPriority, full_key: str,
+                          fetch: Callable[[], Awaitable[Any]]) -> Any:
+        shared_priority.set(priority)
+        return await self._fetch_with_lease(full_key, fetch)
+
+    async def _fetch_with_lease(self, full_key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        lease_key = f"lease:{full_key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.redis_client.set(
+                lease_key, token, nx=True, px=int(self.lease_ttl * 1000))
+        except Exception as e:
+            logger.warning(f"Cache lease unavailable for {full_key}: {e}")
+            acquired = True
+
+        if not acquired:
+            value = await self._wait_for_value(full_key)
+            if value is not None:
+                return value
+            logger.warning(f"Timed out waiting on lease for {full_key}, fetching")
+            return await fetch()
+
+        try:
+            return await fetch()
+        finally:
+            try:
+                await self.redis_client.eval(RELEASE_LEASE_SCRIPT, 1, lease_key, token)
+            except Exception as e:
+                logger.warning(f"Failed to release cache lease for {full_key}: {e}")
+
+    async def _wait_for_value(self, full_key: str) -> Any:
+        """Serve the previous value, or poll while another worker holds the lease"""
+        try:
+            entry = await self._get_entry(full_key)
+        except Exception:
+            return None
+        if entry is not None:
+            return entry.value
+        deadline = time.monotonic() + self.lease_wait
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            try:
+                entry = await self._get_entry(full_key)
+            except Exception:
+                return None
+            if entry is not None and not entry.is_stale:
+                return entry.value
+        return None
+
+
+async def sweep_stale_generations(redis_client: redis.Redis, batch_size: int = 500) -> int:
+    """Delete keys left behind by invalidated namespace generations.
+
+    Uses SCAN so Redis is never blocked; returns the number of keys removed.
+    Orphaned keys also expire on their own, so this only reclaims memory early.
+    """
+    generations = await redis_client.hgetall(GENERATIONS_KEY)
+    removed = 0
+    for namespace, current in generations.items():
+        if isinstance(namespace, bytes):
+            namespace = namespace.decode("utf-8")
+        current = int(current)
+        prefix = f"{namespace}:v"
+        stale_keys = []
+        async for key in redis_client.scan_iter(match=f"{prefix}*", count=batch_size):
+            name = key.decode("utf-8") if isinstance(key, bytes) else key
+            generation = name[len(prefix):].split(":", 1)[0]
+            if generation.isdigit() and int(generation) < current:
+                stale_keys.append(key)
+            if len(stale_keys) >= batch_size:
+                removed += await redis_client.unlink(*stale_keys)
+                stale_keys = []
+        if stale_keys:
+            removed += await redis_client.unlink(*stale_keys)
+    if removed:
+        logger.info(f"Swept {removed} keys from invalidated cache generations")
+    return removed
+
+
+def decode_entry(raw: Union[bytes, str], codec: Optional[Codec] = None) -> CacheEntry:
+    """Decode a Redis payload written by TieredCache.set"""
+    return _decode_sized_entry(raw, codec)[0]
+
+
+def _decode_sized_entry(raw: Union[bytes, str], codec: Optional[Codec] = None) -> Tuple[CacheEntry, int]:
+    # The uncompressed size bounds the L1, which holds decoded values
+    data, size = (codec or cache_codec).decode_sized(raw)
+    if isinstance(data, dict) and data.keys() == ENVELOPE_KEYS:
+        return CacheEntry(**data), size
+    # Bare values written before envelopes were introduced
+    return CacheEntry(data, time.time(), settings.cache_local_ttl), size
+
+
+def _forget_inflight(key: str, task: "asyncio.Task") -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+        _flight_priorities.pop(key, None)
+    # Mark the exception as retrieved in case every caller was cancelled
+    if not task.cancelled():
+        task.exception()
+
+
+def _log_background_failure(key: str, task: "asyncio.Task") -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Background refresh failed for {key}: {task.exception()}")
+
+
 async def get_redis():
     """Dependency to get Redis client"""
     if redis_client is None:
         # Return a mock Redis client that does nothing
+        class MockPipeline:
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: self
+
+            async def execute(self):
+                return []
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
         class MockRedis:
             async def get(self, key):
                 return None
 
+            async def mget(self, keys):
+                return [None] * len(keys)
+
+            def pipeline(self, transaction=True):
+                return MockPipeline()
+
             async def setex(self, key, ttl, value):
                 pass
 
+            async def set(self, key, value, **kwargs):
+                return True
+
+            async def eval(self, script, numkeys, *args):
+                return 0
+
+            async def hget(self, name, key):
+                return None
+
+            async def hincrby(self, name, key, amount=1):
+                return 0
+
+            async def zadd(self, name, mapping):
+                return 0
+
+            async def zremrangebyscore(self, name, min, max):
+                return 0
+
+            async def zrevrangebyscore(self, name, max, min, start=None, num=None):
+                return []
+
+            async def delete(self, *keys):
+                pass
+
             async def close(self):
                 pass
         return MockRedis()
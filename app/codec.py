@@ -0,0 +1,139 @@
+import json
+import logging
+import zlib
+from typing import Any, Tuple, Union
+from .config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional format
+    msgpack = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - optional compression
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+# Every payload starts with MAGIC, a version byte, a format byte and a
+# compression byte, so readers can decode whatever a writer was configured
+# with. Payloads without the header are treated as plain JSON text.
+MAGIC = b"DP"
+VERSION = 1
+HEADER_SIZE = len(MAGIC) + 3
+
+FORMAT_JSON = b"j"
+FORMAT_MSGPACK = b"m"
+
+COMPRESSION_NONE = b"0"
+COMPRESSION_ZLIB = b"z"
+COMPRESSION_LZ4 = b"l"
+
+
+class CodecError(Exception):
+    """Raised when a payload cannot be encoded or decoded"""
+
+
+def _json_dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def _json_loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class Codec:
+    """Serializes cache payloads with a versioned header.
+
+    fmt is "json" (encoded with orjson when installed) or "msgpack".
+    compression is "none", "zlib" or "lz4" and only applies to payloads of
+    at least compress_threshold bytes.
+    """
+
+    def __init__(self, fmt: str = "json", compression: str = "none", compress_threshold: int = 4096):
+        if fmt == "msgpack" and msgpack is None:
+            logger.warning("msgpack not installed, falling back to JSON codec")
+            fmt = "json"
+        if compression == "lz4" and lz4_frame is None:
+            logger.warning("lz4 not installed, falling back to zlib compression")
+            compression = "zlib"
+        if fmt not in ("json", "msgpack"):
+            raise CodecError(f"Unknown codec format: {fmt}")
+        if compression not in ("none", "zlib", "lz4"):
+            raise CodecError(f"Unknown codec compression: {compression}")
+        self.fmt = fmt
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+
+    def encode(self, obj: Any) -> bytes:
+        return self.encode_sized(obj)[0]
+
+    def decode(self, raw: Union[bytes, str]) -> Any:
+        return self.decode_sized(raw)[0]
+
+    def encode_sized(self, obj: Any) -> Tuple[bytes, int]:
+        """Encode obj; also returns the uncompressed body size"""
+        if self.fmt == "msgpack":
+            fmt_byte, body = FORMAT_MSGPACK, msgpack.packb(obj, use_bin_type=True)
+        else:
+            fmt_byte, body = FORMAT_JSON, _json_dumps(obj)
+
+        size = len(body)
+        comp_byte = COMPRESSION_NONE
+        if self.compression != "none" and len(body) >= self.compress_threshold:
+            if self.compression == "lz4":
+                comp_byte, body = COMPRESSION_LZ4, lz4_frame.compress(body)
+            else:
+                comp_byte, body = COMPRESSION_ZLIB, zlib.compress(body, 1)
+
+        return MAGIC + bytes([VERSION]) + fmt_byte + comp_byte + body, size
+
+    def decode_sized(self, raw: Union[bytes, str]) -> Tuple[Any, int]:
+        """Decode raw; also returns the uncompressed body size"""
+        if isinstance(raw, str):
+            # Text clients and payloads written before the codec existed
+            return _json_loads(raw), len(raw)
+        if not raw.startswith(MAGIC):
+            return _json_loads(raw), len(raw)
+
+        version = raw[2]
+        if version != VERSION:
+            raise CodecError(f"Unsupported payload version: {version}")
+        fmt_byte = raw[3:4]
+        comp_byte = raw[4:5]
+        body = raw[HEADER_SIZE:]
+
+        if comp_byte == COMPRESSION_ZLIB:
+            body = zlib.decompress(body)
+        elif comp_byte == COMPRESSION_LZ4:
+            if lz4_frame is None:
+                raise CodecError("lz4 payload but lz4 is not installed")
+            body = lz4_frame.decompress(body)
+        elif comp_byte != COMPRESSION_NONE:
+            raise CodecError(f"Unknown payload compression: {comp_byte!r}")
+
+        if fmt_byte == FORMAT_MSGPACK:
+            if msgpack is None:
+                raise CodecError("msgpack payload but msgpack is not installed")
+            return msgpack.unpackb(body, raw=False), len(body)
+        if fmt_byte == FORMAT_JSON:
+            return _json_loads(body), len(body)
+        raise CodecError(f"Unknown payload format: {fmt_byte!r}")
+
+
+# Codec used for everything written through TieredCache
+cache_codec = Codec(
+    fmt=settings.cache_codec,
+    compression=settings.cache_compression,
+    compress_threshold=settings.cache_compress_threshold
+)
@@ -28,8 +28,81 @@ class Settings(BaseSettings):
     # Redis Configuration
     redis_url: str = "redis://localhost:6379"
 
+    # In-process (L1) cache in front of Redis
+    cache_local_ttl: float = 5.0  # seconds; bounds cross-worker staleness
+    cache_local_max_entries: int = 1024
+    cache_local_max_bytes: int = 32 * 1024 * 1024
+    # Single-flight lease held by the worker refreshing a key
+    cache_lease_ttl: float = 15.0  # seconds; longer than upstream timeouts
+    cache_lease_wait: float = 2.0  # seconds other workers wait for the value
+    # Cached payload serialization (see app/codec.py)
+    cache_codec: str = "json"  # json (orjson when installed) or msgpack
+    cache_compression: str = "zlib"  # none, zlib or lz4
+    cache_compress_threshold: int = 4096  # bytes
+    # Namespace generations (O(1) invalidation)
+    cache_generation_ttl: float = 1.0  # seconds a worker trusts its copy
+    cache_sweep_interval: float = 600.0  # seconds between orphan sweeps
+    # Recently requested keys refreshed by /api/refresh
+    cache_hot_window: float = 3600.0  # seconds a read keeps a key hot
+    refresh_hot_limit: int = 10  # keys refreshed per service
+    refresh_timeout: float = 8.0  # seconds each service may take
+    # Background prefetch (see app/scheduler.py)
+    scheduler_enabled: bool = True
+    prefetch_ttl_fraction: float = 0.8  # refresh each key at this share of its TTL
+    prefetch_quota_share: float = 0.5  # most of a provider's rate limit prefetching may use
+    news_hot_limit: int = 0  # GNews allows 100 calls/day: refresh top headlines only
+    # Symbol -> CoinGecko id index (see app/services/coin_index.py)
+    crypto_index_ttl: float = 86400.0  # seconds between rebuilds from /coins/list
+    crypto_index_check_interval: float = 60.0  # seconds between Redis version checks
+    # Cached historical series (see CryptoService.get_crypto_historical_data)
+    history_max_segments: int = 32  # appended tail segments before they are merged
+
+    # Pooled upstream HTTP clients (see app/http_client.py)
+    http2_enabled: bool = True  # used only when the h2 package is installed
+    http_max_connections: int = 20
+    http_max_keepalive_connections: int = 10
+    http_keepalive_expiry: float = 30.0  # seconds
+
+    # Shared per-provider token buckets (see app/rate_limiter.py)
+    rate_limit_enabled: bool = True
+    rate_limit_max_wait: float = 2.0  # seconds a user request waits for a token
+    rate_limit_background_wait: float = 30.0  # seconds a prefetch job waits
+    rate_limit_interactive_reserve: float = 0.2  # share of each bucket kept for user requests
+
+    # Live change events (see app/events.py and /api/stream)
+    stream_max_len: int = 1000  # events kept for Last-Event-ID replay
+    stream_heartbeat: float = 15.0  # seconds between keep-alive comments
+    stream_client_queue: int = 100  # events buffered per connected client
+    ws_max_symbols: int = 100  # symbols one WebSocket client may follow
+    ws_send_timeout: float = 10.0  # seconds before a non-reading client is dropped
+
+    # Concurrent Finnhub requests per multi-symbol quote
+    stocks_batch_concurrency: int = 5
+
     # Database Configuration
     database_url: Optional[str] = None
+    # Connection pool (see app/database.py)
+    db_pool_enabled: bool = True  # False opens a connection per session (NullPool)
+    db_pool_size: int = 5  # connections kept open per worker
+    db_max_overflow: int = 10  # extra connections allowed under load
+    db_pool_timeout: float = 10.0  # seconds to wait for a free connection
+    db_pool_recycle: float = 1800.0  # seconds before a connection is replaced
+    db_pool_pre_ping: bool = True  # test connections on checkout
+    # asyncpg prepared statement caches; None disables them on the Supabase
+    # transaction pooler (port 6543), which cannot keep per-connection statements
+    db_statement_cache_size: Optional[int] = None
+    # Monthly price_logs partitions (see app/partitions.py)
+    price_logs_partitions_ahead: int = 2  # future months created in advance
+    price_logs_retention_days: int = 90  # months ending before this are dropped
+    # OHLC candles over price_logs (see app/rollups.py)
+    rollups_enabled: bool = True  # serve historical routes from candles when they cover the range
+    rollup_max_candles: int = 500  # finest interval returning at most this many candles
+    # Write-behind price/news logging (see app/ingest.py)
+    ingest_batch_size: int = 500  # rows per multi-row INSERT
+    ingest_flush_interval: float = 1.0  # seconds a row may wait for its batch
+    ingest_max_rows: int = 10000  # rows buffered before producers are held back
+    ingest_put_timeout: float = 0.5  # seconds a producer waits for room before dropping
+    ingest_shutdown_timeout: float = 10.0  # seconds to flush the buffer on shutdown
 
     class Config:
         env_file = ".env"
@@ -1,14 +1,81 @@
+import time
+from typing import Any, Dict
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from sqlalchemy import exc
 from .config import settings
 
+# Supabase's transaction-mode pooler (pgbouncer/Supavisor)
+TRANSACTION_POOLER_PORT = 6543
+
+
+class PoolStats:
+    """Checkout latency and timeouts of the engine's connection pool"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float) -> None:
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waits"""
+
+    def connect(self):
+        started = time.monotonic()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        pool_stats.record(time.monotonic() - started)
+        return connection
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Pool and asyncpg settings for create_async_engine"""
+    cache_size = settings.db_statement_cache_size
+    if cache_size is None:
+        cache_size = 0 if make_url(url).port == TRANSACTION_POOLER_PORT else 100
+    options: Dict[str, Any] = {
+        "connect_args": {
+            "statement_cache_size": cache_size,
+            "prepared_statement_cache_size": cache_size
+        }
+    }
+    if not settings.db_pool_enabled:
+        options["poolclass"] = NullPool
+        return options
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping
+    )
+    return options
+
+
+DATABASE_URL = settings.database_url_async.replace("postgresql://", "postgresql+asyncpg://")
+
 # Create async engine
 engine = create_async_engine(
-    settings.database_url_async.replace("postgresql://", "postgresql+asyncpg://"),
+    DATABASE_URL,
     echo=False,
-    poolclass=NullPool,
-    future=True
+    future=True,
+    **engine_options(DATABASE_URL)
 )
 
 # Create async session factory
@@ -22,6 +89,27 @@ AsyncSessionLocal = sessionmaker(
 Base = declarative_base()
 
 
+def get_pool_stats() -> Dict[str, Any]:
+    """Pool occupancy and checkout latency for /api/metrics/db"""
+    pool = engine.pool
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return {"pooled": False}
+    capacity = pool.size() + settings.db_max_overflow
+    return {
+        "pooled": True,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "saturation": round(pool.checkedout() / capacity, 3) if capacity else 0.0,
+        "checkouts": pool_stats.checkouts,
+        "timeouts": pool_stats.timeouts,
+        "avg_wait_ms": round(pool_stats.total_wait / pool_stats.checkouts * 1000, 3)
+        if pool_stats.checkouts else 0.0,
+        "max_wait_ms": round(pool_stats.max_wait * 1000, 3)
+    }
+
+
 async def get_db():
     """Dependency to get database session"""
     async with AsyncSessionLocal() as session:
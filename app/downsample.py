@@ -0,0 +1,85 @@
+from typing import Any, Dict, List
+import numpy as np
+
+# How bucketing combines each column of an OHLC series
+OHLC_RULES: Dict[str, str] = {
+    "t": "first",
+    "o": "first",
+    "h": "max",
+    "l": "min",
+    "c": "last",
+    "p": "last",
+    "v": "sum",
+    "n": "sum"
+}
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices kept by Largest-Triangle-Three-Buckets, first and last included.
+
+    Bucket averages are computed for all buckets at once from cumulative
+    sums; only the choice within each bucket, which depends on the point
+    picked in the previous one, walks the buckets in order.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # threshold - 2 buckets over the interior points, each at least one wide
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    widths = np.diff(edges)
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    avg_x = (cum_x[edges[1:]] - cum_x[edges[:-1]]) / widths
+    avg_y = (cum_y[edges[1:]] - cum_y[edges[:-1]]) / widths
+    # Third vertex for each bucket: the next bucket's average, then the last point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def bucket_ohlc(columns: Dict[str, List[Any]], threshold: int) -> Dict[str, List[Any]]:
+    """Merge consecutive candles into threshold candles (open first, high max, ...)"""
+    n = len(columns["t"])
+    starts = np.linspace(0, n, threshold + 1).astype(np.int64)[:-1]
+    ends = np.append(starts[1:], n) - 1
+    merged = {}
+    for name, values in columns.items():
+        array = np.asarray(values)
+        rule = OHLC_RULES.get(name, "first")
+        if rule == "max":
+            array = np.maximum.reduceat(array, starts)
+        elif rule == "min":
+            array = np.minimum.reduceat(array, starts)
+        elif rule == "sum":
+            array = np.add.reduceat(array, starts)
+        elif rule == "last":
+            array = array[ends]
+        else:
+            array = array[starts]
+        merged[name] = array.tolist()
+    return merged
+
+
+def downsample(columns: Dict[str, List[Any]], max_points: int) -> Dict[str, List[Any]]:
+    """Reduce a columnar series to at most max_points points.
+
+    Candle series ("o" present) are bucketed so highs and lows survive;
+    line series keep the points LTTB picks to preserve the chart's shape.
+    """
+    if len(columns.get("t", [])) <= max_points:
+        return columns
+    if "o" in columns:
+        return bucket_ohlc(columns, max_points)
+    keep = lttb_indices(np.asarray(columns["t"], dtype=np.float64),
+                        np.asarray(columns["p"], dtype=np.float64), max_points)
+    return {name: np.asarray(values)[keep].tolist() for name, values in columns.items()}
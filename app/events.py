@@ -0,0 +1,132 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, NamedTuple, Optional, Set, Tuple
+import redis.asyncio as redis
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Every change is appended to a capped stream (for Last-Event-ID replay)
+# and announced on a pub/sub channel (for live fan-out) in one round trip
+STREAM_KEY = "events:stream"
+CHANNEL = "events"
+
+PUBLISH_SCRIPT = """
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[1], '*', 'topic', ARGV[2], 'data', ARGV[3])
+redis.call('PUBLISH', KEYS[2], id .. ' ' .. ARGV[2] .. ' ' .. ARGV[3])
+return id
+"""
+
+
+class Event(NamedTuple):
+    id: str  # Redis stream id, "<ms>-<seq>"
+    topic: str  # cache namespace that changed
+    data: str  # JSON text, encoded once by the publisher
+
+
+def encode_event_data(key: str, value: Any) -> str:
+    return json.dumps({"key": key, "value": value}, separators=(",", ":"), default=str)
+
+
+def publish_args(topic: str, key: str, value: Any) -> Tuple:
+    """Arguments for eval() that publish one change"""
+    return (PUBLISH_SCRIPT, 2, STREAM_KEY, CHANNEL,
+            settings.stream_max_len, topic, encode_event_data(key, value))
+
+
+async def publish_event(redis_client: redis.Redis, topic: str, key: str, value: Any) -> None:
+    """Append a change to the event stream and notify live subscribers"""
+    await redis_client.eval(*publish_args(topic, key, value))
+
+
+def stream_id(event_id: str) -> Tuple[int, int]:
+    """Sortable form of a stream id"""
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+async def replay_events(redis_client: redis.Redis, after_id: str,
+                        limit: Optional[int] = None) -> List[Event]:
+    """Events published after after_id that are still in the capped stream"""
+    entries = await redis_client.xrange(
+        STREAM_KEY, min=f"({after_id}", max="+", count=limit or settings.stream_max_len)
+    events = []
+    for entry_id, fields in entries:
+        fields = {_text(name): _text(value) for name, value in fields.items()}
+        events.append(Event(_text(entry_id), fields["topic"], fields["data"]))
+    return events
+
+
+class EventBroker:
+    """Fans events from one Redis subscription out to local subscribers.
+
+    Each worker holds a single pub/sub connection however many clients are
+    connected. Subscriber queues are bounded; a subscriber that falls
+    behind receives None and should disconnect, after which the client can
+    resume from its last event id.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, redis_client: redis.Redis) -> None:
+        self._task = asyncio.create_task(self._listen(redis_client))
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.stream_client_queue)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+
+    def dispatch(self, event: Event) -> None:
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow to keep up: drop its backlog and tell it to leave
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self._subscribers), "listening": self._task is not None}
+
+    async def _listen(self, redis_client: redis.Redis) -> None:
+        while True:
+            try:
+                pubsub = redis_client.pubsub()
+                await pubsub.subscribe(CHANNEL)
+                try:
+                    async for message in pubsub.listen():
+                        if message.get("type") != "message":
+                            continue
+                        event_id, topic, data = _text(message["data"]).split(" ", 2)
+                        self.dispatch(Event(event_id, topic, data))
+                finally:
+                    await pubsub.aclose()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Event subscription failed, retrying: {e}")
+                await asyncio.sleep(1.0)
+
+
+def _text(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+# Process-wide broker started from the application lifespan
+event_broker = EventBroker()
@@ -0,0 +1,114 @@
+import importlib.util
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+import httpx
+import redis.asyncio as redis
+from .config import settings
+from .rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Request timeouts (seconds) per upstream provider
+PROVIDER_TIMEOUTS: Dict[str, float] = {
+    "coingecko": 10.0,
+    "finnhub": 5.0,
+    "openweather": 5.0,
+    "gnews": 10.0,
+    "exchangerate": 10.0,
+}
+
+
+class ConnectionStats:
+    """Counts requests and newly opened connections for one provider"""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+
+    async def on_request(self, request: httpx.Request) -> None:
+        self.requests += 1
+        # httpcore reports connection lifecycle events through this hook
+        request.extensions["trace"] = self.trace
+
+    async def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        reused = max(self.requests - self.connections_opened, 0)
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": reused,
+            "reuse_ratio": round(reused / self.requests, 3) if self.requests else None,
+        }
+
+
+class UpstreamClients:
+    """Pooled, keep-alive httpx clients, one per upstream provider.
+
+    Clients are created by start() in the application lifespan and closed
+    by close() on shutdown. Outside the lifespan (scripts, tests) client()
+    falls back to a one-off client so services work unchanged.
+
+    When started with a Redis client, client() first takes a token from the
+    provider's shared rate limit bucket (see app/rate_limiter.py).
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self.rate_limiter: Optional[RateLimiter] = None
+        self._stats: Dict[str, ConnectionStats] = {
+            provider: ConnectionStats() for provider in PROVIDER_TIMEOUTS
+        }
+
+    async def start(self, redis_client: Optional[redis.Redis] = None) -> None:
+        if redis_client is not None and settings.rate_limit_enabled:
+            self.rate_limiter = RateLimiter(redis_client)
+        http2 = settings.http2_enabled and importlib.util.find_spec("h2") is not None
+        if settings.http2_enabled and not http2:
+            logger.warning("HTTP/2 requested but h2 is not installed, using HTTP/1.1")
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry
+        )
+        for provider, timeout in PROVIDER_TIMEOUTS.items():
+            self._clients[provider] = httpx.AsyncClient(
+                timeout=timeout,
+                limits=limits,
+                http2=http2,
+                event_hooks={"request": [self._stats[provider].on_request]}
+            )
+        logger.info(f"Started pooled HTTP clients (http2={http2})")
+
+    async def close(self) -> None:
+        clients, self._clients = self._clients, {}
+        self.rate_limiter = None
+        for client in clients.values():
+            await client.aclose()
+
+    @asynccontextmanager
+    async def client(self, provider: str) -> AsyncIterator[httpx.AsyncClient]:
+        """Yield the pooled client for provider, once its rate limit allows"""
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(provider)
+        pooled = self._clients.get(provider)
+        if pooled is not None:
+            yield pooled
+            return
+        async with httpx.AsyncClient(timeout=PROVIDER_TIMEOUTS[provider]) as client:
+            yield client
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pooled": bool(self._clients),
+            "providers": {
+                provider: stats.as_dict() for provider, stats in self._stats.items()
+            }
+        }
+
+
+# Process-wide clients shared by every service
+upstream_clients = UpstreamClients()
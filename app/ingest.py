@@ -0,0 +1,141 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+from sqlalchemy import insert
+from .config import settings
+from .database import AsyncSessionLocal
+from .models.logs import NewsLog, PriceLog
+from .rollups import upsert_candles
+
+logger = logging.getLogger(__name__)
+
+Row = Tuple[Type, Dict[str, Any]]
+
+
+class LogWriter:
+    """Write-behind buffer for price_logs and news_logs.
+
+    Producers enqueue rows and return without touching the database; one
+    flusher task writes them as multi-row INSERTs of up to ingest_batch_size
+    rows, at least every ingest_flush_interval seconds. At most
+    ingest_max_rows are buffered: producers then wait up to
+    ingest_put_timeout for room before the row is dropped. stop() flushes
+    whatever is still buffered. Price rows are merged into their OHLC
+    candles in the same transaction.
+    """
+
+    def __init__(self, session_factory: Callable = AsyncSessionLocal):
+        self.session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._stats = {"written": 0, "dropped": 0, "failed": 0, "batches": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=settings.ingest_max_rows)
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        self._stopping = True
+        try:
+            await asyncio.wait_for(task, settings.ingest_shutdown_timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Dropped {self._queue.qsize()} log rows still buffered at shutdown")
+
+    async def log_price(self, source: str, symbol: str, value: float) -> bool:
+        return await self._put(PriceLog, {"source": source, "symbol": symbol.upper(), "value": value})
+
+    async def log_news(self, title: str, source: str, url: str) -> bool:
+        return await self._put(NewsLog, {"title": title, "source": source, "url": url})
+
+    def offer_prices(self, source: str, prices: Dict[str, float]) -> int:
+        """Queue fetched prices without waiting; rows that don't fit are dropped"""
+        if not self.running:
+            return 0
+        now = datetime.now(timezone.utc)
+        queued = 0
+        for symbol, value in prices.items():
+            try:
+                self._queue.put_nowait((PriceLog, {
+                    "source": source, "symbol": symbol.upper(), "value": value, "timestamp": now}))
+                queued += 1
+            except asyncio.QueueFull:
+                self._stats["dropped"] += 1
+        return queued
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "buffered": self._queue.qsize() if self._queue is not None else 0,
+            **self._stats
+        }
+
+    async def _put(self, model: Type, row: Dict[str, Any]) -> bool:
+        # Stamp rows when they arrive, not when their batch is written
+        row["timestamp"] = datetime.now(timezone.utc)
+        try:
+            self._queue.put_nowait((model, row))
+            return True
+        except asyncio.QueueFull:
+            pass
+        try:
+            await asyncio.wait_for(self._queue.put((model, row)), settings.ingest_put_timeout)
+            return True
+        except asyncio.TimeoutError:
+            self._stats["dropped"] += 1
+            return False
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            if batch:
+                await self._write(batch)
+            elif self._stopping:
+                return
+
+    async def _next_batch(self) -> List[Row]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.ingest_flush_interval
+        batch: List[Row] = []
+        while len(batch) < settings.ingest_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if self._stopping or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _write(self, batch: List[Row]) -> None:
+        by_model: Dict[Type, List[Dict[str, Any]]] = defaultdict(list)
+        for model, row in batch:
+            by_model[model].append(row)
+        try:
+            async with self.session_factory() as session:
+                for model, rows in by_model.items():
+                    await session.execute(insert(model), rows)
+                if PriceLog in by_model:
+                    await upsert_candles(session, by_model[PriceLog])
+                await session.commit()
+            self._stats["written"] += len(batch)
+            self._stats["batches"] += 1
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} log rows: {e}")
+            self._stats["failed"] += len(batch)
+
+
+log_writer = LogWriter()
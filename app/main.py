@@ -1,9 +1,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from app.routes import health, crypto, stocks, weather, news, exchange_rate, refresh
+from app.routes import health, crypto, stocks, weather, news, exchange_rate, refresh, metrics, stream, ws
 from app.database import init_db, engine
-from app.cache import close_redis
+from app.cache import close_redis, get_redis
+from app.config import settings
+from app.events import event_broker
+from app.ingest import log_writer
+from app.partitions import maintain_partitions
+from app.http_client import upstream_clients
+from app.scheduler import register_prefetch_jobs, scheduler
+from app.subscriptions import symbol_hub
 
 
 @asynccontextmanager
@@ -12,13 +19,28 @@ async def lifespan(app: FastAPI):
     # Startup
     try:
         await init_db()
+        # Inserts fail without a partition for the current month
+        await maintain_partitions()
         print("Database initialized successfully")
     except Exception as e:
         print(f"Warning: Database initialization failed: {e}")
         print("Application will start without database connection")
+    log_writer.start()
+    redis_client = await get_redis()
+    await upstream_clients.start(redis_client)
+    event_broker.start(redis_client)
+    symbol_hub.start()
+    if settings.scheduler_enabled:
+        register_prefetch_jobs(scheduler, redis_client)
+        scheduler.start(redis_client)
     yield
     # Shutdown
+    await scheduler.stop()
+    await symbol_hub.stop()
+    await event_broker.stop()
+    await log_writer.stop()
     try:
+        await upstream_clients.close()
         await engine.dispose()
         await close_redis()
     except Exception as e:
@@ -49,6 +71,9 @@ app.include_router(weather.router, prefix="/api")
 app.include_router(news.router, prefix="/api")
 app.include_router(exchange_rate.router, prefix="/api")
 app.include_router(refresh.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
+app.include_router(stream.router, prefix="/api")
+app.include_router(ws.router, prefix="/api")
 
 
 @app.get("/")
@@ -1,17 +1,25 @@
-from sqlalchemy import Column, String, Float, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Index
 from sqlalchemy.sql import func
+from app.database import Base
 from app.models.base import BaseModel
 
 
 class PriceLog(BaseModel):
-    """Model for storing price data logs"""
+    """Model for storing price data logs, partitioned by month (see app/partitions.py)"""
     __tablename__ = "price_logs"
+    __table_args__ = (
+        # Per-symbol time-range reads within the partitions that survive pruning
+        Index("ix_price_logs_source_symbol_timestamp", "source", "symbol", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
-    source = Column(String(50), nullable=False, index=True)  # crypto/stocks
-    symbol = Column(String(20), nullable=False, index=True)
+    # Postgres requires the partition key in the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source = Column(String(50), nullable=False)  # crypto/stocks
+    symbol = Column(String(20), nullable=False)
     value = Column(Float, nullable=False)
-    timestamp = Column(DateTime(timezone=True),
-                       server_default=func.now(), index=True)
+    timestamp = Column(DateTime(timezone=True), primary_key=True,
+                       server_default=func.now())
 
 
 class NewsLog(BaseModel):
@@ -23,3 +31,21 @@ class NewsLog(BaseModel):
     url = Column(Text, nullable=False)
     timestamp = Column(DateTime(timezone=True),
                        server_default=func.now(), index=True)
+
+
+class PriceCandle(Base):
+    """OHLC candles rolled up from price_logs (see app/rollups.py)"""
+    __tablename__ = "price_candles"
+
+    source = Column(String(50), primary_key=True)
+    symbol = Column(String(20), primary_key=True)
+    interval = Column(String(4), primary_key=True)  # 1m/5m/1h/1d
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    ticks = Column(Integer, nullable=False)  # price_logs rows in the candle
+    # First and last tick times, so late rows merge in the right order
+    open_at = Column(DateTime(timezone=True), nullable=False)
+    close_at = Column(DateTime(timezone=True), nullable=False)
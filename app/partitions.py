@@ -0,0 +1,79 @@
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from .config import settings
+from .database import engine as default_engine
+from .models.logs import PriceLog
+
+logger = logging.getLogger(__name__)
+
+TABLE = PriceLog.__tablename__
+PARTITION_NAME = re.compile(rf"{TABLE}_(\d{{4}})_(\d{{2}})")
+
+LIST_PARTITIONS_SQL = text("""
+    SELECT child.relname
+    FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE parent.relname = :table
+""")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(start: date) -> date:
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(start: date) -> str:
+    return f"{TABLE}_{start:%Y_%m}"
+
+
+def upcoming_partitions(today: date, ahead: int) -> List[Tuple[str, date, date]]:
+    """(name, start, end) of this month's partition and the next `ahead`"""
+    partitions = []
+    start = month_start(today)
+    for _ in range(ahead + 1):
+        end = next_month(start)
+        partitions.append((partition_name(start), start, end))
+        start = end
+    return partitions
+
+
+def expired_partitions(names: List[str], today: date, retention_days: int) -> List[str]:
+    """Partitions whose whole month ended before the retention cutoff"""
+    cutoff = today - timedelta(days=retention_days)
+    expired = []
+    for name in names:
+        match = PARTITION_NAME.fullmatch(name)
+        if match and next_month(date(int(match[1]), int(match[2]), 1)) <= cutoff:
+            expired.append(name)
+    return sorted(expired)
+
+
+async def maintain_partitions(engine: Optional[AsyncEngine] = None,
+                              today: Optional[date] = None) -> Dict[str, List[str]]:
+    """Create upcoming monthly price_logs partitions and drop expired ones"""
+    engine = engine or default_engine
+    today = today or datetime.now(timezone.utc).date()
+    created, dropped = [], []
+    async with engine.begin() as conn:
+        existing = {row[0] for row in await conn.execute(LIST_PARTITIONS_SQL, {"table": TABLE})}
+        for name, start, end in upcoming_partitions(today, settings.price_logs_partitions_ahead):
+            if name in existing:
+                continue
+            await conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{start} 00:00:00+00') TO ('{end} 00:00:00+00')"))
+            created.append(name)
+        for name in expired_partitions(list(existing), today, settings.price_logs_retention_days):
+            await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    if created or dropped:
+        logger.info(f"price_logs partitions created {created}, dropped {dropped}")
+    return {"created": created, "dropped": dropped}
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+import redis.asyncio as redis
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimit(NamedTuple):
+    rate: float  # tokens added per second
+    burst: int  # bucket capacity
+
+
+# Free-plan quotas of each upstream provider
+PROVIDER_RATE_LIMITS: Dict[str, RateLimit] = {
+    "coingecko": RateLimit(30 / 60, 10),  # 30 calls/minute
+    "finnhub": RateLimit(60 / 60, 30),  # 60 calls/minute, 30/second burst
+    "openweather": RateLimit(60 / 60, 20),  # 60 calls/minute
+    "gnews": RateLimit(100 / 86400, 10),  # 100 calls/day
+    "exchangerate": RateLimit(1500 / (30 * 86400), 10),  # 1500 calls/month
+}
+
+BUCKET_PREFIX = "ratelimit:"
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# Priority of upstream calls made from the current task; background jobs
+# set PRIORITY_BACKGROUND so user requests are served first
+upstream_priority: ContextVar[int] = ContextVar("upstream_priority", default=PRIORITY_INTERACTIVE)
+
+
+class SharedPriority:
+    """Priority of one fetch done on behalf of several callers.
+
+    A single-flight fetch starts at the priority of the caller that started
+    it and is raised to interactive as soon as an interactive caller joins,
+    so user requests never wait on background rate limits.
+    """
+
+    def __init__(self, level: int):
+        self.level = level
+
+    def join(self, level: int) -> None:
+        self.level = min(self.level, level)
+
+
+# Set inside single-flight tasks; takes precedence over upstream_priority
+shared_priority: ContextVar[Optional[SharedPriority]] = ContextVar("shared_priority", default=None)
+
+
+def current_priority() -> int:
+    shared = shared_priority.get()
+    return shared.level if shared is not None else upstream_priority.get()
+
+
+# Refills the bucket from Redis server time and takes ARGV[3] tokens if that
+# leaves at least ARGV[4] in reserve. Returns {allowed, tokens, wait_ms}.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local reserve = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+local allowed = 0
+local wait = 0
+if tokens - requested >= reserve then
+    tokens = tokens - requested
+    allowed = 1
+else
+    wait = math.ceil((requested + reserve - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return {allowed, tostring(tokens), wait}
+"""
+
+
+class RateLimitExceeded(Exception):
+    """Raised when no token becomes available within the caller's wait budget"""
+
+    def __init__(self, provider: str):
+        super().__init__("API rate limit exceeded")
+        self.provider = provider
+
+
+class ProviderStats:
+    """Outcome counters for one provider's bucket in this process"""
+
+    def __init__(self):
+        self.acquired = 0
+        self.waited = 0
+        self.rejected = 0
+        self.wait_ms = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "rejected": self.rejected,
+            "wait_ms": round(self.wait_ms, 1),
+        }
+
+
+class RateLimiter:
+    """Token bucket per upstream provider, shared by all workers via Redis.
+
+    Interactive callers wait up to rate_limit_max_wait for a token.
+    Background callers wait up to rate_limit_background_wait but may not
+    take the last rate_limit_interactive_reserve share of the bucket, so
+    prefetching never starves user requests. If Redis is unavailable the
+    limiter lets calls through.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis_client = redis_client
+        self._stats: Dict[str, ProviderStats] = {
+            provider: ProviderStats() for provider in PROVIDER_RATE_LIMITS
+        }
+
+    async def acquire(self, provider: str) -> None:
+        """Wait for a token for provider, raising RateLimitExceeded on timeout"""
+        limit = PROVIDER_RATE_LIMITS.get(provider)
+        if limit is None:
+            return
+        stats = self._stats[provider]
+        started = time.monotonic()
+        slept = False
+        while True:
+            # Re-read each round: an interactive caller may join a background fetch
+            if current_priority() == PRIORITY_BACKGROUND:
+                max_wait = settings.rate_limit_background_wait
+                reserve = limit.burst * settings.rate_limit_interactive_reserve
+            else:
+                max_wait = settings.rate_limit_max_wait
+                reserve = 0.0
+            try:
+                allowed, _, wait_ms = await self._take(provider, limit, 1, reserve)
+            except Exception as e:
+                logger.warning(f"Rate limiter unavailable for {provider}, allowing call: {e}")
+                return
+            waited = time.monotonic() - started
+            if allowed:
+                stats.acquired += 1
+                if slept:
+                    stats.waited += 1
+                    stats.wait_ms += waited * 1000
+                return
+            if waited + wait_ms / 1000 > max_wait:
+                stats.rejected += 1
+                logger.warning(f"{provider} rate limit reached, not calling upstream")
+                raise RateLimitExceeded(provider)
+            await asyncio.sleep(wait_ms / 1000)
+            slept = True
+
+    async def remaining(self, provider: str) -> Optional[float]:
+        """Tokens currently in provider's bucket, without taking any"""
+        _, tokens, _ = await self._take(provider, PROVIDER_RATE_LIMITS[provider], 0, 0.0)
+        return tokens
+
+    async def stats(self) -> Dict[str, Any]:
+        providers = {}
+        for provider, limit in PROVIDER_RATE_LIMITS.items():
+            try:
+                remaining = round(await self.remaining(provider), 2)
+            except Exception as e:
+                logger.warning(f"Could not read {provider} rate limit bucket: {e}")
+                remaining = None
+            providers[provider] = {
+                "rate_per_minute": round(limit.rate * 60, 3),
+                "burst": limit.burst,
+                "remaining": remaining,
+                **self._stats[provider].as_dict()
+            }
+        return {"providers": providers}
+
+    async def _take(self, provider: str, limit: RateLimit, requested: int,
+                    reserve: float) -> Tuple[bool, float, int]:
+        allowed, tokens, wait_ms = await self.redis_client.eval(
+            TOKEN_BUCKET_SCRIPT, 1, f"{BUCKET_PREFIX}{provider}",
+            limit.rate, limit.burst, requested, reserve)
+        return bool(int(allowed)), float(tokens), int(wait_ms)
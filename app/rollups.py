@@ -0,0 +1,140 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from .config import settings
+from .database import AsyncSessionLocal
+from .models.logs import PriceCandle
+
+logger = logging.getLogger(__name__)
+
+# Candle width in seconds, finest first
+INTERVALS: Dict[str, int] = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86400}
+
+# How long each interval's candles are kept (None: forever)
+RETENTION: Dict[str, Optional[timedelta]] = {
+    "1m": timedelta(days=2),
+    "5m": timedelta(days=14),
+    "1h": timedelta(days=180),
+    "1d": None
+}
+
+
+def bucket_start(moment: datetime, seconds: int) -> datetime:
+    epoch = int(moment.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, timezone.utc)
+
+
+def pick_interval(span: float) -> str:
+    """Finest interval that covers span in at most rollup_max_candles candles"""
+    for interval, seconds in INTERVALS.items():
+        if span / seconds <= settings.rollup_max_candles:
+            return interval
+    return "1d"
+
+
+def candle_rows(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fold price_logs rows into one partial candle per (source, symbol, interval, bucket)"""
+    candles: Dict[Tuple[str, str, str, datetime], Dict[str, Any]] = {}
+    for row in sorted(rows, key=lambda r: r["timestamp"]):
+        value, moment = row["value"], row["timestamp"]
+        for interval, seconds in INTERVALS.items():
+            key = (row["source"], row["symbol"], interval, bucket_start(moment, seconds))
+            candle = candles.get(key)
+            if candle is None:
+                candles[key] = {
+                    "source": key[0], "symbol": key[1], "interval": interval, "bucket": key[3],
+                    "open": value, "high": value, "low": value, "close": value,
+                    "ticks": 1, "open_at": moment, "close_at": moment
+                }
+            else:
+                candle["high"] = max(candle["high"], value)
+                candle["low"] = min(candle["low"], value)
+                candle["close"], candle["close_at"] = value, moment
+                candle["ticks"] += 1
+    return list(candles.values())
+
+
+async def upsert_candles(session: AsyncSession, rows: Iterable[Dict[str, Any]]) -> int:
+    """Merge price_logs rows into their candles; the caller commits"""
+    candles = candle_rows(rows)
+    if not candles:
+        return 0
+    stmt = insert(PriceCandle).values(candles)
+    new, old = stmt.excluded, PriceCandle.__table__.c
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=[old.source, old.symbol, old.interval, old.bucket],
+        set_={
+            "open": case((new.open_at < old.open_at, new.open), else_=old.open),
+            "close": case((new.close_at >= old.close_at, new.close), else_=old.close),
+            "high": func.greatest(old.high, new.high),
+            "low": func.least(old.low, new.low),
+            "ticks": old.ticks + new.ticks,
+            "open_at": func.least(old.open_at, new.open_at),
+            "close_at": func.greatest(old.close_at, new.close_at)
+        }
+    ))
+    return len(candles)
+
+
+async def read_candles(source: str, symbol: str, interval: str, start: datetime,
+                       end: Optional[datetime] = None,
+                       session_factory: Callable = AsyncSessionLocal) -> List[Dict[str, Any]]:
+    """Candles of one series from start's bucket onwards, oldest first"""
+    query = select(PriceCandle).where(
+        PriceCandle.source == source,
+        PriceCandle.symbol == symbol.upper(),
+        PriceCandle.interval == interval,
+        PriceCandle.bucket >= bucket_start(start, INTERVALS[interval])
+    ).order_by(PriceCandle.bucket)
+    if end is not None:
+        query = query.where(PriceCandle.bucket <= end)
+    async with session_factory() as session:
+        result = await session.execute(query)
+        return [
+            {
+                "timestamp": int(candle.bucket.timestamp() * 1000),
+                "open": candle.open,
+                "high": candle.high,
+                "low": candle.low,
+                "close": candle.close,
+                "ticks": candle.ticks
+            }
+            for candle in result.scalars()
+        ]
+
+
+async def get_rollup_history(source: str, symbol: str, span: float,
+                             session_factory: Callable = AsyncSessionLocal) -> Optional[List[Dict[str, Any]]]:
+    """Candles for the last span seconds, or None if the rollups don't reach back that far"""
+    if not settings.rollups_enabled:
+        return None
+    interval = pick_interval(span)
+    start = datetime.now(timezone.utc) - timedelta(seconds=span)
+    try:
+        candles = await read_candles(source, symbol, interval, start, session_factory=session_factory)
+    except Exception as e:
+        logger.warning(f"Could not read {interval} candles for {source} {symbol}: {e}")
+        return None
+    # Ingestion started after the range began: let upstream answer
+    first_bucket = bucket_start(start, INTERVALS[interval]).timestamp() * 1000
+    if not candles or candles[0]["timestamp"] > first_bucket + INTERVALS[interval] * 1000:
+        return None
+    return candles
+
+
+async def prune_candles(session_factory: Callable = AsyncSessionLocal) -> int:
+    """Delete candles older than their interval's retention"""
+    now = datetime.now(timezone.utc)
+    deleted = 0
+    async with session_factory() as session:
+        for interval, keep in RETENTION.items():
+            if keep is None:
+                continue
+            result = await session.execute(delete(PriceCandle).where(
+                PriceCandle.interval == interval, PriceCandle.bucket < now - keep))
+            deleted += result.rowcount or 0
+        await session.commit()
+    return deleted
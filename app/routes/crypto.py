@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 import redis.asyncio as redis
 from app.cache import get_redis
+from app.analytics import parse_indicators
+from app.series import FORMATS
 from app.services.crypto_service import CryptoService
 from typing import List, Dict, Optional
 import logging
@@ -37,12 +39,24 @@ async def get_crypto_historical_data(
     symbol: str,
     days: str = Query(
         "1", description="Number of days (1, 7, 14, 30, 90, 180, 365, max)"),
+    response_format: str = Query(
+        "rows", alias="format", description="rows ({prices: [...]}) or columnar ({t: [...], p: [...]})"),
+    max_points: Optional[int] = Query(
+        None, ge=3, le=5000, description="Downsample to at most this many points"),
     redis_client: redis.Redis = Depends(get_redis)
 ) -> Dict:
     """
     Get historical price data for a cryptocurrency.
     Available time periods: 1, 7, 14, 30, 90, 180, 365, max days.
+    format=columnar returns parallel arrays instead of one object per point.
+    max_points downsamples the series (LTTB) to fit a chart's width.
     """
+    if response_format not in FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid format '{response_format}', expected one of {', '.join(FORMATS)}"
+        )
+    columnar = response_format == "columnar"
     try:
         crypto_service = CryptoService(redis_client)
 
@@ -54,8 +68,10 @@ async def get_crypto_historical_data(
                 detail=f"Cryptocurrency with symbol '{symbol}' not found"
             )
 
-        # Get historical data
-        data = await crypto_service.get_crypto_historical_data(coin_id, days)
+        # Prefer our own candles; fall back to CoinGecko
+        data = await crypto_service.get_rollup_historical_data(symbol, days, columnar, max_points)
+        if not data:
+            data = await crypto_service.get_crypto_historical_data(coin_id, days, columnar, max_points)
         if not data:
             raise HTTPException(
                 status_code=503,
@@ -79,3 +95,56 @@ async def get_crypto_historical_data(
                 status_code=503,
                 detail=f"Unable to fetch crypto historical data: {str(e)}"
             )
+
+
+@router.get("/analytics/{symbol}")
+async def get_crypto_analytics(
+    symbol: str,
+    days: str = Query(
+        "30", description="Number of days (1, 7, 14, 30, 90, 180, 365, max)"),
+    indicators: Optional[str] = Query(
+        None, description="Comma-separated: sma, ema, rsi, volatility, drawdown, returns (default: all)"),
+    window: int = Query(14, ge=2, le=200, description="Points per moving window"),
+    redis_client: redis.Redis = Depends(get_redis)
+) -> Dict:
+    """
+    Technical indicators computed server-side over the cached price series.
+    Indicator arrays are aligned with t; null where the window is not yet full.
+    """
+    try:
+        names = parse_indicators(indicators)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        crypto_service = CryptoService(redis_client)
+        coin_id = await crypto_service.get_crypto_id(symbol)
+        if not coin_id:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Cryptocurrency with symbol '{symbol}' not found"
+            )
+
+        data = await crypto_service.get_analytics(symbol, coin_id, days, names, window)
+        if not data:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Unable to fetch historical data for {symbol}"
+            )
+
+        return {
+            "symbol": symbol.upper(),
+            "coin_id": coin_id,
+            "days": days,
+            **data
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        if "rate limit" in str(e).lower():
+            raise HTTPException(
+                status_code=429, detail="API rate limit exceeded")
+        else:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Unable to compute crypto analytics: {str(e)}"
+            )
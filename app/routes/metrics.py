@@ -0,0 +1,59 @@
+from fastapi import APIRouter
+from app.database import get_pool_stats
+from app.http_client import upstream_clients
+from app.events import event_broker
+from app.ingest import log_writer
+from app.scheduler import scheduler
+from app.subscriptions import symbol_hub
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/http")
+async def get_http_metrics():
+    """
+    Connection reuse statistics for the pooled upstream HTTP clients.
+    """
+    return upstream_clients.stats()
+
+
+@router.get("/rate-limits")
+async def get_rate_limit_metrics():
+    """
+    Remaining tokens and wait/reject counts for each provider's rate limit.
+    """
+    if upstream_clients.rate_limiter is None:
+        return {"enabled": False, "providers": {}}
+    return {"enabled": True, **await upstream_clients.rate_limiter.stats()}
+
+
+@router.get("/stream")
+async def get_stream_metrics():
+    """
+    Connected SSE clients and WebSocket symbol subscriptions in this worker.
+    """
+    return {"events": event_broker.stats(), "websocket": symbol_hub.stats()}
+
+
+@router.get("/scheduler")
+async def get_scheduler_status():
+    """
+    Last run, duration, outcome and next run of each background prefetch job.
+    """
+    return {"jobs": scheduler.status()}
+
+
+@router.get("/ingest")
+async def get_ingest_metrics():
+    """
+    Buffered, written and dropped rows of the write-behind price/news log writer.
+    """
+    return log_writer.stats()
+
+
+@router.get("/db")
+async def get_db_metrics():
+    """
+    Connection pool occupancy, saturation and checkout latency in this worker.
+    """
+    return get_pool_stats()
@@ -2,8 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 import redis.asyncio as redis
 from app.cache import get_redis
+from app.analytics import parse_indicators
+from app.series import FORMATS
 from app.services.stocks_service import StocksService
-from typing import Dict, List
+from typing import Dict, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,6 +16,11 @@ class StockPriceResponse(BaseModel):
     price: float
 
 
+class StockPricesResponse(BaseModel):
+    prices: List[StockPriceResponse]
+    errors: Dict[str, str] = {}
+
+
 class StockListItem(BaseModel):
     symbol: str
     name: str
@@ -75,20 +82,68 @@ async def get_stock_price(
                 status_code=503, detail=f"Unable to fetch stock price: {e}")
 
 
+@router.get("/prices", response_model=StockPricesResponse)
+async def get_stock_prices(
+    symbols: str = Query(..., description="Comma-separated stock symbols, e.g. AAPL,MSFT"),
+    redis_client: redis.Redis = Depends(get_redis)
+) -> StockPricesResponse:
+    """
+    Get real-time prices for up to 50 symbols in one request.
+    Symbols that could not be fetched are reported in errors.
+    """
+    symbol_list = [s for s in symbols.split(",") if s.strip()]
+    if len(symbol_list) > 50:
+        raise HTTPException(status_code=400, detail="At most 50 symbols per request")
+    try:
+        service = StocksService(redis_client)
+        prices, errors = await service.get_stock_prices(symbol_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not prices and errors:
+        # Nothing to return; surface the failure like the single-symbol route
+        message = next(iter(errors.values()))
+        if "rate limit" in message.lower():
+            raise HTTPException(
+                status_code=429, detail="API rate limit exceeded")
+        elif "not configured" in message.lower():
+            raise HTTPException(
+                status_code=500, detail="API configuration error")
+        else:
+            raise HTTPException(
+                status_code=503, detail=f"Unable to fetch stock prices: {message}")
+
+    return StockPricesResponse(
+        prices=[StockPriceResponse(symbol=symbol, price=price)
+                for symbol, price in prices.items()],
+        errors=errors
+    )
+
+
 @router.get("/historical/{symbol}")
 async def get_stock_historical_data(
     symbol: str,
     period: str = Query(
         "1D", description="Time period: 1H, 1D, 1W, 1M, 3M, 1Y"),
+    response_format: str = Query(
+        "rows", alias="format", description="rows ({prices: [...]}) or columnar ({t, o, h, l, c, v arrays})"),
+    max_points: Optional[int] = Query(
+        None, ge=3, le=5000, description="Bucket candles down to at most this many"),
     redis_client: redis.Redis = Depends(get_redis)
 ) -> Dict:
     """
     Get historical price data for a stock.
     Available time periods: 1H, 1D, 1W, 1M, 3M, 1Y.
+    format=columnar returns parallel arrays instead of one object per point.
+    max_points merges candles (first open, max high, min low, last close).
     """
     try:
+        if response_format not in FORMATS:
+            raise ValueError(
+                f"Invalid format '{response_format}', expected one of {', '.join(FORMATS)}")
         service = StocksService(redis_client)
-        data = await service.get_stock_historical_data_by_period(symbol, period)
+        data = await service.get_stock_historical_data_by_period(
+            symbol, period, columnar=response_format == "columnar", max_points=max_points)
 
         if not data:
             raise HTTPException(
@@ -113,3 +168,45 @@ async def get_stock_historical_data(
         else:
             raise HTTPException(
                 status_code=503, detail=f"Unable to fetch stock historical data: {e}")
+
+
+@router.get("/analytics/{symbol}")
+async def get_stock_analytics(
+    symbol: str,
+    period: str = Query(
+        "1M", description="Time period: 1H, 1D, 1W, 1M, 3M, 1Y"),
+    indicators: Optional[str] = Query(
+        None, description="Comma-separated: sma, ema, rsi, volatility, drawdown, returns (default: all)"),
+    window: int = Query(14, ge=2, le=200, description="Points per moving window"),
+    redis_client: redis.Redis = Depends(get_redis)
+) -> Dict:
+    """
+    Technical indicators computed server-side over closing prices.
+    Indicator arrays are aligned with t; null where the window is not yet full.
+    """
+    try:
+        names = parse_indicators(indicators)
+        service = StocksService(redis_client)
+        data = await service.get_analytics(symbol, period, names, window)
+
+        if not data:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Unable to fetch historical data for {symbol}"
+            )
+
+        return {
+            "symbol": symbol.upper(),
+            "period": period,
+            **data
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        if "rate limit" in str(e).lower():
+            raise HTTPException(
+                status_code=429, detail="API rate limit exceeded")
+        raise HTTPException(
+            status_code=503, detail=f"Unable to compute stock analytics: {e}")
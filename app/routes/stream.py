@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import re
+from typing import AsyncIterator, Optional, Set
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+import redis.asyncio as redis
+from app.cache import get_redis
+from app.config import settings
+from app.events import Event, event_broker, replay_events, stream_id
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/stream", tags=["stream"])
+
+# Redis stream entry id: milliseconds, optionally with a sequence number
+EVENT_ID_PATTERN = re.compile(r"\d+(-\d+)?")
+
+
+def format_event(event: Event) -> str:
+    return f"id: {event.id}\nevent: {event.topic}\ndata: {event.data}\n\n"
+
+
+async def event_stream(redis_client: redis.Redis, topics: Optional[Set[str]],
+                       last_event_id: Optional[str]) -> AsyncIterator[str]:
+    """Replay missed events, then relay live ones with periodic heartbeats"""
+    # Subscribe before replaying so nothing published in between is lost
+    async with event_broker.subscribe() as queue:
+        yield "retry: 3000\n\n"
+        last_sent = stream_id(last_event_id) if last_event_id else (0, 0)
+        if last_event_id:
+            try:
+                for event in await replay_events(redis_client, last_event_id):
+                    last_sent = stream_id(event.id)
+                    if topics is None or event.topic in topics:
+                        yield format_event(event)
+            except Exception as e:
+                logger.warning(f"Could not replay events after {last_event_id}: {e}")
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), settings.stream_heartbeat)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            if event is None:
+                # Fell behind; the client reconnects with Last-Event-ID
+                return
+            if stream_id(event.id) <= last_sent:
+                continue
+            last_sent = stream_id(event.id)
+            if topics is None or event.topic in topics:
+                yield format_event(event)
+
+
+@router.get("")
+async def stream_events(
+    topics: Optional[str] = Query(
+        None, description="Comma-separated topics, e.g. crypto_prices,stock_price (default: all)"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    redis_client: redis.Redis = Depends(get_redis)
+) -> StreamingResponse:
+    """
+    Server-Sent Events stream of cache updates.
+    Each event's type is the topic that changed and its data is {"key", "value"}.
+    Reconnecting clients send Last-Event-ID to receive the events they missed.
+    """
+    if last_event_id and not EVENT_ID_PATTERN.fullmatch(last_event_id):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid Last-Event-ID: {last_event_id}"
+        )
+    topic_set = {t.strip() for t in topics.split(",") if t.strip()} if topics else None
+    return StreamingResponse(
+        event_stream(redis_client, topic_set, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
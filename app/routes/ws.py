@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from typing import Any, Dict, List
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+import redis.asyncio as redis
+from app.cache import get_redis
+from app.config import settings
+from app.services.crypto_service import CryptoService
+from app.services.stocks_service import StocksService
+from app.subscriptions import CRYPTO, STOCKS, Subscriber, symbol_hub
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/ws", tags=["websocket"])
+
+
+async def load_quotes(redis_client: redis.Redis, kind: str, symbols: List[str]) -> Dict[str, Any]:
+    """Seed the hub with cached quotes for symbols it has not seen yet"""
+    unknown = [symbol for symbol in symbols if (kind, symbol) not in symbol_hub.quotes]
+    errors: Dict[str, str] = {}
+    if unknown and kind == CRYPTO:
+        coins = await CryptoService(redis_client).get_crypto_prices(top_n=100)
+        for coin in coins:
+            symbol_hub.seed(CRYPTO, coin["symbol"], {"name": coin["name"], "price": coin["price"]})
+        errors = {
+            symbol: f"{symbol} is not in the top 100 coins"
+            for symbol in unknown if (CRYPTO, symbol) not in symbol_hub.quotes
+        }
+    elif unknown and kind == STOCKS:
+        prices, errors = await StocksService(redis_client).get_stock_prices(unknown)
+        for symbol, price in prices.items():
+            symbol_hub.seed(STOCKS, symbol, {"price": price})
+    quotes = {
+        symbol: symbol_hub.quotes[(kind, symbol)]
+        for symbol in symbols if (kind, symbol) in symbol_hub.quotes
+    }
+    return {"quotes": quotes, "errors": errors}
+
+
+async def handle_message(redis_client: redis.Redis, subscriber: Subscriber, message: Dict) -> None:
+    action = message.get("action")
+    if action not in ("subscribe", "unsubscribe"):
+        subscriber.push_message({"type": "error", "detail": f"Unknown action: {action}"})
+        return
+
+    requested = {
+        kind: [str(s).strip().upper() for s in message.get(kind) or [] if str(s).strip()]
+        for kind in (CRYPTO, STOCKS)
+    }
+    if action == "unsubscribe":
+        for kind, symbols in requested.items():
+            symbol_hub.unfollow(subscriber, kind, symbols)
+        return
+
+    if len(subscriber.following) + sum(map(len, requested.values())) > settings.ws_max_symbols:
+        subscriber.push_message({
+            "type": "error",
+            "detail": f"At most {settings.ws_max_symbols} symbols per connection"
+        })
+        return
+
+    snapshot: Dict[str, Any] = {"type": "snapshot"}
+    for kind, symbols in requested.items():
+        if not symbols:
+            continue
+        symbol_hub.follow(subscriber, kind, symbols)
+        try:
+            loaded = await load_quotes(redis_client, kind, symbols)
+        except Exception as e:
+            logger.error(f"Error loading {kind} quotes for subscription: {e}")
+            loaded = {"quotes": {}, "errors": {symbol: str(e) for symbol in symbols}}
+        snapshot[kind] = loaded["quotes"]
+        if loaded["errors"]:
+            snapshot.setdefault("errors", {}).update(loaded["errors"])
+    subscriber.push_message(snapshot)
+
+
+@router.websocket("/quotes")
+async def quotes_socket(
+    websocket: WebSocket,
+    redis_client: redis.Redis = Depends(get_redis)
+):
+    """
+    Live crypto and stock quotes for the symbols a client follows.
+
+    Send {"action": "subscribe", "crypto": ["BTC"], "stocks": ["AAPL"]} to
+    follow symbols (answered with a snapshot of their current quotes) and
+    {"action": "unsubscribe", ...} to stop. Updates arrive as
+    {"type": "delta", "crypto": {"BTC": {"price": 50100.0}}} carrying only
+    the fields that changed.
+    """
+    await websocket.accept()
+    subscriber = Subscriber(websocket)
+    sender = asyncio.create_task(subscriber.run())
+    try:
+        while not sender.done():
+            message = await websocket.receive_json()
+            if not isinstance(message, dict):
+                subscriber.push_message({"type": "error", "detail": "Expected a JSON object"})
+                continue
+            await handle_message(redis_client, subscriber, message)
+    except (WebSocketDisconnect, ValueError):
+        pass
+    finally:
+        symbol_hub.remove(subscriber)
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import redis.asyncio as redis
+from .cache import sweep_stale_generations
+from .config import settings
+from .partitions import maintain_partitions
+from .rollups import prune_candles
+from .rate_limiter import PRIORITY_BACKGROUND, PROVIDER_RATE_LIMITS, upstream_priority
+from .services.coin_index import CoinIndex
+from .services.crypto_service import CryptoService
+from .services.exchange_rate_service import ExchangeRateService
+from .services.news_service import NewsService
+from .services.stocks_service import StocksService
+from .services.weather_service import WeatherService
+
+logger = logging.getLogger(__name__)
+
+LEASE_PREFIX = "scheduler:lease:"
+
+
+class Job:
+    """A periodic task and the outcome of its last run"""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], Awaitable[Any]],
+                 timeout: Optional[float] = None):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.timeout = timeout or settings.refresh_timeout
+        self.runs = 0
+        self.failures = 0
+        self.last_run: Optional[float] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_status: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.next_run: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "interval": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run": _isoformat(self.last_run),
+            "last_duration_ms": self.last_duration_ms,
+            "last_status": self.last_status,
+            "last_error": self.last_error,
+            "next_run": _isoformat(self.next_run),
+        }
+
+
+class Scheduler:
+    """Runs jobs on fixed intervals in the background.
+
+    Each job runs in its own task, so a slow provider never delays the
+    others. With several workers, a Redis lease per job and interval
+    elects one worker to run each tick; the others record it as skipped.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self.redis_client: Optional[redis.Redis] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, name: str, interval: float, func: Callable[[], Awaitable[Any]],
+                timeout: Optional[float] = None) -> Job:
+        job = Job(name, interval, func, timeout)
+        self.jobs[name] = job
+        return job
+
+    def start(self, redis_client: Optional[redis.Redis] = None) -> None:
+        self.redis_client = redis_client
+        for job in self.jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job)))
+        logger.info(f"Started scheduler with {len(self.jobs)} jobs")
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run_job(self, job: Job) -> None:
+        """Run job once (if this worker wins its lease) and record the outcome"""
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            if not await self._acquire(job):
+                job.last_status = "skipped"
+                return
+            await asyncio.wait_for(job.func(), job.timeout)
+            job.last_status, job.last_error = "success", None
+        except asyncio.TimeoutError:
+            job.failures += 1
+            job.last_status, job.last_error = "timeout", f"No response within {job.timeout}s"
+            logger.warning(f"Scheduled job {job.name} timed out")
+        except Exception as e:
+            job.failures += 1
+            job.last_status, job.last_error = "error", str(e)
+            logger.warning(f"Scheduled job {job.name} failed: {e}")
+        finally:
+            job.runs += 1
+            job.last_run = started_at
+            job.last_duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [job.as_dict() for job in self.jobs.values()]
+
+    async def _loop(self, job: Job) -> None:
+        # Upstream calls made by jobs yield to user requests
+        upstream_priority.set(PRIORITY_BACKGROUND)
+        while True:
+            await self.run_job(job)
+            job.next_run = time.time() + job.interval
+            await asyncio.sleep(job.interval)
+
+    async def _acquire(self, job: Job) -> bool:
+        if self.redis_client is None:
+            return True
+        try:
+            # Never released: it expires just before the next tick
+            acquired = await self.redis_client.set(
+                f"{LEASE_PREFIX}{job.name}", "1", nx=True, px=int(job.interval * 900))
+            return bool(acquired)
+        except Exception as e:
+            logger.warning(f"Scheduler lease unavailable for {job.name}, running anyway: {e}")
+            return True
+
+
+def prefetch_interval(ttl: float, provider: str, calls_per_run: int) -> float:
+    """Seconds between runs: just before ttl, but within the provider's quota.
+
+    Prefetching may use at most prefetch_quota_share of the provider's
+    rate limit, so the rest stays available to user requests.
+    """
+    limit = PROVIDER_RATE_LIMITS[provider]
+    quota_interval = calls_per_run / (limit.rate * settings.prefetch_quota_share)
+    return max(ttl * settings.prefetch_ttl_fraction, quota_interval)
+
+
+def register_prefetch_jobs(scheduler: Scheduler, redis_client: redis.Redis) -> None:
+    """Keep every provider's hot cache entries refreshed before they go stale"""
+    lead = settings.prefetch_ttl_fraction
+    limit = settings.refresh_hot_limit
+    news_limit = settings.news_hot_limit
+    crypto = CryptoService(redis_client)
+    stocks = StocksService(redis_client)
+    weather = WeatherService(redis_client)
+    news = NewsService(redis_client)
+    exchange = ExchangeRateService(redis_client)
+
+    scheduler.add_job("crypto", prefetch_interval(crypto.cache_ttl, "coingecko", 1),
+                      crypto.refresh)
+    scheduler.add_job("stocks", prefetch_interval(stocks.cache_ttl, "finnhub", limit),
+                      lambda: stocks.refresh_hot(limit))
+    scheduler.add_job("weather", prefetch_interval(weather.cache_ttl, "openweather", limit),
+                      lambda: weather.refresh_hot(limit))
+    # top_headlines plus news_hot_limit categories per run
+    scheduler.add_job("news", prefetch_interval(news.cache_ttl, "gnews", 1 + news_limit),
+                      lambda: news.refresh_hot(news_limit))
+    scheduler.add_job("exchange", prefetch_interval(exchange.cache_ttl, "exchangerate", 1),
+                      exchange.refresh)
+    # Cheap when the shared index is current; rebuilds it ahead of expiry
+    coin_index = CoinIndex(redis_client)
+    scheduler.add_job("coin_index", 3600.0,
+                      lambda: coin_index.warm(settings.crypto_index_ttl * lead), timeout=60.0)
+    scheduler.add_job("cache_sweep", settings.cache_sweep_interval,
+                      lambda: sweep_stale_generations(redis_client), timeout=60.0)
+    scheduler.add_job("price_log_partitions", 86400.0, maintain_partitions, timeout=60.0)
+    scheduler.add_job("price_candles_prune", 86400.0, prune_candles, timeout=60.0)
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+# Process-wide scheduler started from the application lifespan
+scheduler = Scheduler()
@@ -0,0 +1,90 @@
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+# Short array names of the columnar format, by point field
+COLUMNS: Dict[str, str] = {
+    "timestamp": "t",
+    "price": "p",
+    "open": "o",
+    "high": "h",
+    "low": "l",
+    "close": "c",
+    "volume": "v",
+    "ticks": "n"
+}
+FIELDS: Dict[str, str] = {short: field for field, short in COLUMNS.items()}
+
+# Values of the historical routes' format parameter
+FORMATS = ("rows", "columnar")
+
+
+def to_columns(points: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Parallel arrays of a list of points, e.g. {"t": [...], "p": [...]}"""
+    if not points:
+        return {"t": []}
+    fields = [field for field in COLUMNS if field in points[0]]
+    return {COLUMNS[field]: [point[field] for point in points] for field in fields}
+
+
+def to_rows(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """List of points of a columnar series"""
+    names = [FIELDS[short] for short in columns]
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+# A segmented series is {"segments": [columns, ...]}: time-ordered columnar
+# chunks that refreshes append to instead of rewriting the whole range.
+Segments = List[Dict[str, List[Any]]]
+
+
+def join_segments(segments: Segments, start: Optional[int] = None) -> Dict[str, List[Any]]:
+    """One columnar series from segments, dropping points before start"""
+    if not segments:
+        return {"t": []}
+    names = list(segments[0])
+    columns: Dict[str, List[Any]] = {name: [] for name in names}
+    for segment in segments:
+        if start is not None and segment["t"] and segment["t"][-1] < start:
+            continue
+        skip = bisect_left(segment["t"], start) if start is not None else 0
+        for name in names:
+            columns[name].extend(segment[name][skip:])
+    return columns
+
+
+def append_segment(segments: Segments, tail: Dict[str, List[Any]], step: int) -> Segments:
+    """Append the points of tail at least step after the series' last point"""
+    last = segments[-1]["t"][-1] if segments and segments[-1]["t"] else None
+    keep = []
+    for i, moment in enumerate(tail["t"]):
+        if last is None or moment >= last + step:
+            keep.append(i)
+            last = moment
+    if not keep:
+        return segments
+    return segments + [{name: [values[i] for i in keep] for name, values in tail.items()}]
+
+
+def prepend_segment(segments: Segments, head: Dict[str, List[Any]], step: int) -> Segments:
+    """Prepend the points of head at least step before the series' first point"""
+    first = segments[0]["t"][0] if segments and segments[0]["t"] else None
+    keep = []
+    for i in range(len(head["t"]) - 1, -1, -1):
+        if first is None or head["t"][i] <= first - step:
+            keep.append(i)
+            first = head["t"][i]
+    if not keep:
+        return segments
+    keep.reverse()
+    return [{name: [values[i] for i in keep] for name, values in head.items()}] + segments
+
+
+def trim_segments(segments: Segments, start: Optional[int], max_segments: int) -> Segments:
+    """Drop points before start; merge everything once there are too many segments"""
+    if start is not None:
+        segments = [segment for segment in segments if segment["t"] and segment["t"][-1] >= start]
+        if segments and segments[0]["t"][0] < start:
+            segments = [join_segments(segments[:1], start)] + segments[1:]
+    if len(segments) > max_segments:
+        segments = [join_segments(segments)]
+    return segments
@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import httpx
+import redis.asyncio as redis
+from app.config import settings
+from app.http_client import UpstreamClients, upstream_clients
+
+logger = logging.getLogger(__name__)
+
+# Redis hash of symbol -> comma-separated coin ids, best match first
+INDEX_KEY = "crypto_id_index"
+BUILT_AT_KEY = "crypto_id_index:built_at"
+LEASE_KEY = "crypto_id_index:lease"
+
+# Well-known coins that win over same-symbol tokens regardless of rank
+PRIORITY_NAMES: Dict[str, List[str]] = {
+    'btc': ['bitcoin'],
+    'eth': ['ethereum'],
+    'usdt': ['tether'],
+    'usdc': ['usd coin'],
+    'bnb': ['bnb'],
+    'xrp': ['xrp'],
+    'ada': ['cardano'],
+    'sol': ['solana'],
+    'doge': ['dogecoin'],
+    'dot': ['polkadot'],
+    'avax': ['avalanche'],
+    'matic': ['polygon'],
+    'link': ['chainlink'],
+    'uni': ['uniswap'],
+    'ltc': ['litecoin'],
+    'bch': ['bitcoin cash'],
+    'etc': ['ethereum classic'],
+    'xlm': ['stellar'],
+    'atom': ['cosmos'],
+    'near': ['near protocol']
+}
+
+
+class _IndexState:
+    """Process-wide copy of the index shared by every CoinIndex"""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        self.ids: Dict[str, List[str]] = {}
+        self.built_at = 0.0
+        self.checked_at = 0.0
+        self.rebuild_task: Optional[asyncio.Task] = None
+
+
+_state = _IndexState()
+
+
+def build_index(coins: List[Dict], market_ranks: Dict[str, int]) -> Dict[str, List[str]]:
+    """Group coins by symbol, ranked by priority name, market cap, list order"""
+    by_symbol: Dict[str, List[Tuple[Tuple[int, float, int], str]]] = defaultdict(list)
+    for position, coin in enumerate(coins):
+        symbol = coin["symbol"].lower()
+        priority = 0 if coin["name"].lower() in PRIORITY_NAMES.get(symbol, []) else 1
+        rank = market_ranks.get(coin["id"], float("inf"))
+        by_symbol[symbol].append(((priority, rank, position), coin["id"]))
+    return {
+        symbol: [coin_id for _, coin_id in sorted(candidates)]
+        for symbol, candidates in by_symbol.items()
+    }
+
+
+class CoinIndex:
+    """Symbol -> ranked CoinGecko ids, kept in memory and in a Redis hash.
+
+    The index is built from /coins/list once per crypto_index_ttl by a single
+    worker and shared through Redis; other workers load the hash when its
+    build timestamp changes. Lookups are dictionary reads once warm.
+    """
+
+    def __init__(self, redis_client: redis.Redis, http_clients: Optional[UpstreamClients] = None):
+        self.redis_client = redis_client
+        self.http_clients = http_clients or upstream_clients
+        self.base_url = "https://api.coingecko.com/api/v3"
+        self.api_key = settings.crypto_api_key_resolved
+        self.ttl = settings.crypto_index_ttl
+        self.check_interval = settings.crypto_index_check_interval
+
+    async def lookup(self, symbol: str) -> Optional[str]:
+        """Best matching coin id for symbol"""
+        ids = await self.candidates(symbol)
+        return ids[0] if ids else None
+
+    async def candidates(self, symbol: str) -> List[str]:
+        """All coin ids for symbol, best match first"""
+        await self._ensure_loaded()
+        return _state.ids.get(symbol.lower(), [])
+
+    async def warm(self, max_age: Optional[float] = None) -> None:
+        """Load the shared index, rebuilding it if missing or older than max_age"""
+        built_at = await self._load_from_redis()
+        if not _state.ids or time.time() - built_at > (max_age or self.ttl):
+            await self.refresh()
+
+    async def refresh(self) -> bool:
+        """Rebuild the index from CoinGecko and publish it to Redis"""
+        try:
+            acquired = await self.redis_client.set(
+                LEASE_KEY, "1", nx=True, px=int(settings.cache_lease_ttl * 1000))
+        except Exception as e:
+            logger.warning(f"Coin index lease unavailable, rebuilding anyway: {e}")
+            acquired = True
+        if not acquired:
+            return False
+
+        try:
+            coins = await self._fetch_coin_list()
+            ranks = await self._fetch_market_ranks()
+        except Exception:
+            await self._release_lease()
+            raise
+        ids = build_index(coins, ranks)
+        built_at = time.time()
+        _state.ids, _state.built_at, _state.checked_at = ids, built_at, built_at
+        logger.info(f"Built coin index: {len(ids)} symbols from {len(coins)} coins")
+
+        try:
+            # Build under a temporary key and RENAME so readers never see a partial hash
+            staging_key = f"{INDEX_KEY}:staging"
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.delete(staging_key)
+                pipe.hset(staging_key, mapping={
+                    symbol: ",".join(coin_ids) for symbol, coin_ids in ids.items()
+                })
+                pipe.rename(staging_key, INDEX_KEY)
+                pipe.set(BUILT_AT_KEY, repr(built_at))
+                pipe.delete(LEASE_KEY)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Error storing coin index: {e}")
+        return True
+
+    async def _release_lease(self) -> None:
+        try:
+            await self.redis_client.delete(LEASE_KEY)
+        except Exception as e:
+            logger.warning(f"Error releasing coin index lease: {e}")
+
+    async def invalidate(self) -> None:
+        """Drop the index; the next lookup rebuilds it"""
+        _state.clear()
+        await self.redis_client.delete(INDEX_KEY, BUILT_AT_KEY)
+
+    async def _ensure_loaded(self) -> None:
+        if _state.ids and time.time() - _state.checked_at < self.check_interval:
+            return
+        async with _state.lock:
+            if _state.ids and time.time() - _state.checked_at < self.check_interval:
+                return
+            _state.checked_at = time.time()
+            built_at = await self._load_from_redis()
+
+            if not _state.ids:
+                # Cold start: nothing to serve until the index exists
+                if not await self.refresh():
+                    await self._wait_for_build()
+            elif time.time() - built_at > self.ttl:
+                self._rebuild_in_background()
+
+    async def _load_from_redis(self) -> float:
+        """Load the shared index if it changed; returns its build timestamp"""
+        try:
+            raw = await self.redis_client.get(BUILT_AT_KEY)
+            if not raw:
+                return _state.built_at
+            built_at = float(raw)
+            if built_at != _state.built_at:
+                index = await self.redis_client.hgetall(INDEX_KEY)
+                if index:
+                    _state.ids = {
+                        _text(symbol): _text(coin_ids).split(",")
+                        for symbol, coin_ids in index.items()
+                    }
+                    _state.built_at = built_at
+                    logger.info(f"Loaded coin index: {len(index)} symbols")
+            return built_at
+        except Exception as e:
+            logger.warning(f"Error loading coin index from Redis: {e}")
+            return _state.built_at
+
+    async def _wait_for_build(self) -> None:
+        """Another worker holds the lease; poll for its index"""
+        deadline = time.monotonic() + settings.cache_lease_ttl
+        while not _state.ids and time.monotonic() < deadline:
+            await asyncio.sleep(0.25)
+            await self._load_from_redis()
+
+    def _rebuild_in_background(self) -> None:
+        if _state.rebuild_task is not None and not _state.rebuild_task.done():
+            return
+        _state.rebuild_task = asyncio.create_task(self.refresh())
+        _state.rebuild_task.add_done_callback(_log_rebuild_failure)
+
+    async def _fetch_coin_list(self) -> List[Dict]:
+        params = {}
+        if self.api_key:
+            params["x_cg_demo_api_key"] = self.api_key
+        async with self.http_clients.client("coingecko") as client:
+            response = await client.get(f"{self.base_url}/coins/list", params=params)
+            if response.status_code == 429:
+                logger.error("CoinGecko API rate limit exceeded")
+                raise Exception("API rate limit exceeded")
+            response.raise_for_status()
+            return response.json()
+
+    async def _fetch_market_ranks(self) -> Dict[str, int]:
+        """Market-cap rank of the top 250 coins; empty if unavailable"""
+        params = {
+            "vs_currency": "usd",
+            "order": "market_cap_desc",
+            "per_page": 250,
+            "page": 1
+        }
+        if self.api_key:
+            params["x_cg_demo_api_key"] = self.api_key
+        try:
+            async with self.http_clients.client("coingecko") as client:
+                response = await client.get(f"{self.base_url}/coins/markets", params=params)
+                response.raise_for_status()
+                return {
+                    coin["id"]: coin.get("market_cap_rank") or position + 1
+                    for position, coin in enumerate(response.json())
+                }
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning(f"Could not fetch market ranks for coin index: {e}")
+            return {}
+
+
+def _text(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _log_rebuild_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background coin index rebuild failed: {task.exception()}")
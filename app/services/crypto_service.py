@@ -1,36 +1,86 @@
 import httpx
 import redis.asyncio as redis
-import json
 import logging
-from typing import Dict, Optional, List
+import time
+import numpy as np
+from typing import Dict, Optional, List, Tuple
+from app.cache import TieredCache
 from app.config import settings
+from app.http_client import UpstreamClients, upstream_clients
+from app.ingest import log_writer
+from app.analytics import compute_indicators
+from app.downsample import downsample
+from app.rollups import get_rollup_history
+from app.series import (
+    append_segment, join_segments, prepend_segment, to_columns, to_rows, trim_segments)
+from app.services.coin_index import CoinIndex
+from app.synthetic import gbm_ohlcv, seed_for, time_bucket
 
 logger = logging.getLogger(__name__)
 
 
+# CoinGecko's market_chart point spacing by range length: name, longest
+# range in days (None: any), milliseconds between points, seconds fresh
+RESOLUTIONS: List[Tuple[str, Optional[int], int, int]] = [
+    ("5m", 1, 5 * 60 * 1000, 300),
+    ("1h", 90, 3600 * 1000, 3600),
+    ("1d", None, 86400 * 1000, 6 * 3600),
+]
+
+
+def history_resolution(days: str) -> Tuple[str, Optional[int], int, int]:
+    """Resolution CoinGecko answers a days range with"""
+    for resolution in RESOLUTIONS:
+        longest = resolution[1]
+        if longest is None or (days.isdigit() and int(days) <= longest):
+            return resolution
+    return RESOLUTIONS[-1]
+
+
+def history_ttl(days: str) -> int:
+    """Seconds to cache a market_chart range, by CoinGecko's point spacing"""
+    return history_resolution(days)[3]
+
+
+def window_start(days: str) -> Optional[int]:
+    """Oldest timestamp (ms) of a rolling range; None for max"""
+    if not days.isdigit():
+        return None
+    return int(time.time() * 1000) - int(days) * 86400 * 1000
+
+
+def series_covers(series: Dict, days: str) -> bool:
+    """Whether a cached series reaches back as far as a days range"""
+    if not series.get("days", "").isdigit():
+        return True
+    return days.isdigit() and int(days) <= int(series["days"])
+
+
 class CryptoService:
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, http_clients: Optional[UpstreamClients] = None):
         self.redis_client = redis_client
+        self.http_clients = http_clients or upstream_clients
+        self.cache = TieredCache(redis_client, namespace="crypto_prices", publish=True)
+        self.coin_index = CoinIndex(redis_client, self.http_clients)
+        self.history_cache = TieredCache(redis_client, namespace="crypto_history")
+        self.analytics_cache = TieredCache(redis_client, namespace="crypto_analytics")
         self.base_url = "https://api.coingecko.com/api/v3"
-        self.cache_key = "crypto_prices"
         self.cache_ttl = 60  # 1 minute in seconds
+        self.stale_ttl = 3600  # serve stale for up to 1 hour while refreshing
+        # Every top_n is sliced from one cached snapshot of this many coins
+        self.snapshot_size = 100
+        self.snapshot_key = "snapshot"
         self.api_key = settings.crypto_api_key_resolved
 
     async def get_crypto_prices(self, top_n: int = 50) -> List[Dict]:
-        """Get top N crypto prices with Redis caching"""
+        """Get top N crypto prices, sliced from the cached market snapshot"""
         try:
-            # Check cache first
-            cached_data = await self._get_from_cache(top_n)
-            if cached_data:
-                logger.info("Returning cached crypto prices")
-                return cached_data
-
-            # Fetch from API
-            prices = await self._fetch_from_api(top_n)
-            if prices:
-                # Cache the response
-                await self._cache_prices(prices, top_n)
-                return prices
+            # Serve from cache (stale values trigger a background refresh),
+            # coalescing concurrent misses into a single API fetch
+            snapshot = await self.cache.fetch(
+                self.snapshot_key, self._refresh_prices)
+            if snapshot:
+                return snapshot[:top_n]
             else:
                 # Return cached data even if expired as fallback
                 cached_data = await self._get_from_cache(top_n, ignore_expiry=True)
@@ -48,41 +98,49 @@ class CryptoService:
                 return cached_data
             raise
 
+    async def refresh(self) -> int:
+        """Re-fetch the market snapshot over the cached one; returns keys refreshed"""
+        prices = await self.cache.single_flight(self.snapshot_key, self._refresh_prices)
+        if not prices:
+            raise Exception("API unavailable")
+        return 1
+
     async def _get_from_cache(self, top_n: int, ignore_expiry: bool = False) -> Optional[List[Dict]]:
-        """Get prices from Redis cache"""
+        """Get the top N prices from the cached snapshot"""
         try:
-            cache_key = f"{self.cache_key}:{top_n}"
-            cached = await self.redis_client.get(cache_key)
-            if cached:
-                data = json.loads(cached)
+            data = await self.cache.get(self.snapshot_key, allow_stale=ignore_expiry)
+            if data:
                 logger.info("Retrieved crypto prices from cache")
-                return data
+                return data[:top_n]
             return None
         except Exception as e:
             logger.error(f"Error reading from cache: {e}")
             return None
 
-    async def _cache_prices(self, prices: List[Dict], top_n: int) -> None:
-        """Cache prices in Redis"""
+    async def _cache_prices(self, prices: List[Dict]) -> None:
+        """Cache the market snapshot"""
         try:
-            cache_key = f"{self.cache_key}:{top_n}"
-            await self.redis_client.setex(
-                cache_key,
-                self.cache_ttl,
-                json.dumps(prices)
-            )
+            await self.cache.set(self.snapshot_key, prices, self.cache_ttl, self.stale_ttl)
             logger.info("Cached crypto prices")
         except Exception as e:
             logger.error(f"Error caching prices: {e}")
 
-    async def _fetch_from_api(self, top_n: int) -> Optional[List[Dict]]:
-        """Fetch top N prices from CoinGecko API"""
+    async def _refresh_prices(self) -> Optional[List[Dict]]:
+        """Fetch the market snapshot from the API and cache it"""
+        prices = await self._fetch_from_api()
+        if prices:
+            await self._cache_prices(prices)
+            log_writer.offer_prices("crypto", {p["symbol"]: p["price"] for p in prices if p["price"] is not None})
+        return prices
+
+    async def _fetch_from_api(self) -> Optional[List[Dict]]:
+        """Fetch the top snapshot_size coins by market cap from CoinGecko API"""
         try:
             url = f"{self.base_url}/coins/markets"
             params = {
                 "vs_currency": "usd",
                 "order": "market_cap_desc",
-                "per_page": top_n,
+                "per_page": self.snapshot_size,
                 "page": 1,
                 "sparkline": "false"
             }
@@ -91,7 +149,7 @@ class CryptoService:
             if self.api_key:
                 params["x_cg_demo_api_key"] = self.api_key
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with self.http_clients.client("coingecko") as client:
                 response = await client.get(url, params=params)
 
                 if response.status_code == 429:
@@ -126,18 +184,24 @@ class CryptoService:
             return None
 
     async def get_mock_historical_data(self, symbol: str, days: str = "1") -> Dict:
-        """Generate mock historical data for testing/demo purposes"""
-        import time
-        import random
+        """Generate mock historical data for testing/demo purposes.
 
+        Prices are a random walk seeded by symbol, range and the current
+        point slot, so repeated calls agree until the next point is due.
+        """
         # Convert days to number of data points
         days_int = int(days) if days.isdigit() else 1
         if days == "max":
             days_int = 365
+        num_points = min(days_int * 24, 100)  # Max 100 data points
+        if not num_points:
+            return {"prices": []}
 
-        # Generate timestamps
-        end_time = int(time.time() * 1000)  # Current time in milliseconds
-        start_time = end_time - (days_int * 24 * 60 * 60 * 1000)  # days ago
+        # Generate timestamps, aligned to whole steps
+        span = days_int * 24 * 60 * 60 * 1000  # days in milliseconds
+        step = span // num_points
+        end_time = time_bucket(time.time() * 1000, step)
+        start_time = end_time - span
 
         # Generate mock price data with some realistic variation
         base_price = 50000  # Base price for crypto
@@ -150,40 +214,189 @@ class CryptoService:
         elif symbol.upper() in ["BNB"]:
             base_price = 600
 
-        prices = []
-        current_price = base_price
-
-        for i in range(min(days_int * 24, 100)):  # Max 100 data points
-            timestamp = start_time + \
-                (i * (end_time - start_time) // min(days_int * 24, 100))
-
-            # Add some random variation
-            variation = random.uniform(-0.05, 0.05)  # ±5% variation
-            current_price = current_price * (1 + variation)
-
-            prices.append({
-                "timestamp": timestamp,
-                "price": round(current_price, 2)
-            })
+        candles = gbm_ohlcv(
+            seed_for(symbol.upper(), days, start_time), start_time, step, num_points, base_price,
+            volatility=0.03)
+        prices = to_rows({
+            "t": candles["t"].tolist(),
+            "p": np.round(candles["c"], 2).tolist()
+        })
 
         logger.info(
             f"Generated mock historical data for {symbol} ({days} days)")
         return {"prices": prices}
 
-    async def get_crypto_historical_data(self, coin_id: str, days: str = "1") -> Optional[Dict]:
-        """Get historical price data for a cryptocurrency"""
+    async def get_rollup_historical_data(self, symbol: str, days: str = "1", columnar: bool = False,
+                                         max_points: Optional[int] = None) -> Optional[Dict]:
+        """Historical candles from our own price_logs rollups, if they cover the range"""
+        if not days.isdigit():
+            return None
+        candles = await get_rollup_history("crypto", symbol, int(days) * 86400)
+        if candles is None:
+            return None
+        columns = to_columns([{**candle, "price": candle["close"]} for candle in candles])
+        if max_points:
+            columns = downsample(columns, max_points)
+        if columnar:
+            return {**columns, "source": "rollups"}
+        return {"prices": to_rows(columns), "source": "rollups"}
+
+    async def get_crypto_historical_data(self, coin_id: str, days: str = "1", columnar: bool = False,
+                                         max_points: Optional[int] = None) -> Optional[Dict]:
+        """Get historical price data for a cryptocurrency.
+
+        One series is cached per (coin_id, resolution), covering the longest
+        range requested at that resolution; shorter ranges are sliced from it
+        and longer ones only fetch the missing head. Series are append-only
+        segments of {"t": [...], "p": [...]} arrays (see
+        _refresh_historical_data); with columnar the joined arrays are
+        returned, otherwise {"prices": [{timestamp, price}]}. With max_points
+        the LTTB-downsampled series is cached under its own key.
+        """
+        if max_points:
+            key = f"{coin_id}:{days}:{max_points}"
+            columns = await self.history_cache.fetch(
+                key, lambda: self._refresh_downsampled_data(coin_id, days, max_points))
+        else:
+            key = self._history_key(coin_id, days)
+            series = await self.history_cache.fetch(
+                key, lambda: self._refresh_historical_data(coin_id, days))
+            if series and not series_covers(series, days):
+                # Own flight key: a stale hit may have started a tail refresh under
+                # key, and joining it would return the narrower series
+                series = await self.history_cache.single_flight(
+                    f"{key}:extend", lambda: self._extend_historical_data(coin_id, days))
+            # Cut the series to the window; stale ones are served while they refresh
+            columns = join_segments(series["segments"], window_start(days)) if series else None
+        if not columns or columnar:
+            return columns
+        return {"prices": to_rows(columns)}
+
+    async def get_analytics(self, symbol: str, coin_id: str, days: str, indicators: List[str],
+                            window: int) -> Optional[Dict]:
+        """Technical indicators over the historical series, cached per (coin, days, indicators, window)"""
+        key = f"{coin_id}:{days}:{','.join(indicators)}:{window}"
+        return await self.analytics_cache.fetch(
+            key, lambda: self._refresh_analytics(key, symbol, coin_id, days, indicators, window))
+
+    async def _refresh_analytics(self, key: str, symbol: str, coin_id: str, days: str,
+                                 indicators: List[str], window: int) -> Optional[Dict]:
+        columns = await self.get_rollup_historical_data(symbol, days, columnar=True)
+        if not columns:
+            columns = await self.get_crypto_historical_data(coin_id, days, columnar=True)
+        if not columns or not columns.get("t"):
+            return None
+        result = compute_indicators(columns["t"], columns["p"], indicators, window)
+        ttl = history_ttl(days)
+        try:
+            await self.analytics_cache.set(key, result, ttl, ttl * 4)
+        except Exception as e:
+            logger.error(f"Error caching analytics for {coin_id}: {e}")
+        return result
+
+    def _history_key(self, coin_id: str, days: str) -> str:
+        return f"{coin_id}:{history_resolution(days)[0]}"
+
+    async def _cached_series(self, key: str) -> Optional[Dict]:
+        series = await self.history_cache.get(key, allow_stale=True)
+        if isinstance(series, dict) and series.get("segments") and series["segments"][-1]["t"]:
+            return series
+        return None
+
+    async def _store_series(self, coin_id: str, days: str, series: Dict) -> None:
+        ttl = history_ttl(days)
         try:
-            url = f"{self.base_url}/coins/{coin_id}/market_chart"
+            await self.history_cache.set(self._history_key(coin_id, days), series, ttl, ttl * 4)
+        except Exception as e:
+            logger.error(f"Error caching historical data for {coin_id}: {e}")
+
+    async def _refresh_downsampled_data(self, coin_id: str, days: str, max_points: int) -> Optional[Dict]:
+        """Downsample the cached full range and cache the result"""
+        columns = await self.get_crypto_historical_data(coin_id, days, columnar=True)
+        if not columns:
+            return columns
+        reduced = downsample(columns, max_points)
+        ttl = history_ttl(days)
+        try:
+            await self.history_cache.set(f"{coin_id}:{days}:{max_points}", reduced, ttl, ttl * 4)
+        except Exception as e:
+            logger.error(f"Error caching downsampled data for {coin_id}: {e}")
+        return reduced
+
+    async def _refresh_historical_data(self, coin_id: str, days: str) -> Optional[Dict]:
+        """Bring a cached series up to date and cache it.
+
+        Only the points after the last cached one are fetched and appended as
+        a new segment; points that left the series' rolling window are
+        trimmed from the head. The full range is fetched when nothing usable
+        is cached.
+        """
+        previous = await self._cached_series(self._history_key(coin_id, days))
+        if previous is not None:
+            days = previous["days"]
+        start = window_start(days)
+        last = previous["segments"][-1]["t"][-1] if previous else None
+
+        if last is not None and (start is None or last >= start):
+            tail = await self._fetch_history_range(coin_id, last // 1000 + 1, int(time.time()))
+            if tail is None:
+                return previous
+            segments = append_segment(previous["segments"], tail, history_resolution(days)[2])
+        else:
+            data = await self._fetch_historical_from_api(coin_id, days)
+            if not data:
+                return None
+            segments = [data]
+
+        series = {"days": days, "segments": trim_segments(segments, start, settings.history_max_segments)}
+        await self._store_series(coin_id, days, series)
+        return series
+
+    async def _extend_historical_data(self, coin_id: str, days: str) -> Optional[Dict]:
+        """Widen a cached series to days by fetching only the missing head"""
+        previous = await self._cached_series(self._history_key(coin_id, days))
+        if previous is None:
+            return await self._refresh_historical_data(coin_id, days)
+        if series_covers(previous, days):
+            return previous  # another request widened it meanwhile
+
+        first = previous["segments"][0]["t"][0]
+        start = window_start(days)
+        if start is None:
+            head = await self._fetch_historical_from_api(coin_id, days)
+        else:
+            head = await self._fetch_history_range(coin_id, start // 1000, first // 1000)
+        if not head:
+            return previous
+
+        segments = prepend_segment(previous["segments"], head, history_resolution(days)[2])
+        series = {"days": days, "segments": trim_segments(segments, start, settings.history_max_segments)}
+        await self._store_series(coin_id, days, series)
+        return series
+
+    async def _fetch_historical_from_api(self, coin_id: str, days: str) -> Optional[Dict]:
+        """Get historical price data for a cryptocurrency from CoinGecko"""
+        return await self._fetch_market_chart(coin_id, "market_chart", {"days": days}, f"{days} days")
+
+    async def _fetch_history_range(self, coin_id: str, start: int, end: int) -> Optional[Dict]:
+        """Prices between two unix times (seconds) from CoinGecko"""
+        return await self._fetch_market_chart(
+            coin_id, "market_chart/range", {"from": start, "to": end}, f"since {start}")
+
+    async def _fetch_market_chart(self, coin_id: str, path: str, range_params: Dict,
+                                  description: str) -> Optional[Dict]:
+        try:
+            url = f"{self.base_url}/coins/{coin_id}/{path}"
             params = {
                 "vs_currency": "usd",
-                "days": days
+                **range_params
             }
 
             # Add API key if available
             if self.api_key:
                 params["x_cg_demo_api_key"] = self.api_key
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with self.http_clients.client("coingecko") as client:
                 response = await client.get(url, params=params)
 
                 if response.status_code == 429:
@@ -193,20 +406,15 @@ class CryptoService:
                 response.raise_for_status()
                 data = response.json()
 
-                # Extract prices and format them
+                # Keep CoinGecko's [timestamp, price] pairs as two arrays
                 prices = data.get("prices", [])
                 formatted_data = {
-                    "prices": [
-                        {
-                            "timestamp": price[0],
-                            "price": price[1]
-                        }
-                        for price in prices
-                    ]
+                    "t": [price[0] for price in prices],
+                    "p": [price[1] for price in prices]
                 }
 
                 logger.info(
-                    f"Fetched historical data for {coin_id} ({days} days)")
+                    f"Fetched historical data for {coin_id} ({description})")
                 return formatted_data
 
         except httpx.TimeoutException:
@@ -225,116 +433,14 @@ class CryptoService:
             return None
 
     async def get_crypto_id(self, symbol: str) -> Optional[str]:
-        """Get CoinGecko coin ID from symbol with caching"""
+        """Get CoinGecko coin ID from symbol via the shared coin index"""
         try:
-            logger.info(f"Looking up coin ID for symbol: {symbol}")
-
-            # Check cache first
-            cache_key = f"crypto_id:{symbol.lower()}"
-            try:
-                cached_id = await self.redis_client.get(cache_key)
-                if cached_id:
-                    logger.info(
-                        f"Found cached ID for {symbol}: {cached_id.decode('utf-8')}")
-                    return cached_id.decode('utf-8')
-            except Exception as e:
-                logger.warning(f"Redis cache check failed: {e}")
-
-            # Fetch from API
-            url = f"{self.base_url}/coins/list"
-            params = {}
-
-            # Add API key if available
-            if self.api_key:
-                params["x_cg_demo_api_key"] = self.api_key
-                logger.info(f"Using API key for coin list request")
-            else:
-                logger.warning("No API key available for coin list request")
-
-            logger.info(f"Fetching coin list from: {url}")
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-
-                if response.status_code == 429:
-                    logger.error("CoinGecko API rate limit exceeded")
-                    raise Exception("API rate limit exceeded")
-
-                response.raise_for_status()
-                coins = response.json()
-                logger.info(f"Received {len(coins)} coins from API")
-
-                # Find coin by symbol (case insensitive)
-                matching_coins = []
-                for coin in coins:
-                    if coin["symbol"].lower() == symbol.lower():
-                        matching_coins.append(coin)
-
-                if not matching_coins:
-                    logger.warning(f"No coin found for symbol: {symbol}")
-                    return None
-
-                # If multiple matches, prioritize well-known coins
-                if len(matching_coins) > 1:
-                    logger.info(
-                        f"Found {len(matching_coins)} coins for symbol {symbol}")
-
-                    # Define priority names for common symbols
-                    priority_names = {
-                        'btc': ['bitcoin'],
-                        'eth': ['ethereum'],
-                        'usdt': ['tether'],
-                        'usdc': ['usd coin'],
-                        'bnb': ['bnb'],
-                        'xrp': ['xrp'],
-                        'ada': ['cardano'],
-                        'sol': ['solana'],
-                        'doge': ['dogecoin'],
-                        'dot': ['polkadot'],
-                        'avax': ['avalanche'],
-                        'matic': ['polygon'],
-                        'link': ['chainlink'],
-                        'uni': ['uniswap'],
-                        'ltc': ['litecoin'],
-                        'bch': ['bitcoin cash'],
-                        'etc': ['ethereum classic'],
-                        'xlm': ['stellar'],
-                        'atom': ['cosmos'],
-                        'near': ['near protocol']
-                    }
-
-                    # Try to find the priority coin
-                    priority_names_list = priority_names.get(
-                        symbol.lower(), [])
-                    for coin in matching_coins:
-                        if coin["name"].lower() in priority_names_list:
-                            logger.info(
-                                f"Found priority coin for {symbol}: {coin['id']} ({coin['name']})")
-                            # Cache the result for 1 hour
-                            try:
-                                await self.redis_client.setex(cache_key, 3600, coin["id"])
-                                logger.info(f"Cached coin ID for {symbol}")
-                            except Exception as e:
-                                logger.warning(f"Failed to cache coin ID: {e}")
-                            return coin["id"]
-
-                    # If no priority match, log all matches and return the first one
-                    logger.warning(
-                        f"No priority match found for {symbol}. All matches:")
-                    for coin in matching_coins:
-                        logger.warning(f"  - {coin['id']} ({coin['name']})")
-
-                # Return the first (or only) match
-                selected_coin = matching_coins[0]
-                logger.info(
-                    f"Selected coin for {symbol}: {selected_coin['id']} ({selected_coin['name']})")
-
-                # Cache the result for 1 hour
-                try:
-                    await self.redis_client.setex(cache_key, 3600, selected_coin["id"])
-                    logger.info(f"Cached coin ID for {symbol}")
-                except Exception as e:
-                    logger.warning(f"Failed to cache coin ID: {e}")
-                return selected_coin["id"]
+            coin_id = await self.coin_index.lookup(symbol)
+            if not coin_id:
+                logger.warning(f"No coin found for symbol: {symbol}")
+                return None
+            logger.info(f"Resolved coin ID for {symbol}: {coin_id}")
+            return coin_id
 
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 429:
@@ -350,15 +456,11 @@ class CryptoService:
     async def clear_cache(self) -> None:
         """Clear all crypto-related cache"""
         try:
-            # Clear price cache
-            keys = await self.redis_client.keys(f"{self.cache_key}:*")
-            if keys:
-                await self.redis_client.delete(*keys)
-
-            # Clear ID cache
-            id_keys = await self.redis_client.keys("crypto_id:*")
-            if id_keys:
-                await self.redis_client.delete(*id_keys)
+            # Bump namespace generations; orphaned keys age out via TTL
+            await self.cache.invalidate()
+            await self.history_cache.invalidate()
+            await self.analytics_cache.invalidate()
+            await self.coin_index.invalidate()
 
             logger.info("Cleared crypto cache")
         except Exception as e:
@@ -367,9 +469,7 @@ class CryptoService:
     async def clear_id_cache(self) -> None:
         """Clear crypto ID cache only"""
         try:
-            keys = await self.redis_client.keys("crypto_id:*")
-            if keys:
-                await self.redis_client.delete(*keys)
+            await self.coin_index.invalidate()
             logger.info("Cleared crypto ID cache")
         except Exception as e:
             logger.error(f"Error clearing ID cache: {e}")
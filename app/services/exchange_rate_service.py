@@ -1,28 +1,29 @@
-import httpx
 import redis.asyncio as redis
 import logging
 from typing import Dict, Optional
+from app.cache import TieredCache
 from app.config import settings
+from app.http_client import UpstreamClients, upstream_clients
 
 logger = logging.getLogger(__name__)
 
 
 class ExchangeRateService:
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, http_clients: Optional[UpstreamClients] = None):
         self.redis_client = redis_client
+        self.http_clients = http_clients or upstream_clients
+        self.cache = TieredCache(redis_client, namespace="exchange", publish=True)
         self.cache_ttl = 21600  # 6 hours in seconds
+        self.stale_ttl = 172800  # serve stale for up to 2 days while refreshing
         self.api_key = settings.exchange_api_key
 
     async def get_usd_rates(self) -> Dict[str, float]:
-        cache_key = "exchange:usd_rates"
-        # Try cache first
-        cached = await self._get_from_cache(cache_key)
-        if cached:
-            return cached
-        # Fetch from API
-        rates = await self._fetch_from_api()
+        cache_key = "usd_rates"
+        # Serve from cache (stale values trigger a background refresh),
+        # coalescing concurrent misses into a single API fetch
+        rates = await self.cache.fetch(
+            cache_key, lambda: self._refresh_rates(cache_key))
         if rates:
-            await self._cache_rates(cache_key, rates)
             return rates
         # Fallback: return stale cache if available
         cached = await self._get_from_cache(cache_key, ignore_expiry=True)
@@ -33,31 +34,41 @@ class ExchangeRateService:
             "API failed and no cache available, returning empty rates")
         return {}
 
+    async def refresh(self) -> int:
+        """Re-fetch USD rates over the cached ones; returns keys refreshed"""
+        cache_key = "usd_rates"
+        rates = await self.cache.single_flight(
+            cache_key, lambda: self._refresh_rates(cache_key))
+        if not rates:
+            raise Exception("API unavailable")
+        return 1
+
     async def _get_from_cache(self, cache_key: str, ignore_expiry: bool = False) -> Optional[Dict[str, float]]:
         try:
-            cached = await self.redis_client.get(cache_key)
-            if cached:
-                import json
-                return json.loads(cached)
-            return None
+            return await self.cache.get(cache_key, allow_stale=ignore_expiry)
         except Exception as e:
             logger.error(f"Error reading from cache: {e}")
             return None
 
     async def _cache_rates(self, cache_key: str, rates: Dict[str, float]):
         try:
-            import json
-            await self.redis_client.setex(cache_key, self.cache_ttl, json.dumps(rates))
+            await self.cache.set(cache_key, rates, self.cache_ttl, self.stale_ttl)
         except Exception as e:
             logger.error(f"Error caching exchange rates: {e}")
 
+    async def _refresh_rates(self, cache_key: str) -> Optional[Dict[str, float]]:
+        rates = await self._fetch_from_api()
+        if rates:
+            await self._cache_rates(cache_key, rates)
+        return rates
+
     async def _fetch_from_api(self) -> Optional[Dict[str, float]]:
         if not self.api_key:
             logger.error("ExchangeRate-API key not configured")
             return None
         url = f"https://v6.exchangerate-api.com/v6/{self.api_key}/latest/USD"
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with self.http_clients.client("exchangerate") as client:
                 resp = await client.get(url)
                 if resp.status_code == 429:
                     logger.error("ExchangeRate-API rate limit exceeded")
@@ -72,3 +83,11 @@ class ExchangeRateService:
         except Exception as e:
             logger.error(f"ExchangeRate-API error: {e}")
             return None
+
+    async def clear_cache(self) -> None:
+        """Invalidate all exchange rate cache entries in O(1)"""
+        try:
+            await self.cache.invalidate()
+            logger.info("Cleared exchange rate cache")
+        except Exception as e:
+            logger.error(f"Error clearing cache: {e}")
@@ -1,6 +1,7 @@
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import insert
+from app.ingest import LogWriter, log_writer
 from app.models.logs import PriceLog, NewsLog
 from typing import Optional
 
@@ -8,8 +9,16 @@ logger = logging.getLogger(__name__)
 
 
 class DatabaseLogger:
-    def __init__(self, db_session: AsyncSession):
+    """Writes price and news logs.
+
+    While the write-behind LogWriter is running (started with the app),
+    single rows are queued and written in batches; otherwise each call
+    commits on db_session.
+    """
+
+    def __init__(self, db_session: AsyncSession, writer: Optional[LogWriter] = None):
         self.db_session = db_session
+        self.writer = writer or log_writer
 
     async def log_price_data(self, source: str, symbol: str, value: float) -> bool:
         """
@@ -21,8 +30,10 @@ class DatabaseLogger:
             value: Price value
 
         Returns:
-            bool: True if logged successfully, False otherwise
+            bool: True if logged (or queued) successfully, False otherwise
         """
+        if self.writer.running:
+            return await self.writer.log_price(source, symbol, value)
         try:
             # Create price log entry
             price_log = PriceLog(
@@ -52,8 +63,10 @@ class DatabaseLogger:
             url: News article URL
 
         Returns:
-            bool: True if logged successfully, False otherwise
+            bool: True if logged (or queued) successfully, False otherwise
         """
+        if self.writer.running:
+            return await self.writer.log_news(title, source, url)
         try:
             # Create news log entry
             news_log = NewsLog(
@@ -1,28 +1,29 @@
-import httpx
 import redis.asyncio as redis
 import logging
-from typing import List, Dict, Optional
+from typing import Awaitable, Callable, List, Dict, Optional
+from app.cache import TieredCache
 from app.config import settings
+from app.http_client import UpstreamClients, upstream_clients
 
 logger = logging.getLogger(__name__)
 
 
 class NewsService:
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, http_clients: Optional[UpstreamClients] = None):
         self.redis_client = redis_client
+        self.http_clients = http_clients or upstream_clients
+        self.cache = TieredCache(redis_client, namespace="news", publish=True)
         self.cache_ttl = 900  # 15 minutes
+        self.stale_ttl = 24 * 3600  # serve stale for up to 1 day while refreshing
         self.api_key = settings.news_api_key
 
     async def get_top_headlines(self) -> List[Dict]:
-        cache_key = "news:top_headlines"
-        # Try cache first
-        cached = await self._get_from_cache(cache_key)
-        if cached:
-            return cached
-        # Fetch from API
-        headlines = await self._fetch_from_api()
+        cache_key = "top_headlines"
+        # Serve from cache (stale values trigger a background refresh),
+        # coalescing concurrent misses into a single API fetch
+        headlines = await self.cache.fetch(
+            cache_key, lambda: self._refresh_headlines(cache_key, self._fetch_from_api))
         if headlines:
-            await self._cache_headlines(cache_key, headlines)
             return headlines
         # Fallback: return stale cache if available
         cached = await self._get_from_cache(cache_key, ignore_expiry=True)
@@ -36,15 +37,14 @@ class NewsService:
 
     async def get_news_by_category(self, category: str) -> List[Dict]:
         """Get news articles by category"""
-        cache_key = f"news:category:{category}"
-        # Try cache first
-        cached = await self._get_from_cache(cache_key)
-        if cached:
-            return cached
-        # Fetch from API
-        headlines = await self._fetch_from_api_by_category(category)
+        cache_key = f"category:{category}"
+        # Serve from cache (stale values trigger a background refresh),
+        # coalescing concurrent misses into a single API fetch
+        headlines = await self.cache.fetch(
+            cache_key, lambda: self._refresh_headlines(
+                cache_key, lambda: self._fetch_from_api_by_category(category)),
+            track=True)
         if headlines:
-            await self._cache_headlines(cache_key, headlines)
             return headlines
         # Fallback: return stale cache if available
         cached = await self._get_from_cache(cache_key, ignore_expiry=True)
@@ -57,24 +57,37 @@ class NewsService:
             f"API failed and no cache available for {category}, returning empty headlines")
         return []
 
+    async def refresh_hot(self, limit: int) -> int:
+        """Re-fetch top headlines and the most requested categories"""
+        refreshers = {
+            "top_headlines": lambda: self._refresh_headlines("top_headlines", self._fetch_from_api)
+        }
+        for key in await self.cache.hot_keys(limit) if limit else []:
+            category = key.split(":", 1)[1]
+            refreshers[key] = lambda key=key, category=category: self._refresh_headlines(
+                key, lambda: self._fetch_from_api_by_category(category))
+        return await self.cache.refresh_many(refreshers)
+
     async def _get_from_cache(self, cache_key: str, ignore_expiry: bool = False) -> Optional[List[Dict]]:
         try:
-            cached = await self.redis_client.get(cache_key)
-            if cached:
-                import json
-                return json.loads(cached)
-            return None
+            return await self.cache.get(cache_key, allow_stale=ignore_expiry)
         except Exception as e:
             logger.error(f"Error reading from cache: {e}")
             return None
 
     async def _cache_headlines(self, cache_key: str, headlines: List[Dict]):
         try:
-            import json
-            await self.redis_client.setex(cache_key, self.cache_ttl, json.dumps(headlines))
+            await self.cache.set(cache_key, headlines, self.cache_ttl, self.stale_ttl)
         except Exception as e:
             logger.error(f"Error caching news: {e}")
 
+    async def _refresh_headlines(
+            self, cache_key: str, fetch: Callable[[], Awaitable[Optional[List[Dict]]]]) -> Optional[List[Dict]]:
+        headlines = await fetch()
+        if headlines:
+            await self._cache_headlines(cache_key, headlines)
+        return headlines
+
     async def _fetch_from_api(self) -> Optional[List[Dict]]:
         if not self.api_key:
             logger.error("GNews API key not configured")
@@ -82,7 +95,7 @@ class NewsService:
         url = "https://gnews.io/api/v4/top-headlines"
         params = {"lang": "en", "token": self.api_key}
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with self.http_clients.client("gnews") as client:
                 resp = await client.get(url, params=params)
                 if resp.status_code == 429:
                     logger.error("GNews API rate limit exceeded")
@@ -130,7 +143,7 @@ class NewsService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with self.http_clients.client("gnews") as client:
                 resp = await client.get(url, params=params)
                 if resp.status_code == 429:
                     logger.error("GNews API rate limit exceeded")
@@ -161,3 +174,11 @@ class NewsService:
         except Exception as e:
             logger.error(f"GNews API error for category {category}: {e}")
             return None
+
+    async def clear_cache(self) -> None:
+        """Invalidate all news cache entries in O(1)"""
+        try:
+            await self.cache.invalidate()
+            logger.info("Cleared news cache")
+        except Exception as e:
+            logger.error(f"Error clearing cache: {e}")
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+import redis.asyncio as redis
+from app.config import settings
+from app.http_client import UpstreamClients, upstream_clients
+from app.services.crypto_service import CryptoService
+from app.services.stocks_service import StocksService
+from app.services.weather_service import WeatherService
+from app.services.news_service import NewsService
+from app.services.exchange_rate_service import ExchangeRateService
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshService:
+    """Refreshes every service's cached data concurrently.
+
+    Fresh values are written over the cached ones, so readers keep being
+    served throughout. Each service gets its own deadline; a service that
+    misses it is reported as a timeout, but its refresh is shielded from
+    the deadline and still completes and writes to the cache in the
+    background.
+    """
+
+    def __init__(self, redis_client: redis.Redis, http_clients: Optional[UpstreamClients] = None):
+        http_clients = http_clients or upstream_clients
+        limit = settings.refresh_hot_limit
+        self.timeout = settings.refresh_timeout
+        self.jobs: Dict[str, Callable[[], Awaitable[int]]] = {
+            "crypto": CryptoService(redis_client, http_clients).refresh,
+            "stocks": lambda: StocksService(redis_client, http_clients).refresh_hot(limit),
+            "weather": lambda: WeatherService(redis_client, http_clients).refresh_hot(limit),
+            "news": lambda: NewsService(redis_client, http_clients).refresh_hot(
+                settings.news_hot_limit),
+            "exchange": ExchangeRateService(redis_client, http_clients).refresh,
+        }
+
+    async def refresh_all(self) -> Dict[str, Dict]:
+        """Run every refresh job; returns status, keys and timing per service"""
+        results = await asyncio.gather(*(self._run(job) for job in self.jobs.values()))
+        return dict(zip(self.jobs, results))
+
+    async def _run(self, job: Callable[[], Awaitable[int]]) -> Dict:
+        started = time.perf_counter()
+        task = asyncio.ensure_future(job())
+        task.add_done_callback(_log_late_failure)
+        try:
+            keys = await asyncio.wait_for(asyncio.shield(task), self.timeout)
+            result = {"status": "success", "keys": keys}
+        except asyncio.TimeoutError:
+            result = {"status": "timeout", "error": f"No response within {self.timeout}s"}
+        except Exception as e:
+            result = {"status": "error", "error": str(e)}
+        result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+
+def _log_late_failure(task: asyncio.Task) -> None:
+    # Retrieves the exception so refreshes failing after their deadline are logged
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Refresh failed: {task.exception()}")
@@ -1,18 +1,48 @@
 import httpx
 import redis.asyncio as redis
-import json
 import logging
 import asyncio
-from typing import Optional, Dict
+import numpy as np
+from typing import Optional, Dict, List, Tuple
+from app.cache import TieredCache
 from app.config import settings
+from app.http_client import UpstreamClients, upstream_clients
+from app.ingest import log_writer
+from app.analytics import compute_indicators
+from app.downsample import downsample
+from app.rollups import get_rollup_history
+from app.series import FIELDS, to_columns, to_rows
+from app.synthetic import gbm_ohlcv, seed_for, time_bucket
 
 logger = logging.getLogger(__name__)
 
+# Historical chart periods in seconds
+PERIODS = {
+    "1H": 60 * 60,  # 1 hour
+    "1D": 24 * 60 * 60,  # 1 day
+    "1W": 7 * 24 * 60 * 60,  # 1 week
+    "1M": 30 * 24 * 60 * 60,  # 1 month
+    "3M": 90 * 24 * 60 * 60,  # 3 months
+    "1Y": 365 * 24 * 60 * 60,  # 1 year
+    "5Y": 5 * 365 * 24 * 60 * 60,  # 5 years
+}
+
+
+def _with_rows(data: Dict) -> Dict:
+    """Columnar history as {..., "prices": [{timestamp, open, ...}]}"""
+    columns = {name: value for name, value in data.items() if name in FIELDS}
+    return {**{name: value for name, value in data.items() if name not in FIELDS}, "prices": to_rows(columns)}
+
 
 class StocksService:
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, http_clients: Optional[UpstreamClients] = None):
         self.redis_client = redis_client
+        self.http_clients = http_clients or upstream_clients
+        self.cache = TieredCache(redis_client, namespace="stock_price", publish=True)
+        self.history_cache = TieredCache(redis_client, namespace="stock_history")
+        self.analytics_cache = TieredCache(redis_client, namespace="stock_analytics")
         self.cache_ttl = 60  # 1 minute
+        self.stale_ttl = 3600  # serve stale for up to 1 hour while refreshing
         # Use resolved API key
         self.finnhub_key = settings.stocks_api_key_resolved
 
@@ -20,16 +50,13 @@ class StocksService:
         if not symbol:
             raise ValueError("Missing symbol parameter")
         symbol = symbol.upper()
-        cache_key = f"stock_price:{symbol}"
-        # Try cache first
-        cached = await self._get_from_cache(cache_key)
-        if cached is not None:
-            return cached
-        # Fetch from API
-        price = await self._fetch_from_api(symbol)
+        cache_key = symbol
+        # Serve from cache (stale values trigger a background refresh),
+        # coalescing concurrent misses into a single API fetch
+        price = await self.cache.fetch(
+            cache_key, lambda: self._refresh_price(cache_key, symbol), track=True)
         if price is not None:
-            await self._cache_price(cache_key, price)
-            return price
+            return float(price)
         # Fallback: return stale cache if available
         cached = await self._get_from_cache(cache_key, ignore_expiry=True)
         if cached is not None:
@@ -37,10 +64,79 @@ class StocksService:
             return cached
         raise Exception(f"Unable to fetch price for {symbol}")
 
+    async def get_stock_prices(self, symbols: List[str]) -> Tuple[Dict[str, float], Dict[str, str]]:
+        """Get prices for many symbols; returns (prices, errors by symbol).
+
+        Cached prices come from one MGET (stale ones are served and refreshed
+        in the background). Missing symbols are fetched concurrently, bounded
+        by stocks_batch_concurrency, and written back in one pipeline.
+        """
+        symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+        if not symbols:
+            raise ValueError("Missing symbols parameter")
+
+        prices: Dict[str, float] = {}
+        errors: Dict[str, str] = {}
+        try:
+            entries = await self.cache.get_many(symbols, track=True)
+        except Exception as e:
+            logger.error(f"Error reading stock prices from cache: {e}")
+            entries = {}
+        for symbol, entry in entries.items():
+            prices[symbol] = float(entry.value)
+            if entry.is_stale:
+                await self.cache.refresh_in_background(
+                    symbol, lambda symbol=symbol: self._refresh_price(symbol, symbol))
+
+        missing = [symbol for symbol in symbols if symbol not in prices]
+        if missing:
+            fetched, errors = await self._refresh_prices(missing)
+            prices.update(fetched)
+
+        # Keep the caller's ordering
+        return {symbol: prices[symbol] for symbol in symbols if symbol in prices}, errors
+
+    async def refresh_hot(self, limit: int) -> int:
+        """Re-fetch the most requested symbols over their cached prices"""
+        symbols = await self.cache.hot_keys(limit) or ["AAPL"]
+        fetched, errors = await self._refresh_prices(symbols)
+        if not fetched and errors:
+            raise Exception(next(iter(errors.values())))
+        return len(fetched)
+
+    async def _refresh_prices(self, symbols: List[str]) -> Tuple[Dict[str, float], Dict[str, str]]:
+        """Fetch symbols concurrently and cache them in one pipeline.
+
+        Each symbol goes through the cache's single-flight, so concurrent
+        batches and single-symbol requests share one Finnhub call per symbol.
+        """
+        semaphore = asyncio.Semaphore(settings.stocks_batch_concurrency)
+
+        async def fetch(symbol: str) -> Optional[float]:
+            async with semaphore:
+                # Written back below in one pipeline with the rest of the batch
+                return await self.cache.single_flight(
+                    symbol, lambda: self._fetch_from_api(symbol))
+
+        results = await asyncio.gather(
+            *(fetch(symbol) for symbol in symbols), return_exceptions=True)
+        fetched: Dict[str, float] = {}
+        errors: Dict[str, str] = {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                errors[symbol] = str(result)
+            elif result is not None:
+                fetched[symbol] = result
+        try:
+            await self.cache.set_many(fetched, self.cache_ttl, self.stale_ttl)
+        except Exception as e:
+            logger.error(f"Error caching stock prices: {e}")
+        return fetched, errors
+
     async def _get_from_cache(self, cache_key: str, ignore_expiry: bool = False) -> Optional[float]:
         try:
-            cached = await self.redis_client.get(cache_key)
-            if cached:
+            cached = await self.cache.get(cache_key, allow_stale=ignore_expiry)
+            if cached is not None:
                 return float(cached)
             return None
         except Exception as e:
@@ -49,10 +145,16 @@ class StocksService:
 
     async def _cache_price(self, cache_key: str, price: float):
         try:
-            await self.redis_client.setex(cache_key, self.cache_ttl, str(price))
+            await self.cache.set(cache_key, price, self.cache_ttl, self.stale_ttl)
         except Exception as e:
             logger.error(f"Error caching stock price: {e}")
 
+    async def _refresh_price(self, cache_key: str, symbol: str) -> Optional[float]:
+        price = await self._fetch_from_api(symbol)
+        if price is not None:
+            await self._cache_price(cache_key, price)
+        return price
+
     async def _fetch_from_api(self, symbol: str) -> Optional[float]:
         if not self.finnhub_key:
             raise Exception("Finnhub API key not configured")
@@ -61,7 +163,7 @@ class StocksService:
         params = {"symbol": symbol, "token": self.finnhub_key}
 
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with self.http_clients.client("finnhub") as client:
                 resp = await client.get(url, params=params)
 
                 if resp.status_code == 403:
@@ -72,6 +174,7 @@ class StocksService:
                 data = resp.json()
 
                 if "c" in data and isinstance(data["c"], (int, float)):
+                    log_writer.offer_prices("stocks", {symbol: float(data["c"])})
                     return float(data["c"])
                 elif "error" in data:
                     logger.error(f"Finnhub error: {data['error']}")
@@ -96,6 +199,16 @@ class StocksService:
             logger.error(f"Finnhub API error: {e}")
             raise Exception(f"API request failed: {e}")
 
+    async def clear_cache(self) -> None:
+        """Invalidate all stocks cache entries in O(1)"""
+        try:
+            await self.cache.invalidate()
+            await self.history_cache.invalidate()
+            await self.analytics_cache.invalidate()
+            logger.info("Cleared stocks cache")
+        except Exception as e:
+            logger.error(f"Error clearing cache: {e}")
+
     async def get_stock_historical_data(self, symbol: str, resolution: str = "1", from_timestamp: int = None, to_timestamp: int = None) -> Optional[Dict]:
         """Get historical price data for a stock"""
         if not self.finnhub_key:
@@ -117,7 +230,7 @@ class StocksService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with self.http_clients.client("finnhub") as client:
                 response = await client.get(url, params=params)
 
                 if response.status_code == 403:
@@ -163,26 +276,25 @@ class StocksService:
 
     async def get_mock_historical_data(self, symbol: str, period: str = "1D") -> Dict:
         """Generate mock historical data for testing/demo purposes"""
+        return _with_rows(self._mock_history(symbol, period))
+
+    def _mock_history(self, symbol: str, period: str) -> Dict:
+        """Mock candles as columns {"symbol", "period", "t", "o", "h", "l", "c", "v"}.
+
+        Candles are a random walk seeded by symbol, period and the current
+        candle slot, so repeated calls agree until the next candle is due.
+        """
         import time
-        import random
-
-        # Define time periods in seconds
-        periods = {
-            "1H": 60 * 60,  # 1 hour
-            "1D": 24 * 60 * 60,  # 1 day
-            "1W": 7 * 24 * 60 * 60,  # 1 week
-            "1M": 30 * 24 * 60 * 60,  # 1 month
-            "3M": 90 * 24 * 60 * 60,  # 3 months
-            "1Y": 365 * 24 * 60 * 60,  # 1 year
-            "5Y": 5 * 365 * 24 * 60 * 60,  # 5 years
-        }
+
+        periods = PERIODS
 
         if period not in periods:
             period = "1D"  # Default to 1 day
 
-        # Generate timestamps
-        current_time = int(time.time())
-        from_timestamp = current_time - periods[period]
+        # Generate timestamps, aligned to whole candles
+        num_points = 100
+        step = periods[period] // num_points
+        from_timestamp = time_bucket(time.time(), step) - periods[period]
 
         # Generate mock price data with some realistic variation
         base_price = 200  # Base price for stocks
@@ -197,41 +309,77 @@ class StocksService:
         elif symbol.upper() in ["AMZN", "AMAZON"]:
             base_price = 180
 
-        prices = []
-        current_price = base_price
-
-        # Generate data points
-        num_points = 100
-        for i in range(num_points):
-            # Add some random variation
-            change = random.uniform(-0.02, 0.02)  # ±2% change
-            current_price = current_price * (1 + change)
-
-            # Ensure price doesn't go negative
-            current_price = max(current_price, base_price * 0.5)
-
-            timestamp = from_timestamp + (i * periods[period] // num_points)
-
-            prices.append({
-                "timestamp": timestamp * 1000,  # Convert to milliseconds
-                "open": current_price,
-                "high": current_price * random.uniform(1.0, 1.05),
-                "low": current_price * random.uniform(0.95, 1.0),
-                "close": current_price,
-                "volume": random.randint(1000000, 10000000)
-            })
+        candles = gbm_ohlcv(
+            seed_for(symbol.upper(), period, from_timestamp),
+            from_timestamp * 1000,  # Convert to milliseconds
+            step * 1000,
+            num_points,
+            base_price,
+            volatility=0.01
+        )
 
         return {
             "symbol": symbol.upper(),
             "period": period,
-            "prices": prices
+            **{name: values.tolist() for name, values in candles.items()}
         }
 
-    async def get_stock_historical_data_by_period(self, symbol: str, period: str = "1D") -> Optional[Dict]:
-        """Get historical data using period string instead of timestamps"""
-        # For now, use mock data to avoid rate limiting issues
+    async def get_stock_historical_data_by_period(self, symbol: str, period: str = "1D", columnar: bool = False,
+                                                  max_points: Optional[int] = None) -> Optional[Dict]:
+        """Get historical data using period string instead of timestamps.
+
+        With max_points candles are bucketed down to at most that many, and
+        the result is cached per (symbol, period, max_points).
+        """
+        if not max_points:
+            data = await self._load_history(symbol, period)
+        else:
+            data = await self.history_cache.fetch(
+                f"{symbol.upper()}:{period}:{max_points}",
+                lambda: self._refresh_downsampled_history(symbol, period, max_points))
+        if columnar:
+            return dict(data)
+        return _with_rows(data)
+
+    async def get_analytics(self, symbol: str, period: str, indicators: List[str], window: int) -> Optional[Dict]:
+        """Technical indicators over closing prices, cached per (symbol, period, indicators, window)"""
+        key = f"{symbol.upper()}:{period}:{','.join(indicators)}:{window}"
+        return await self.analytics_cache.fetch(
+            key, lambda: self._refresh_analytics(key, symbol, period, indicators, window))
+
+    async def _refresh_analytics(self, key: str, symbol: str, period: str, indicators: List[str],
+                                 window: int) -> Optional[Dict]:
+        columns = await self.get_stock_historical_data_by_period(symbol, period, columnar=True)
+        if not columns or not columns.get("t"):
+            return None
+        result = compute_indicators(columns["t"], columns["c"], indicators, window)
+        try:
+            await self.analytics_cache.set(key, result, self.cache_ttl, self.stale_ttl)
+        except Exception as e:
+            logger.error(f"Error caching analytics for {symbol}: {e}")
+        return result
+
+    async def _load_history(self, symbol: str, period: str) -> Dict:
+        """A period's candles in columnar form"""
+        # Our own candles when price_logs cover the period
+        if period in PERIODS:
+            candles = await get_rollup_history("stocks", symbol, PERIODS[period])
+            if candles is not None:
+                return {"symbol": symbol.upper(), "period": period, **to_columns(candles), "source": "rollups"}
+        # Otherwise use mock data to avoid rate limiting issues
         # In production, you could implement proper rate limiting and caching
-        return await self.get_mock_historical_data(symbol, period)
+        return self._mock_history(symbol, period)
+
+    async def _refresh_downsampled_history(self, symbol: str, period: str, max_points: int) -> Dict:
+        """Bucket a period's candles down to max_points and cache the result"""
+        data = await self._load_history(symbol, period)
+        data.update(downsample({name: value for name, value in data.items() if name in FIELDS}, max_points))
+        try:
+            await self.history_cache.set(
+                f"{symbol.upper()}:{period}:{max_points}", data, self.cache_ttl, self.stale_ttl)
+        except Exception as e:
+            logger.error(f"Error caching downsampled history for {symbol}: {e}")
+        return data
 
     async def get_top_stocks(self, top_n: int = 25) -> list:
         """Fetch top N stocks by market cap (or a static list if Finnhub doesn't provide)."""
@@ -280,8 +428,8 @@ class StocksService:
             }
 
     def _get_mock_price(self, symbol: str) -> float:
-        """Generate a realistic mock price for a stock"""
-        import random
+        """Generate a realistic mock price for a stock, fixed per cache period"""
+        import time
 
         # Base prices for common stocks
         base_prices = {
@@ -300,6 +448,7 @@ class StocksService:
         }
 
         base_price = base_prices.get(symbol, 100)
-        # Add some random variation (±10%)
-        variation = random.uniform(0.9, 1.1)
+        # Add some variation (±10%), the same until the cached price expires
+        rng = np.random.default_rng(seed_for(symbol, time_bucket(time.time(), self.cache_ttl)))
+        variation = rng.uniform(0.9, 1.1)
         return round(base_price * variation, 2)
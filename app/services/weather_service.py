@@ -1,16 +1,20 @@
-import httpx
 import redis.asyncio as redis
 import logging
 from typing import Optional
+from app.cache import TieredCache
 from app.config import settings
+from app.http_client import UpstreamClients, upstream_clients
 
 logger = logging.getLogger(__name__)
 
 
 class WeatherService:
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, http_clients: Optional[UpstreamClients] = None):
         self.redis_client = redis_client
+        self.http_clients = http_clients or upstream_clients
+        self.cache = TieredCache(redis_client, namespace="weather", publish=True)
         self.cache_ttl = 300  # 5 minutes
+        self.stale_ttl = 3 * 3600  # serve stale for up to 3 hours while refreshing
         # Try multiple possible API key sources
         self.api_key = (
             settings.weather_api_key or
@@ -22,36 +26,44 @@ class WeatherService:
         if not city:
             raise ValueError("Missing city parameter")
         city = city.strip().title()
-        cache_key = f"weather:{city}:{unit}"
-        # Try cache first
-        cached = await self._get_from_cache(cache_key)
-        if cached:
-            return cached
-        # Fetch from API
-        weather = await self._fetch_from_api(city, unit)
+        cache_key = f"{city}:{unit}"
+        # Serve from cache (stale values trigger a background refresh),
+        # coalescing concurrent misses into a single API fetch
+        weather = await self.cache.fetch(
+            cache_key, lambda: self._refresh_weather(cache_key, city, unit), track=True)
         if weather:
-            await self._cache_weather(cache_key, weather)
             return weather
         raise Exception(f"Unable to fetch weather for {city}")
 
-    async def _get_from_cache(self, cache_key: str) -> Optional[dict]:
+    async def refresh_hot(self, limit: int) -> int:
+        """Re-fetch the most requested cities over their cached weather"""
+        keys = await self.cache.hot_keys(limit) or ["New York:metric"]
+        refreshers = {}
+        for key in keys:
+            city, unit = key.rsplit(":", 1)
+            refreshers[key] = (
+                lambda key=key, city=city, unit=unit: self._refresh_weather(key, city, unit))
+        return await self.cache.refresh_many(refreshers)
+
+    async def _get_from_cache(self, cache_key: str, ignore_expiry: bool = False) -> Optional[dict]:
         try:
-            cached = await self.redis_client.get(cache_key)
-            if cached:
-                import json
-                return json.loads(cached)
-            return None
+            return await self.cache.get(cache_key, allow_stale=ignore_expiry)
         except Exception as e:
             logger.error(f"Error reading from cache: {e}")
             return None
 
     async def _cache_weather(self, cache_key: str, weather: dict):
         try:
-            import json
-            await self.redis_client.setex(cache_key, self.cache_ttl, json.dumps(weather))
+            await self.cache.set(cache_key, weather, self.cache_ttl, self.stale_ttl)
         except Exception as e:
             logger.error(f"Error caching weather: {e}")
 
+    async def _refresh_weather(self, cache_key: str, city: str, unit: str) -> Optional[dict]:
+        weather = await self._fetch_from_api(city, unit)
+        if weather:
+            await self._cache_weather(cache_key, weather)
+        return weather
+
     async def _fetch_from_api(self, city: str, unit: str = "metric") -> Optional[dict]:
         if not self.api_key:
             raise Exception("OpenWeather API key not configured")
@@ -60,7 +72,7 @@ class WeatherService:
         openweather_unit = "imperial" if unit == "F" else "metric"
         params = {"q": city, "appid": self.api_key, "units": openweather_unit}
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with self.http_clients.client("openweather") as client:
                 resp = await client.get(url, params=params)
                 if resp.status_code == 404:
                     raise ValueError(f"City not found: {city}")
@@ -85,3 +97,11 @@ class WeatherService:
         except Exception as e:
             logger.error(f"OpenWeather API error: {e}")
             raise Exception(f"API request failed: {e}")
+
+    async def clear_cache(self) -> None:
+        """Invalidate all weather cache entries in O(1)"""
+        try:
+            await self.cache.invalidate()
+            logger.info("Cleared weather cache")
+        except Exception as e:
+            logger.error(f"Error clearing cache: {e}")
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Iterable, Optional, Set, Tuple
+from starlette.websockets import WebSocket
+from .config import settings
+from .events import Event, event_broker
+
+logger = logging.getLogger(__name__)
+
+CRYPTO = "crypto"
+STOCKS = "stocks"
+
+QuoteKey = Tuple[str, str]  # (kind, symbol)
+
+
+def encode_message(message: Dict[str, Any]) -> str:
+    return json.dumps(message, separators=(",", ":"))
+
+
+class Subscriber:
+    """One WebSocket connection and the updates waiting to be sent to it.
+
+    Deltas are merged per symbol while the client is busy, so a slow
+    consumer receives the latest changed fields in one message instead of
+    an ever-growing backlog; its buffer is bounded by the symbols it
+    follows. A client that cannot accept a message within ws_send_timeout
+    is disconnected.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.following: Set[QuoteKey] = set()
+        self._deltas: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._outbox: Deque[Dict[str, Any]] = deque()
+        self._ready = asyncio.Event()
+
+    def push_delta(self, kind: str, symbol: str, changes: Dict[str, Any]) -> None:
+        self._deltas.setdefault(kind, {}).setdefault(symbol, {}).update(changes)
+        self._ready.set()
+
+    def push_message(self, message: Dict[str, Any]) -> None:
+        self._outbox.append(message)
+        self._ready.set()
+
+    async def run(self) -> None:
+        """Send queued messages and coalesced deltas until cancelled"""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._outbox:
+                await self._send(self._outbox.popleft())
+            if self._deltas:
+                deltas, self._deltas = self._deltas, {}
+                await self._send({"type": "delta", **deltas})
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        try:
+            await asyncio.wait_for(
+                self.websocket.send_text(encode_message(message)), settings.ws_send_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Closing WebSocket client that stopped reading")
+            await self.websocket.close(code=1013)
+            raise
+
+
+class SymbolHub:
+    """Turns cache change events into per-symbol deltas for subscribers.
+
+    One hub per worker consumes the event broker, keeps the last known
+    quote per symbol and, for each changed symbol, notifies only the
+    subscribers following it, so the cost of an update is proportional
+    to its audience rather than to the number of connections.
+    """
+
+    def __init__(self):
+        self.quotes: Dict[QuoteKey, Dict[str, Any]] = {}
+        self._followers: Dict[QuoteKey, Set[Subscriber]] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def follow(self, subscriber: Subscriber, kind: str, symbols: Iterable[str]) -> None:
+        for symbol in symbols:
+            key = (kind, symbol)
+            subscriber.following.add(key)
+            self._followers[key].add(subscriber)
+
+    def unfollow(self, subscriber: Subscriber, kind: str, symbols: Iterable[str]) -> None:
+        for symbol in symbols:
+            key = (kind, symbol)
+            subscriber.following.discard(key)
+            followers = self._followers.get(key)
+            if followers is not None:
+                followers.discard(subscriber)
+                if not followers:
+                    del self._followers[key]
+
+    def remove(self, subscriber: Subscriber) -> None:
+        for kind, symbol in list(subscriber.following):
+            self.unfollow(subscriber, kind, [symbol])
+
+    def seed(self, kind: str, symbol: str, quote: Dict[str, Any]) -> None:
+        """Record a quote read from the cache without notifying anyone"""
+        self.quotes.setdefault((kind, symbol), quote)
+
+    def update(self, kind: str, symbol: str, quote: Dict[str, Any]) -> None:
+        """Record a new quote and send its changed fields to followers"""
+        key = (kind, symbol)
+        previous = self.quotes.get(key, {})
+        changes = {field: value for field, value in quote.items() if previous.get(field) != value}
+        if not changes:
+            return
+        self.quotes[key] = {**previous, **quote}
+        for subscriber in self._followers.get(key, ()):
+            subscriber.push_delta(kind, symbol, changes)
+
+    def apply(self, event: Event) -> None:
+        if event.topic == "crypto_prices":
+            for coin in json.loads(event.data)["value"]:
+                self.update(CRYPTO, coin["symbol"], {"name": coin["name"], "price": coin["price"]})
+        elif event.topic == "stock_price":
+            change = json.loads(event.data)
+            self.update(STOCKS, change["key"], {"price": change["value"]})
+
+    def stats(self) -> Dict[str, int]:
+        subscribers = set().union(*self._followers.values()) if self._followers else set()
+        return {"subscribers": len(subscribers), "symbols": len(self._followers)}
+
+    async def _listen(self) -> None:
+        while True:
+            async with event_broker.subscribe() as queue:
+                while True:
+                    event = await queue.get()
+                    if event is None:
+                        # Fell behind the broker; resubscribe and carry on
+                        break
+                    try:
+                        self.apply(event)
+                    except Exception as e:
+                        logger.warning(f"Could not apply {event.topic} event {event.id}: {e}")
+
+
+# Process-wide hub started from the application lifespan
+symbol_hub = SymbolHub()
@@ -0,0 +1,116 @@
+"""Microbenchmark for cache payload codecs.
+
+Compares encode/decode time and payload size of the stdlib JSON encoding
+the services used before app/codec.py against each Codec configuration,
+for the crypto list, news and historical payloads.
+
+    python -m benchmarks.codec_benchmark
+    python -m benchmarks.codec_benchmark --redis redis://localhost:6379
+
+With --redis, each payload is written to Redis and MEMORY USAGE is reported.
+"""
+import argparse
+import json
+import random
+import time
+import timeit
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.codec import Codec, lz4_frame, msgpack
+
+
+def crypto_list_payload(rng: random.Random) -> List[Dict]:
+    return [
+        {"symbol": f"C{i}", "name": f"Coin {i}", "price": round(rng.uniform(0.01, 60000), 6)}
+        for i in range(100)
+    ]
+
+
+def news_payload(rng: random.Random) -> List[Dict]:
+    return [
+        {
+            "title": f"Headline {i} " + "word " * rng.randint(5, 15),
+            "source": f"Source {i % 4}",
+            "url": f"https://news.example.com/articles/{i}",
+            "publishedAt": "2024-06-01T12:00:00Z",
+            "image": f"https://cdn.example.com/{i}.jpg",
+            "description": "lorem ipsum " * rng.randint(10, 30),
+            "category": "business"
+        }
+        for i in range(10)
+    ]
+
+
+def historical_payload(rng: random.Random) -> Dict[str, Any]:
+    # One year of hourly points, the largest series the crypto route returns
+    start = int(time.time() * 1000) - 365 * 24 * 3600 * 1000
+    price = 50000.0
+    prices = []
+    for i in range(365 * 24):
+        price *= 1 + rng.uniform(-0.01, 0.01)
+        prices.append({"timestamp": start + i * 3600 * 1000, "price": price})
+    return {"prices": prices}
+
+
+def legacy_json() -> Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    return (lambda obj: json.dumps(obj).encode("utf-8")), json.loads
+
+
+def codecs() -> List[Tuple[str, Callable[[Any], bytes], Callable[[bytes], Any]]]:
+    encode, decode = legacy_json()
+    result = [("stdlib json (legacy)", encode, decode)]
+    formats = ["json"] + (["msgpack"] if msgpack is not None else [])
+    compressions = ["none", "zlib"] + (["lz4"] if lz4_frame is not None else [])
+    for fmt in formats:
+        for compression in compressions:
+            codec = Codec(fmt=fmt, compression=compression, compress_threshold=4096)
+            result.append((f"{fmt}+{compression}", codec.encode, codec.decode))
+    return result
+
+
+def time_call(fn: Callable[[], Any], repeat: int = 5) -> float:
+    """Best per-call time in microseconds"""
+    number = 20
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--redis", help="Redis URL to measure MEMORY USAGE against")
+    args = parser.parse_args()
+
+    redis_client = None
+    if args.redis:
+        import redis
+        redis_client = redis.Redis.from_url(args.redis)
+
+    rng = random.Random(0)
+    payloads = {
+        "crypto list": crypto_list_payload(rng),
+        "news": news_payload(rng),
+        "historical": historical_payload(rng),
+    }
+
+    header = f"{'payload':<12} {'codec':<22} {'encode us':>10} {'decode us':>10} {'bytes':>9}"
+    if redis_client is not None:
+        header += f" {'redis bytes':>12}"
+    print(header)
+    print("-" * len(header))
+
+    for payload_name, payload in payloads.items():
+        for codec_name, encode, decode in codecs():
+            raw = encode(payload)
+            encode_us = time_call(lambda: encode(payload))
+            decode_us = time_call(lambda: decode(raw))
+            line = f"{payload_name:<12} {codec_name:<22} {encode_us:>10.1f} {decode_us:>10.1f} {len(raw):>9}"
+            if redis_client is not None:
+                key = "benchmark:codec"
+                redis_client.set(key, raw)
+                line += f" {redis_client.memory_usage(key):>12}"
+                redis_client.delete(key)
+            print(line)
+        print()
+
+
+if __name__ == "__main__":
+    main()
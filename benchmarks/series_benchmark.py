@@ -0,0 +1,106 @@
+"""Microbenchmark for the historical routes' response formats.
+
+Compares building and JSON-serializing a series as one object per point
+(format=rows, the default) against parallel arrays (format=columnar), for
+a day of 5-minute crypto points, a year of hourly crypto points and a
+year of daily OHLCV stock candles.
+
+    python -m benchmarks.series_benchmark
+"""
+import argparse
+import json
+import random
+import time
+import timeit
+from typing import Any, Callable, Dict, List, Tuple
+
+import orjson
+
+from app.series import to_columns, to_rows
+
+
+def market_chart(rng: random.Random, points: int, step_ms: int) -> List[List[float]]:
+    # CoinGecko market_chart "prices": [[timestamp, price], ...]
+    start = int(time.time() * 1000) - points * step_ms
+    price = 50000.0
+    pairs = []
+    for i in range(points):
+        price *= 1 + rng.uniform(-0.01, 0.01)
+        pairs.append([start + i * step_ms, price])
+    return pairs
+
+
+def candles(rng: random.Random, points: int) -> List[Dict[str, Any]]:
+    start = int(time.time() * 1000) - points * 86400 * 1000
+    price = 200.0
+    rows = []
+    for i in range(points):
+        price *= 1 + rng.uniform(-0.02, 0.02)
+        rows.append({
+            "timestamp": start + i * 86400 * 1000,
+            "open": price,
+            "high": price * 1.01,
+            "low": price * 0.99,
+            "close": price,
+            "volume": rng.randint(1000000, 10000000)
+        })
+    return rows
+
+
+def build_rows(pairs: List[List[float]]) -> Dict[str, Any]:
+    # The shape the crypto route returned before format=columnar
+    return {"prices": [{"timestamp": pair[0], "price": pair[1]} for pair in pairs]}
+
+
+def build_columns(pairs: List[List[float]]) -> Dict[str, Any]:
+    return {"t": [pair[0] for pair in pairs], "p": [pair[1] for pair in pairs]}
+
+
+def serializers() -> List[Tuple[str, Callable[[Any], bytes]]]:
+    return [
+        ("stdlib json", lambda obj: json.dumps(obj).encode("utf-8")),
+        ("orjson", orjson.dumps),
+    ]
+
+
+def time_call(fn: Callable[[], Any], repeat: int = 5) -> float:
+    """Best per-call time in microseconds"""
+    number = 20
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+
+    rng = random.Random(0)
+    day = market_chart(rng, 288, 5 * 60 * 1000)
+    year = market_chart(rng, 365 * 24, 3600 * 1000)
+    stock_rows = candles(rng, 365)
+    series = {
+        "crypto 1d": (lambda: build_rows(day), lambda: build_columns(day)),
+        "crypto 365d": (lambda: build_rows(year), lambda: build_columns(year)),
+        "stocks 1Y": (lambda: {"prices": stock_rows},
+                      lambda: to_columns(stock_rows)),
+    }
+
+    header = f"{'series':<12} {'format':<9} {'serializer':<12} {'build us':>9} {'dump us':>9} {'bytes':>9}"
+    print(header)
+    print("-" * len(header))
+    for series_name, (rows, columns) in series.items():
+        for format_name, build in (("rows", rows), ("columnar", columns)):
+            payload = build()
+            build_us = time_call(build)
+            for serializer_name, dump in serializers():
+                dump_us = time_call(lambda: dump(payload))
+                size = len(dump(payload))
+                print(f"{series_name:<12} {format_name:<9} {serializer_name:<12} "
+                      f"{build_us:>9.1f} {dump_us:>9.1f} {size:>9}")
+        print()
+
+    # Round trip sanity check: columnar carries the same points
+    assert to_rows(build_columns(day)) == build_rows(day)["prices"]
+
+
+if __name__ == "__main__":
+    main()
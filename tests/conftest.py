@@ -0,0 +1,14 @@
+import pytest
+from app import cache
+from app.services import coin_index
+
+
+@pytest.fixture(autouse=True)
+def clear_local_cache():
+    """Keep process-wide cache state from leaking between tests"""
+    cache.local_cache.clear()
+    cache._generations.clear()
+    coin_index._state = coin_index._IndexState()
+    yield
+    cache.local_cache.clear()
+    cache._generations.clear()
@@ -0,0 +1,89 @@
+import json
+import math
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.analytics import INDICATORS, compute_indicators, drawdown, ema, parse_indicators, rsi, sma, volatility
+from app.main import app
+from app.services.stocks_service import StocksService
+
+
+PRICES = np.array([10.0, 11.0, 10.5, 12.0, 11.0, 13.0, 12.5, 14.0])
+
+
+class TestIndicators:
+    """Vectorized indicators against straightforward definitions"""
+
+    def test_sma_matches_window_means(self):
+        result = sma(PRICES, 3)
+        assert np.isnan(result[:2]).all()
+        assert np.allclose(result[2:], [PRICES[i - 2:i + 1].mean() for i in range(2, len(PRICES))])
+
+    def test_ema_recursion(self):
+        result = ema(PRICES, 3)
+        expected = [PRICES[0]]
+        for price in PRICES[1:]:
+            expected.append(expected[-1] + 0.5 * (price - expected[-1]))
+        assert np.allclose(result, expected)
+
+    def test_rsi_and_volatility_windows(self):
+        changes = np.diff(PRICES)
+        gains, losses = np.clip(changes[:3], 0, None).mean(), np.clip(-changes[:3], 0, None).mean()
+
+        assert rsi(PRICES, 3)[3] == pytest.approx(100 - 100 / (1 + gains / losses))
+        assert np.isnan(rsi(PRICES, 3)[:3]).all()
+        assert volatility(PRICES, 3)[3] == pytest.approx(np.std(np.diff(np.log(PRICES[:4])), ddof=1))
+
+    def test_drawdown_from_running_peak(self):
+        assert drawdown(np.array([10.0, 12.0, 9.0, 13.0]))[2] == pytest.approx(9.0 / 12.0 - 1)
+
+    def test_result_is_json_safe_and_aligned(self):
+        result = compute_indicators(list(range(len(PRICES))), PRICES, ["rsi", "returns"], 3)
+
+        assert set(result["indicators"]) == {"rsi", "returns"}
+        assert all(len(values) == len(PRICES) for values in result["indicators"].values())
+        assert result["indicators"]["returns"][0] is None
+        assert result["summary"]["total_return"] == pytest.approx(0.4)
+
+    def test_zero_and_nan_prices_stay_json_safe(self):
+        result = compute_indicators(list(range(5)), [0.0, 2.0, float("nan"), 1.0, 4.0], list(INDICATORS), 2)
+
+        values = [v for series in result["indicators"].values() for v in series] + list(result["summary"].values())
+        assert all(v is None or math.isfinite(v) for v in values)
+        assert result["indicators"]["returns"][1] is None
+        assert result["summary"]["max_drawdown"] == pytest.approx(-0.5)
+        assert result["summary"]["total_return"] is None
+        json.dumps(result, allow_nan=False)
+
+    def test_unknown_indicator_rejected(self):
+        assert parse_indicators("rsi, SMA,rsi") == ["rsi", "sma"]
+        with pytest.raises(ValueError, match="macd"):
+            parse_indicators("macd")
+
+
+class TestAnalyticsService:
+    """Caching of computed indicators"""
+
+    @pytest.mark.asyncio
+    async def test_stock_analytics_cached_per_indicator_set(self):
+        mock_redis = AsyncMock()
+        mock_redis.hget.return_value = None
+        mock_redis.get.return_value = None
+        mock_redis.set.return_value = True
+        service = StocksService(mock_redis)
+        history = {"t": [1, 2, 3], "c": [1.0, 2.0, 3.0]}
+
+        with patch.object(service, "get_stock_historical_data_by_period",
+                          AsyncMock(return_value=history)) as load:
+            first = await service.get_analytics("aapl", "1M", ["sma"], 2)
+            second = await service.get_analytics("AAPL", "1M", ["sma"], 2)
+
+        load.assert_called_once()
+        assert first == second
+        assert first["indicators"]["sma"] == [None, 1.5, 2.5]
+        assert mock_redis.setex.call_args.args[0] == "stock_analytics:v0:AAPL:1M:sma:2"
+
+    def test_endpoint_rejects_unknown_indicator(self):
+        response = TestClient(app).get("/api/stocks/analytics/AAPL?indicators=macd")
+        assert response.status_code == 400
@@ -0,0 +1,326 @@
+import asyncio
+import pytest
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.cache import LocalCache, TieredCache, decode_entry, sweep_stale_generations
+from app.rate_limiter import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, current_priority, upstream_priority)
+
+
+class TestLocalCache:
+    """Unit tests for the in-process L1 cache"""
+
+    def test_get_set(self):
+        cache = LocalCache(max_entries=10, max_bytes=1000)
+        cache.set("a", {"x": 1}, ttl=60, size=10)
+        assert cache.get("a") == {"x": 1}
+        assert cache.get("missing") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_ttl_expiry(self):
+        cache = LocalCache(max_entries=10, max_bytes=1000)
+        cache.set("a", 1, ttl=5, size=1)
+        with patch("app.cache.time.monotonic", return_value=time.monotonic() + 10):
+            assert cache.get("a") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_lru_eviction_by_entries(self):
+        cache = LocalCache(max_entries=2, max_bytes=1000)
+        cache.set("a", 1, ttl=60, size=1)
+        cache.set("b", 2, ttl=60, size=1)
+        cache.get("a")  # "b" is now least recently used
+        cache.set("c", 3, ttl=60, size=1)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_eviction_by_bytes(self):
+        cache = LocalCache(max_entries=10, max_bytes=100)
+        cache.set("a", 1, ttl=60, size=60)
+        cache.set("b", 2, ttl=60, size=60)
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        assert cache.stats()["bytes"] == 60
+
+    def test_oversized_value_not_stored(self):
+        cache = LocalCache(max_entries=10, max_bytes=100)
+        cache.set("a", 1, ttl=60, size=101)
+        assert cache.get("a") is None
+
+
+class TestTieredCache:
+    """Unit tests for the L1 + Redis read-through cache"""
+
+    @pytest.mark.asyncio
+    async def test_second_read_served_from_local(self):
+        mock_redis = AsyncMock()
+        mock_redis.get.return_value = json.dumps([1, 2, 3])
+        cache = TieredCache(mock_redis, local=LocalCache(10, 1000))
+
+        assert await cache.get("k") == [1, 2, 3]
+        assert await cache.get("k") == [1, 2, 3]
+        mock_redis.get.assert_called_once_with("k")
+
+    @pytest.mark.asyncio
+    async def test_set_writes_both_tiers(self):
+        mock_redis = AsyncMock()
+        cache = TieredCache(mock_redis, local=LocalCache(10, 1000))
+
+        await cache.set("k", {"a": 1}, 60)
+
+        key, ttl, payload = mock_redis.setex.call_args[0]
+        assert (key, ttl) == ("k", 60)
+        assert decode_entry(payload).value == {"a": 1}
+        assert await cache.get("k") == {"a": 1}
+        mock_redis.get.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_many_skips_local_hits_and_uses_one_mget(self):
+        mock_redis = AsyncMock()
+        mock_redis.mget.return_value = [json.dumps(2), None]
+        cache = TieredCache(mock_redis, local=LocalCache(10, 1000))
+        await cache.set("a", 1, 60)
+
+        entries = await cache.get_many(["a", "b", "c"])
+
+        assert {key: entry.value for key, entry in entries.items()} == {"a": 1, "b": 2}
+        mock_redis.mget.assert_called_once_with(["b", "c"])
+
+    @pytest.mark.asyncio
+    async def test_set_many_writes_one_pipeline(self):
+        mock_redis = AsyncMock()
+        pipe = MagicMock()
+        pipe.execute = AsyncMock()
+        mock_redis.pipeline = MagicMock()
+        mock_redis.pipeline.return_value.__aenter__.return_value = pipe
+        cache = TieredCache(mock_redis, local=LocalCache(10, 1000))
+
+        await cache.set_many({"a": 1, "b": 2}, 60, 600)
+
+        assert [call[0][:2] for call in pipe.setex.call_args_list] == [("a", 600), ("b", 600)]
+        pipe.execute.assert_awaited_once()
+        assert await cache.get("b") == 2
+
+
+class TestHotKeys:
+    """Tracking of recently requested keys"""
+
+    @pytest.mark.asyncio
+    async def test_tracked_fetch_records_key_only_on_local_miss(self):
+        mock_redis = AsyncMock()
+        mock_redis.hget.return_value = None
+        mock_redis.get.return_value = json.dumps(1)
+        cache = TieredCache(mock_redis, namespace="stock_price", local=LocalCache(10, 1000))
+
+        await cache.fetch("AAPL", AsyncMock(), track=True)
+        await cache.fetch("AAPL", AsyncMock(), track=True)
+
+        mock_redis.zadd.assert_called_once()
+        name, mapping = mock_redis.zadd.call_args[0]
+        assert name == "cache:hot:stock_price"
+        assert list(mapping) == ["AAPL"]
+
+    @pytest.mark.asyncio
+    async def test_hot_keys_prunes_and_decodes(self):
+        mock_redis = AsyncMock()
+        mock_redis.zrevrangebyscore.return_value = [b"MSFT", b"AAPL"]
+        cache = TieredCache(mock_redis, namespace="stock_price", local=LocalCache(10, 1000))
+
+        assert await cache.hot_keys(5) == ["MSFT", "AAPL"]
+        mock_redis.zremrangebyscore.assert_called_once()
+
+
+class TestSingleFlight:
+    """Request coalescing on cache misses"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_fetch(self):
+        mock_redis = AsyncMock()
+        mock_redis.set.return_value = True
+        cache = TieredCache(mock_redis, local=LocalCache(10, 1000))
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return [1, 2, 3]
+
+        results = await asyncio.gather(
+            *[cache.single_flight("k", fetch) for _ in range(10)])
+
+        assert calls == 1
+        assert all(r == [1, 2, 3] for r in results)
+        # Lease is taken once and released with the owner's token
+        mock_redis.set.assert_called_once()
+        mock_redis.eval.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_waits_for_other_worker_holding_lease(self):
+        mock_redis = AsyncMock()
+        mock_redis.set.return_value = None  # lease held elsewhere
+        mock_redis.get.side_effect = [None, json.dumps({"a": 1})]
+        cache = TieredCache(mock_redis, local=LocalCache(10, 1000))
+        fetch = AsyncMock()
+
+        result = await cache.single_flight("k", fetch)
+
+        assert result == {"a": 1}
+        fetch.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_fetch_error_propagates_to_all_callers(self):
+        mock_redis = AsyncMock()
+        cache = TieredCache(mock_redis, local=LocalCache(10, 1000))
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            cache.single_flight("k", fetch), cache.single_flight("k", fetch),
+            return_exceptions=True)
+
+        assert all(isinstance(r, ValueError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_interactive_caller_raises_background_flight_priority(self):
+        mock_redis = AsyncMock()
+        mock_redis.set.return_value = True
+        cache = TieredCache(mock_redis, local=LocalCache(10, 1000))
+        joined = asyncio.Event()
+        seen = []
+
+        async def fetch():
+            seen.append(current_priority())
+            await joined.wait()
+            seen.append(current_priority())
+            return {"a": 1}
+
+        async def background():
+            upstream_priority.set(PRIORITY_BACKGROUND)
+            return await cache.single_flight("k", fetch)
+
+        owner = asyncio.ensure_future(background())
+        await asyncio.sleep(0)
+        user = asyncio.ensure_future(cache.single_flight("k", fetch))
+        await asyncio.sleep(0)
+        joined.set()
+        await asyncio.gather(owner, user)
+
+        assert seen == [PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE]
+
+
+class TestStaleWhileRevalidate:
+    """Soft/hard TTL envelope and background refresh"""
+
+    @pytest.mark.asyncio
+    async def test_set_keeps_value_until_hard_ttl(self):
+        mock_redis = AsyncMock()
+        cache = TieredCache(mock_redis, local=LocalCache(10, 1000))
+
+        await cache.set("k", [1], 60, 600)
+
+        key, ttl, payload = mock_redis.setex.call_args[0]
+        assert ttl == 600
+        entry = decode_entry(payload)
+        assert entry.soft_ttl == 60
+        assert not entry.is_stale
+
+    @pytest.mark.asyncio
+    async def test_stale_value_served_and_refreshed_in_background(self):
+        mock_redis = AsyncMock()
+        stale = {"value": [1], "fetched_at": time.time() - 120, "soft_ttl": 60}
+        mock_redis.get.return_value = json.dumps(stale)
+        cache = TieredCache(mock_redis, local=LocalCache(10, 1000))
+        refreshed = asyncio.Event()
+
+        async def refresh():
+            await cache.set("k", [2], 60, 600)
+            refreshed.set()
+            return [2]
+
+        assert await cache.fetch("k", refresh) == [1]
+        assert await cache.get("k") is None  # stale, not served by default
+        assert await cache.get("k", allow_stale=True) == [1]
+
+        await asyncio.wait_for(refreshed.wait(), 1)
+        assert await cache.fetch("k", refresh) == [2]
+
+    @pytest.mark.asyncio
+    async def test_miss_waits_for_fetch(self):
+        mock_redis = AsyncMock()
+        mock_redis.get.return_value = None
+        cache = TieredCache(mock_redis, local=LocalCache(10, 1000))
+
+        async def refresh():
+            return [3]
+
+        assert await cache.fetch("k", refresh) == [3]
+
+    def test_decode_legacy_bare_value(self):
+        entry = decode_entry(json.dumps([1, 2]))
+        assert entry.value == [1, 2]
+        assert not entry.is_stale
+
+
+class TestNamespaces:
+    """Generation-counter namespace invalidation"""
+
+    @pytest.mark.asyncio
+    async def test_keys_include_generation(self):
+        mock_redis = AsyncMock()
+        mock_redis.hget.return_value = b"3"
+        cache = TieredCache(mock_redis, "crypto_prices", local=LocalCache(10, 1000))
+
+        await cache.set("50", [1], 60)
+
+        assert mock_redis.setex.call_args[0][0] == "crypto_prices:v3:50"
+
+    @pytest.mark.asyncio
+    async def test_invalidate_is_single_increment(self):
+        mock_redis = AsyncMock()
+        mock_redis.hget.return_value = None
+        mock_redis.hincrby.return_value = 1
+        cache = TieredCache(mock_redis, "crypto_prices", local=LocalCache(10, 1000))
+        await cache.set("50", [1], 60)
+        assert await cache.get("50") == [1]
+
+        await cache.invalidate()
+
+        mock_redis.hincrby.assert_called_once_with("cache:generations", "crypto_prices", 1)
+        mock_redis.keys.assert_not_called()
+        mock_redis.get.return_value = None
+        assert await cache.get("50") is None
+        mock_redis.get.assert_called_with("crypto_prices:v1:50")
+
+    @pytest.mark.asyncio
+    async def test_generation_read_is_cached(self):
+        mock_redis = AsyncMock()
+        mock_redis.hget.return_value = None
+        mock_redis.get.return_value = None
+        cache = TieredCache(mock_redis, "news", local=LocalCache(10, 1000))
+
+        await cache.get("a")
+        await cache.get("b")
+
+        mock_redis.hget.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_sweep_removes_only_old_generations(self):
+        mock_redis = AsyncMock()
+        mock_redis.hgetall.return_value = {b"news": b"2"}
+
+        async def scan_iter(match, count):
+            for key in [b"news:v0:a", b"news:v1:b", b"news:v2:c"]:
+                yield key
+        mock_redis.scan_iter = scan_iter
+        mock_redis.unlink.return_value = 2
+
+        removed = await sweep_stale_generations(mock_redis)
+
+        assert removed == 2
+        mock_redis.unlink.assert_called_once_with(b"news:v0:a", b"news:v1:b")
@@ -0,0 +1,54 @@
+import json
+import pytest
+from app.codec import Codec, CodecError, MAGIC
+
+
+PAYLOAD = {
+    "value": [{"symbol": "BTC", "name": "Bitcoin", "price": 50000.5}] * 200,
+    "fetched_at": 1700000000.0,
+    "soft_ttl": 60
+}
+
+
+class TestCodec:
+    """Versioned cache payload serialization"""
+
+    @pytest.mark.parametrize("fmt", ["json", "msgpack"])
+    @pytest.mark.parametrize("compression", ["none", "zlib", "lz4"])
+    def test_round_trip(self, fmt, compression):
+        codec = Codec(fmt=fmt, compression=compression, compress_threshold=64)
+        raw = codec.encode(PAYLOAD)
+        assert raw.startswith(MAGIC)
+        assert codec.decode(raw) == PAYLOAD
+
+    def test_small_payloads_not_compressed(self):
+        codec = Codec(compression="zlib", compress_threshold=4096)
+        raw = codec.encode({"a": 1})
+        assert raw[4:5] == b"0"
+
+    def test_large_payloads_compressed(self):
+        codec = Codec(compression="zlib", compress_threshold=64)
+        raw = codec.encode(PAYLOAD)
+        assert raw[4:5] == b"z"
+        assert len(raw) < len(json.dumps(PAYLOAD))
+
+    def test_sizes_report_uncompressed_body(self):
+        codec = Codec(compression="zlib", compress_threshold=64)
+        raw, size = codec.encode_sized(PAYLOAD)
+        assert size > len(raw)
+        assert codec.decode_sized(raw) == (PAYLOAD, size)
+
+    def test_reader_follows_header_not_own_config(self):
+        writer = Codec(fmt="msgpack", compression="zlib", compress_threshold=0)
+        reader = Codec(fmt="json", compression="none")
+        assert reader.decode(writer.encode(PAYLOAD)) == PAYLOAD
+
+    def test_legacy_json_payloads(self):
+        codec = Codec()
+        assert codec.decode(json.dumps([1, 2])) == [1, 2]
+        assert codec.decode(b"189.3") == 189.3
+
+    def test_unknown_version_rejected(self):
+        codec = Codec()
+        with pytest.raises(CodecError):
+            codec.decode(MAGIC + bytes([99]) + b"j0{}")
@@ -0,0 +1,54 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.services.coin_index import CoinIndex, build_index
+
+COINS = [
+    {"id": "bitcoin-bep2", "symbol": "btc", "name": "Bitcoin BEP2"},
+    {"id": "bitcoin", "symbol": "BTC", "name": "Bitcoin"},
+    {"id": "uni-fake", "symbol": "uni", "name": "Uni Fake"},
+    {"id": "universe", "symbol": "uni", "name": "Universe"},
+    {"id": "uniswap-lp", "symbol": "uni", "name": "Uniswap LP"},
+]
+
+
+class TestBuildIndex:
+    """Ranking of coins that share a symbol"""
+
+    def test_priority_name_then_market_cap_then_list_order(self):
+        index = build_index(COINS, {"universe": 300, "uni-fake": 900})
+
+        assert index["btc"] == ["bitcoin", "bitcoin-bep2"]
+        assert index["uni"] == ["universe", "uni-fake", "uniswap-lp"]
+
+
+class TestCoinIndex:
+    """Symbol lookups served from the in-memory and Redis index"""
+
+    @pytest.fixture
+    def mock_redis(self):
+        mock = AsyncMock()
+        mock.get.return_value = None
+        mock.set.return_value = True
+        return mock
+
+    @pytest.mark.asyncio
+    async def test_upstream_called_once_then_served_from_memory(self, mock_redis):
+        index = CoinIndex(mock_redis)
+        with patch.object(CoinIndex, "_fetch_coin_list", AsyncMock(return_value=COINS)) as coin_list, \
+                patch.object(CoinIndex, "_fetch_market_ranks", AsyncMock(return_value={})):
+            assert await index.lookup("BTC") == "bitcoin"
+            assert await index.lookup("uni") == "uni-fake"
+            assert await CoinIndex(mock_redis).lookup("doge") is None
+
+        coin_list.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_loads_index_published_by_another_worker(self, mock_redis):
+        mock_redis.get.return_value = b"1700000000.0"
+        mock_redis.hgetall.return_value = {b"btc": b"bitcoin,bitcoin-bep2"}
+        index = CoinIndex(mock_redis)
+        with patch.object(CoinIndex, "_fetch_coin_list", AsyncMock()) as coin_list, \
+                patch.object(CoinIndex, "refresh", AsyncMock()):
+            assert await index.candidates("btc") == ["bitcoin", "bitcoin-bep2"]
+
+        coin_list.assert_not_awaited()
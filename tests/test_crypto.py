@@ -1,10 +1,13 @@
+import asyncio
+import time
 import pytest
 import json
 from unittest.mock import AsyncMock, patch, MagicMock
 import httpx
 from fastapi.testclient import TestClient
 from app.main import app
-from app.services.crypto_service import CryptoService
+from app.cache import decode_entry
+from app.services.crypto_service import CryptoService, history_ttl
 
 
 class TestCryptoService:
@@ -13,7 +16,9 @@ class TestCryptoService:
     @pytest.fixture
     def mock_redis(self):
         """Mock Redis client"""
-        return AsyncMock()
+        mock = AsyncMock()
+        mock.hget.return_value = None  # cache namespaces at generation 0
+        return mock
 
     @pytest.fixture
     def crypto_service(self, mock_redis):
@@ -33,7 +38,7 @@ class TestCryptoService:
         result = await crypto_service.get_crypto_prices(top_n=2)
 
         assert result == cached_prices
-        mock_redis.get.assert_called_once_with("crypto_prices:2")
+        mock_redis.get.assert_called_once_with("crypto_prices:v0:snapshot")
 
     @pytest.mark.asyncio
     async def test_get_crypto_prices_from_api(self, crypto_service, mock_redis):
@@ -69,10 +74,37 @@ class TestCryptoService:
             # Verify cache was set
             mock_redis.setex.assert_called_once()
             call_args = mock_redis.setex.call_args
-            assert call_args[0][0] == "crypto_prices:2"  # key
-            assert call_args[0][1] == 60  # ttl
-            cached_data = json.loads(call_args[0][2])  # value
-            assert cached_data == expected
+            assert call_args[0][0] == "crypto_prices:v0:snapshot"  # key
+            assert call_args[0][1] == 3600  # hard ttl
+            entry = decode_entry(call_args[0][2])  # value
+            assert entry.value == expected
+            assert entry.soft_ttl == 60
+
+    @pytest.mark.asyncio
+    async def test_any_top_n_served_from_one_snapshot(self, crypto_service, mock_redis):
+        """Test different top_n values share a single upstream fetch"""
+        mock_redis.get.return_value = None
+        api_response = [
+            {"symbol": f"c{i}", "name": f"Coin {i}", "current_price": float(i)}
+            for i in range(100)
+        ]
+
+        with patch('httpx.AsyncClient') as mock_client:
+            mock_response = MagicMock()
+            mock_response.json.return_value = api_response
+            mock_client_instance = AsyncMock()
+            mock_client_instance.__aenter__.return_value = mock_client_instance
+            mock_client_instance.get.return_value = mock_response
+            mock_client.return_value = mock_client_instance
+
+            top_5 = await crypto_service.get_crypto_prices(top_n=5)
+            top_50 = await crypto_service.get_crypto_prices(top_n=50)
+
+            assert [p["symbol"] for p in top_5] == ["C0", "C1", "C2", "C3", "C4"]
+            assert len(top_50) == 50
+            mock_client_instance.get.assert_called_once()
+            params = mock_client_instance.get.call_args[1]["params"]
+            assert params["per_page"] == 100
 
     @pytest.mark.asyncio
     async def test_get_crypto_prices_api_timeout(self, crypto_service, mock_redis):
@@ -138,6 +170,135 @@ class TestCryptoService:
             with pytest.raises(Exception, match="API unavailable and no cached data"):
                 await crypto_service.get_crypto_prices(top_n=2)
 
+    @pytest.mark.asyncio
+    async def test_historical_data_shares_one_fetch_and_is_cached(self, crypto_service, mock_redis):
+        """Concurrent chart opens share one market_chart call, cached by range"""
+        mock_redis.get.return_value = None
+        mock_redis.set.return_value = True
+        now = int(time.time() * 1000)
+        data = {"t": [now - 7200000, now - 3600000], "p": [2.0, 2.5]}
+
+        async def fetch(coin_id, days):
+            await asyncio.sleep(0.01)
+            return data
+
+        with patch.object(crypto_service, "_fetch_historical_from_api", side_effect=fetch) as api:
+            results = await asyncio.gather(
+                *[crypto_service.get_crypto_historical_data("bitcoin", "365") for _ in range(5)])
+
+        assert results == [{"prices": [{"timestamp": now - 7200000, "price": 2.0},
+                                       {"timestamp": now - 3600000, "price": 2.5}]}] * 5
+        api.assert_called_once_with("bitcoin", "365")
+        key, ttl = mock_redis.setex.call_args.args[:2]
+        assert key == "crypto_history:v0:bitcoin:1d"
+        assert ttl == history_ttl("365") * 4
+        # The columnar format is the cached arrays themselves
+        assert await crypto_service.get_crypto_historical_data("bitcoin", "365", columnar=True) == data
+
+    @pytest.mark.asyncio
+    async def test_downsampled_history_is_cached_per_max_points(self, crypto_service, mock_redis):
+        """max_points reduces the cached range and caches the result separately"""
+        mock_redis.get.return_value = None
+        mock_redis.set.return_value = True
+        data = {"t": list(range(1000)), "p": [float(i) for i in range(1000)]}
+
+        with patch.object(crypto_service, "_fetch_historical_from_api", AsyncMock(return_value=data)):
+            result = await crypto_service.get_crypto_historical_data(
+                "bitcoin", "max", columnar=True, max_points=100)
+
+        assert len(result["t"]) == len(result["p"]) == 100
+        keys = [call.args[0] for call in mock_redis.setex.call_args_list]
+        assert keys == ["crypto_history:v0:bitcoin:1d", "crypto_history:v0:bitcoin:max:100"]
+
+    @pytest.mark.asyncio
+    async def test_refresh_appends_only_the_new_tail(self, crypto_service, mock_redis):
+        """An expired range fetches points after its last one and trims the head"""
+        hour = 3600 * 1000
+        now = int(time.time() * 1000)
+        previous = {"days": "7", "segments": [
+            {"t": [now - 10 * 86400 * 1000, now - 6 * 86400 * 1000], "p": [1.0, 2.0]},
+            {"t": [now - 2 * hour], "p": [3.0]},
+        ]}
+        # Range endpoint answers in 5-minute points; keep the hourly spacing
+        tail = {"t": [now - hour - 300000, now - hour, now - 300000], "p": [3.1, 3.2, 3.3]}
+
+        with patch.object(crypto_service.history_cache, "get", AsyncMock(return_value=previous)), \
+                patch.object(crypto_service, "_fetch_history_range", AsyncMock(return_value=tail)) as tail_fetch, \
+                patch.object(crypto_service, "_fetch_historical_from_api", AsyncMock()) as full_fetch:
+            series = await crypto_service._refresh_historical_data("bitcoin", "7")
+
+        full_fetch.assert_not_called()
+        assert tail_fetch.call_args.args[1] == (now - 2 * hour) // 1000 + 1
+        assert series["days"] == "7"
+        assert series["segments"] == [
+            {"t": [now - 6 * 86400 * 1000], "p": [2.0]},
+            {"t": [now - 2 * hour], "p": [3.0]},
+            {"t": [now - hour], "p": [3.2]},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_shorter_range_is_sliced_from_wider_cached_series(self, crypto_service, mock_redis):
+        """A 7-day chart after the 30-day one makes no upstream call"""
+        mock_redis.get.return_value = None
+        mock_redis.set.return_value = True
+        now = int(time.time() * 1000)
+        month = {"t": [now - day * 86400 * 1000 for day in (29, 20, 6, 1)], "p": [1.0, 2.0, 3.0, 4.0]}
+
+        with patch.object(crypto_service, "_fetch_historical_from_api", AsyncMock(return_value=month)) as api:
+            await crypto_service.get_crypto_historical_data("bitcoin", "30")
+            week = await crypto_service.get_crypto_historical_data("bitcoin", "7", columnar=True)
+
+        api.assert_called_once_with("bitcoin", "30")
+        assert week == {"t": month["t"][2:], "p": [3.0, 4.0]}
+
+    @pytest.mark.asyncio
+    async def test_wider_range_fetches_only_the_missing_head(self, crypto_service, mock_redis):
+        """A 30-day chart after the 7-day one fetches just the older 23 days"""
+        mock_redis.get.return_value = None
+        mock_redis.set.return_value = True
+        now = int(time.time() * 1000)
+        week = {"t": [now - 6 * 86400 * 1000, now - 86400 * 1000], "p": [3.0, 4.0]}
+        older = {"t": [now - 29 * 86400 * 1000, now - 20 * 86400 * 1000], "p": [1.0, 2.0]}
+
+        with patch.object(crypto_service, "_fetch_historical_from_api", AsyncMock(return_value=week)) as api, \
+                patch.object(crypto_service, "_fetch_history_range", AsyncMock(return_value=older)) as head:
+            await crypto_service.get_crypto_historical_data("bitcoin", "7")
+            month = await crypto_service.get_crypto_historical_data("bitcoin", "30", columnar=True)
+
+        api.assert_called_once_with("bitcoin", "7")
+        assert head.call_args.args[2] == week["t"][0] // 1000
+        assert month == {"t": older["t"] + week["t"], "p": [1.0, 2.0, 3.0, 4.0]}
+
+    @pytest.mark.asyncio
+    async def test_wider_range_from_stale_series_does_not_join_tail_refresh(self, crypto_service, mock_redis):
+        """A 30-day chart over a stale 7-day series still gets the full 30 days"""
+        now = int(time.time() * 1000)
+        week = {"days": "7", "segments": [{"t": [now - 6 * 86400 * 1000, now - 86400 * 1000], "p": [3.0, 4.0]}]}
+        older = {"t": [now - 29 * 86400 * 1000, now - 20 * 86400 * 1000], "p": [1.0, 2.0]}
+        cache = crypto_service.history_cache
+
+        async def stale_fetch(key, refresh):
+            # Serve the stale week and start its tail refresh, as fetch does
+            await cache.refresh_in_background(key, refresh)
+            return week
+
+        async def fetch_range(coin_id, start, end):
+            if start >= week["segments"][0]["t"][-1] // 1000:
+                await asyncio.sleep(0.05)  # tail refresh still running
+                return None
+            return older
+
+        with patch.object(cache, "fetch", side_effect=stale_fetch), \
+                patch.object(cache, "get", AsyncMock(return_value=week)), \
+                patch.object(crypto_service, "_fetch_history_range", side_effect=fetch_range), \
+                patch.object(crypto_service, "_store_series", AsyncMock()):
+            month = await crypto_service.get_crypto_historical_data("bitcoin", "30", columnar=True)
+
+        assert month == {"t": older["t"] + week["segments"][0]["t"], "p": [1.0, 2.0, 3.0, 4.0]}
+
+    def test_history_ttl_scales_with_granularity(self):
+        assert history_ttl("1") < history_ttl("30") < history_ttl("365") == history_ttl("max")
+
 
 class TestCryptoEndpoint:
     """Integration tests for crypto endpoint"""
@@ -193,22 +354,28 @@ async def test_crypto_service_cache_operations():
 
     # Mock Redis for this test
     mock_redis = AsyncMock()
+    mock_redis.hget.return_value = None
 
     # Test caching
     service = CryptoService(mock_redis)
-    prices = {"BTC": 50000.0, "ETH": 3000.0}
+    prices = [
+        {"symbol": "BTC", "name": "Bitcoin", "price": 50000.0},
+        {"symbol": "ETH", "name": "Ethereum", "price": 3000.0},
+        {"symbol": "USDT", "name": "Tether", "price": 1.0}
+    ]
 
-    await service._cache_prices(prices, top_n=2)
+    await service._cache_prices(prices)
 
     # Verify setex was called with correct parameters
     mock_redis.setex.assert_called_once()
     call_args = mock_redis.setex.call_args
-    assert call_args[0][0] == "crypto_prices:2"  # key
-    assert call_args[0][1] == 60  # ttl
-    cached_data = json.loads(call_args[0][2])  # value
-    assert cached_data == prices
+    assert call_args[0][0] == "crypto_prices:v0:snapshot"  # key
+    assert call_args[0][1] == 3600  # hard ttl
+    entry = decode_entry(call_args[0][2])  # value
+    assert entry.value == prices
+    assert entry.soft_ttl == 60
 
-    # Test cache retrieval
+    # Test cache retrieval slices the snapshot
     mock_redis.get.return_value = json.dumps(prices)
     result = await service._get_from_cache(top_n=2)
-    assert result == prices
+    assert result == prices[:2]
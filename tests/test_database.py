@@ -0,0 +1,29 @@
+from unittest.mock import patch
+from sqlalchemy.pool import NullPool
+from app.database import TimedQueuePool, engine_options
+
+
+class TestEngineOptions:
+    """Pool configuration for the async engine"""
+
+    def test_pooled_engine_by_default(self):
+        options = engine_options("postgresql+asyncpg://postgres:x@db.example.supabase.co:5432/postgres")
+
+        assert options["poolclass"] is TimedQueuePool
+        assert options["pool_pre_ping"] is True
+        assert options["connect_args"]["statement_cache_size"] == 100
+
+    def test_transaction_pooler_disables_statement_caches(self):
+        options = engine_options("postgresql+asyncpg://postgres:x@pooler.supabase.com:6543/postgres")
+
+        assert options["connect_args"] == {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0
+        }
+
+    def test_null_pool_when_pooling_disabled(self):
+        with patch("app.database.settings.db_pool_enabled", False):
+            options = engine_options("postgresql+asyncpg://postgres:x@localhost:5432/postgres")
+
+        assert options["poolclass"] is NullPool
+        assert "pool_size" not in options
@@ -0,0 +1,53 @@
+import numpy as np
+from app.downsample import bucket_ohlc, downsample, lttb_indices
+
+
+class TestLTTB:
+    """Largest-Triangle-Three-Buckets point selection"""
+
+    def test_keeps_endpoints_and_spikes(self):
+        x = np.arange(1000, dtype=np.float64)
+        y = np.zeros(1000)
+        y[437] = 50.0  # a single spike must survive
+
+        keep = lttb_indices(x, y, 50)
+
+        assert len(keep) == 50
+        assert keep[0] == 0 and keep[-1] == 999
+        assert 437 in keep
+        assert np.all(np.diff(keep) > 0)
+
+    def test_short_series_is_unchanged(self):
+        columns = {"t": [1, 2, 3], "p": [1.0, 2.0, 3.0]}
+        assert downsample(columns, 10) is columns
+
+    def test_line_series_columns_stay_aligned(self):
+        columns = {"t": list(range(500)), "p": [float(i % 7) for i in range(500)]}
+
+        reduced = downsample(columns, 100)
+
+        assert len(reduced["t"]) == len(reduced["p"]) == 100
+        assert all(p == float(t % 7) for t, p in zip(reduced["t"], reduced["p"]))
+
+
+class TestOHLCBuckets:
+    """Min/max bucketing of candle series"""
+
+    def test_candles_merge_first_max_min_last_sum(self):
+        columns = {
+            "t": [0, 1, 2, 3],
+            "o": [10.0, 11.0, 12.0, 13.0],
+            "h": [15.0, 19.0, 14.0, 16.0],
+            "l": [9.0, 8.0, 11.0, 7.0],
+            "c": [11.0, 12.0, 13.0, 14.0],
+            "v": [1, 2, 3, 4]
+        }
+
+        assert bucket_ohlc(columns, 2) == {
+            "t": [0, 2],
+            "o": [10.0, 12.0],
+            "h": [19.0, 16.0],
+            "l": [8.0, 7.0],
+            "c": [12.0, 14.0],
+            "v": [3, 7]
+        }
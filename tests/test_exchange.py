@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from fastapi.testclient import TestClient
 from app.main import app
+from app.cache import decode_entry
 from app.services.exchange_rate_service import ExchangeRateService
 from app.services.logger import DatabaseLogger
 import redis.asyncio as redis
@@ -15,7 +16,9 @@ def client():
 
 @pytest.fixture
 def mock_redis():
-    return AsyncMock(spec=redis.Redis)
+    mock = AsyncMock(spec=redis.Redis)
+    mock.hget.return_value = None  # cache namespaces at generation 0
+    return mock
 
 
 @pytest.fixture
@@ -126,7 +129,8 @@ class TestExchangeRateService:
             await service.get_usd_rates()
             # Check TTL is 21600 seconds (6 hours)
             args, kwargs = mock_redis.setex.call_args
-            assert args[1] == 21600
+            assert decode_entry(args[2]).soft_ttl == 21600
+            assert args[1] == 172800  # hard ttl keeps a stale copy
 
 
 class TestExchangeRateRedisIntegration:
@@ -184,7 +188,7 @@ class TestExchangeRateRedisIntegration:
 
                 # Verify cache key format
                 args, kwargs = mock_redis.setex.call_args
-                assert args[0] == "exchange:usd_rates"
+                assert args[0] == "exchange:v0:usd_rates"
 
 
 class TestExchangeRateDatabaseLogging:
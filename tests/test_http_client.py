@@ -0,0 +1,52 @@
+import pytest
+import httpx
+from unittest.mock import patch
+from app.http_client import UpstreamClients, ConnectionStats
+
+
+class TestUpstreamClients:
+    """Pooled upstream HTTP clients"""
+
+    @pytest.mark.asyncio
+    async def test_pooled_client_reused_across_calls(self):
+        clients = UpstreamClients()
+        await clients.start()
+        try:
+            async with clients.client("coingecko") as first:
+                pass
+            async with clients.client("coingecko") as second:
+                pass
+            assert first is second
+            assert not first.is_closed
+            async with clients.client("finnhub") as other:
+                assert other is not first
+        finally:
+            await clients.close()
+        assert first.is_closed
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_one_off_client_outside_lifespan(self):
+        clients = UpstreamClients()
+        with patch('httpx.AsyncClient') as mock_client:
+            mock_client.return_value.__aenter__.return_value = "one-off"
+            async with clients.client("gnews") as client:
+                assert client == "one-off"
+            mock_client.assert_called_once_with(timeout=10.0)
+
+    @pytest.mark.asyncio
+    async def test_stats_track_connection_reuse(self):
+        stats = ConnectionStats()
+        for _ in range(3):
+            await stats.on_request(httpx.Request("GET", "https://example.com"))
+        await stats.trace("connection.connect_tcp.complete", {})
+
+        data = stats.as_dict()
+        assert data["requests"] == 3
+        assert data["connections_opened"] == 1
+        assert data["connections_reused"] == 2
+
+    def test_stats_endpoint_shape(self):
+        stats = UpstreamClients().stats()
+        assert stats["pooled"] is False
+        assert set(stats["providers"]) == {
+            "coingecko", "finnhub", "openweather", "gnews", "exchangerate"}
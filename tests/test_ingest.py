@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.ingest import LogWriter
+from app.models.logs import NewsLog, PriceCandle, PriceLog
+
+
+def session_factory(session):
+    factory = MagicMock()
+    factory.return_value.__aenter__ = AsyncMock(return_value=session)
+    factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    return factory
+
+
+class TestLogWriter:
+    """Write-behind batching, backpressure and shutdown flush"""
+
+    @pytest.mark.asyncio
+    async def test_rows_are_written_in_one_batch_per_flush(self):
+        session = AsyncMock()
+        writer = LogWriter(session_factory(session))
+        with patch("app.ingest.settings.ingest_flush_interval", 0.01):
+            writer.start()
+            assert await writer.log_price("crypto", "btc", 67000.0)
+            assert await writer.log_price("stocks", "AAPL", 189.3)
+            assert await writer.log_news("Headline", "Reuters", "https://example.com")
+            await writer.stop()
+
+        session.commit.assert_called_once()
+        statements = {call.args[0].table.name: call.args[1:] for call in session.execute.call_args_list}
+        assert [row["symbol"] for row in statements[PriceLog.__tablename__][0]] == ["BTC", "AAPL"]
+        assert statements[NewsLog.__tablename__][0][0]["title"] == "Headline"
+        # Candles are upserted in the same transaction
+        assert PriceCandle.__tablename__ in statements
+        assert writer.stats()["written"] == 3
+
+    @pytest.mark.asyncio
+    async def test_full_buffer_drops_after_put_timeout(self):
+        writer = LogWriter(session_factory(AsyncMock()))
+        with patch("app.ingest.settings.ingest_max_rows", 1), \
+                patch("app.ingest.settings.ingest_put_timeout", 0.01):
+            writer._queue = asyncio.Queue(maxsize=1)  # no flusher running
+            assert await writer.log_price("crypto", "BTC", 1.0)
+            assert not await writer.log_price("crypto", "ETH", 2.0)
+        assert writer.stats()["dropped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_counted_not_raised(self):
+        session = AsyncMock()
+        session.commit.side_effect = Exception("connection refused")
+        writer = LogWriter(session_factory(session))
+        writer.start()
+        await writer.log_price("crypto", "BTC", 1.0)
+        await writer.stop()
+
+        assert writer.stats()["failed"] == 1
+        assert writer.stats()["written"] == 0
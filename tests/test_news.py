@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from fastapi.testclient import TestClient
 from app.main import app
+from app.cache import decode_entry
 from app.services.news_service import NewsService
 import redis.asyncio as redis
 
@@ -13,7 +14,9 @@ def client():
 
 @pytest.fixture
 def mock_redis():
-    return AsyncMock(spec=redis.Redis)
+    mock = AsyncMock(spec=redis.Redis)
+    mock.hget.return_value = None  # cache namespaces at generation 0
+    return mock
 
 
 class TestNewsEndpoint:
@@ -139,7 +142,8 @@ class TestNewsService:
             await service.get_top_headlines()
             # Check TTL is 900 seconds (15 minutes)
             args, kwargs = mock_redis.setex.call_args
-            assert args[1] == 900
+            assert decode_entry(args[2]).soft_ttl == 900
+            assert args[1] == 86400  # hard ttl keeps a stale copy
 
 
 class TestNewsRedisIntegration:
@@ -202,7 +206,7 @@ class TestNewsRedisIntegration:
 
                 # Verify cache key format
                 args, kwargs = mock_redis.setex.call_args
-                assert args[0] == "news:top_headlines"
+                assert args[0] == "news:v0:top_headlines"
 
 
 class TestNewsDatabaseLogging:
@@ -0,0 +1,22 @@
+from datetime import date
+from app.partitions import expired_partitions, upcoming_partitions
+
+
+class TestPriceLogPartitions:
+    """Monthly partition planning for price_logs"""
+
+    def test_upcoming_partitions_cross_year_boundary(self):
+        partitions = upcoming_partitions(date(2026, 11, 17), ahead=2)
+
+        assert partitions == [
+            ("price_logs_2026_11", date(2026, 11, 1), date(2026, 12, 1)),
+            ("price_logs_2026_12", date(2026, 12, 1), date(2027, 1, 1)),
+            ("price_logs_2027_01", date(2027, 1, 1), date(2027, 2, 1)),
+        ]
+
+    def test_only_months_entirely_past_retention_expire(self):
+        names = ["price_logs_2026_06", "price_logs_2026_07", "price_logs_2026_08",
+                 "price_logs_2026_10", "price_logs_default"]
+
+        # Cutoff 2026-07-19: July still holds rows inside the retention window
+        assert expired_partitions(names, date(2026, 10, 17), 90) == ["price_logs_2026_06"]
@@ -0,0 +1,80 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.http_client import UpstreamClients
+from app.rate_limiter import (
+    PRIORITY_BACKGROUND, RateLimiter, RateLimitExceeded, upstream_priority)
+
+
+class TestRateLimiter:
+    """Shared token bucket per provider"""
+
+    @pytest.mark.asyncio
+    async def test_token_available_goes_straight_through(self):
+        mock_redis = AsyncMock()
+        mock_redis.eval.return_value = [1, b"9", 0]
+        limiter = RateLimiter(mock_redis)
+
+        await limiter.acquire("coingecko")
+
+        args = mock_redis.eval.call_args[0]
+        assert args[1:4] == (1, "ratelimit:coingecko", 0.5)
+        assert args[4:] == (10, 1, 0.0)
+        await limiter.acquire("coingecko")
+        stats = limiter._stats["coingecko"].as_dict()
+        assert stats["acquired"] == 2
+        assert (stats["waited"], stats["wait_ms"]) == (0, 0)
+
+    @pytest.mark.asyncio
+    async def test_waits_briefly_for_next_token(self):
+        mock_redis = AsyncMock()
+        mock_redis.eval.side_effect = [[0, b"0.9", 50], [1, b"0", 0]]
+        limiter = RateLimiter(mock_redis)
+
+        with patch("app.rate_limiter.asyncio.sleep", AsyncMock()) as sleep:
+            await limiter.acquire("finnhub")
+
+        sleep.assert_awaited_once_with(0.05)
+        assert limiter._stats["finnhub"].waited == 1
+
+    @pytest.mark.asyncio
+    async def test_rejects_without_calling_when_wait_too_long(self):
+        mock_redis = AsyncMock()
+        mock_redis.eval.return_value = [0, b"0", 864000]
+        limiter = RateLimiter(mock_redis)
+
+        with pytest.raises(RateLimitExceeded, match="API rate limit exceeded"):
+            await limiter.acquire("gnews")
+        assert limiter._stats["gnews"].rejected == 1
+
+    @pytest.mark.asyncio
+    async def test_background_calls_leave_reserve_for_users(self):
+        mock_redis = AsyncMock()
+        mock_redis.eval.return_value = [1, b"5", 0]
+        limiter = RateLimiter(mock_redis)
+
+        token = upstream_priority.set(PRIORITY_BACKGROUND)
+        try:
+            await limiter.acquire("finnhub")
+        finally:
+            upstream_priority.reset(token)
+
+        assert mock_redis.eval.call_args[0][-1] == 6.0  # 20% of a 30 token burst
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_fails_open(self):
+        mock_redis = AsyncMock()
+        mock_redis.eval.side_effect = ConnectionError("down")
+        await RateLimiter(mock_redis).acquire("coingecko")
+
+    @pytest.mark.asyncio
+    async def test_client_takes_token_before_request(self):
+        mock_redis = AsyncMock()
+        mock_redis.eval.return_value = [0, b"0", 864000]
+        clients = UpstreamClients()
+        await clients.start(mock_redis)
+        try:
+            with pytest.raises(RateLimitExceeded):
+                async with clients.client("gnews"):
+                    pass
+        finally:
+            await clients.close()
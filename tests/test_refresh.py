@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.refresh_service import RefreshService
+
+
+class TestRefreshService:
+    """Concurrent refresh of every service"""
+
+    @pytest.mark.asyncio
+    async def test_services_run_concurrently_with_deadlines(self):
+        service = RefreshService(AsyncMock())
+        service.timeout = 0.2
+
+        async def slow():
+            await asyncio.sleep(0.15)
+            return 2
+
+        async def hung():
+            await asyncio.sleep(10)
+
+        async def broken():
+            raise Exception("API rate limit exceeded")
+
+        service.jobs = {"crypto": slow, "stocks": slow, "weather": hung, "news": broken}
+        started = asyncio.get_running_loop().time()
+        results = await service.refresh_all()
+        elapsed = asyncio.get_running_loop().time() - started
+
+        assert elapsed < 0.35
+        assert results["crypto"]["status"] == "success"
+        assert results["crypto"]["keys"] == 2
+        assert results["weather"]["status"] == "timeout"
+        assert results["news"] == {
+            "status": "error",
+            "error": "API rate limit exceeded",
+            "duration_ms": results["news"]["duration_ms"]
+        }
+
+    @pytest.mark.asyncio
+    async def test_timed_out_refresh_still_completes(self):
+        service = RefreshService(AsyncMock())
+        service.timeout = 0.01
+        finished = asyncio.Event()
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            finished.set()
+            return 1
+
+        service.jobs = {"stocks": slow}
+        results = await service.refresh_all()
+
+        assert results["stocks"]["status"] == "timeout"
+        await asyncio.wait_for(finished.wait(), 1)
+
+    @pytest.mark.asyncio
+    async def test_hot_stock_symbols_are_refreshed_without_clearing(self):
+        mock_redis = AsyncMock()
+        mock_redis.hget.return_value = None
+        mock_redis.zrevrangebyscore.return_value = [b"MSFT", b"NVDA"]
+        service = RefreshService(mock_redis)
+        service.jobs = {"stocks": service.jobs["stocks"]}
+
+        with patch("app.services.stocks_service.StocksService._fetch_from_api",
+                   AsyncMock(return_value=100.0)) as api, \
+                patch("app.cache.TieredCache.set_many", AsyncMock()) as set_many:
+            results = await service.refresh_all()
+
+        assert results["stocks"]["keys"] == 2
+        assert sorted(call.args[0] for call in api.call_args_list) == ["MSFT", "NVDA"]
+        set_many.assert_awaited_once()
+        mock_redis.hincrby.assert_not_called()
+        mock_redis.delete.assert_not_called()
+
+
+@patch('app.routes.refresh.RefreshService')
+def test_refresh_endpoint_reports_timings(mock_service_class):
+    mock_service_class.return_value.refresh_all = AsyncMock(
+        return_value={"crypto": {"status": "success", "keys": 1, "duration_ms": 12.5}})
+
+    response = TestClient(app).post("/api/refresh/")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["results"]["crypto"]["duration_ms"] == 12.5
+    assert data["timestamp"] != "2024-01-01T00:00:00Z"
+    assert "duration_ms" in data
@@ -0,0 +1,56 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.rollups import candle_rows, get_rollup_history, pick_interval
+
+
+def tick(symbol, value, moment):
+    return {"source": "crypto", "symbol": symbol, "value": value, "timestamp": moment}
+
+
+class TestCandleRows:
+    """Folding raw price rows into candles"""
+
+    def test_rows_fold_into_ohlc_per_interval(self):
+        start = datetime(2026, 10, 17, 12, 0, 10, tzinfo=timezone.utc)
+        rows = [
+            tick("BTC", 101.0, start + timedelta(seconds=20)),
+            tick("BTC", 100.0, start),  # arrives late but opened the minute
+            tick("BTC", 99.0, start + timedelta(seconds=40)),
+            tick("BTC", 105.0, start + timedelta(seconds=60)),  # next minute
+        ]
+
+        candles = {(c["interval"], c["bucket"].minute): c for c in candle_rows(rows)}
+
+        first = candles[("1m", 0)]
+        assert (first["open"], first["high"], first["low"], first["close"], first["ticks"]) == \
+            (100.0, 101.0, 99.0, 99.0, 3)
+        assert candles[("1m", 1)]["open"] == 105.0
+        hour = candles[("1h", 0)]
+        assert (hour["open"], hour["high"], hour["close"], hour["ticks"]) == (100.0, 105.0, 105.0, 4)
+
+    def test_interval_keeps_candle_count_bounded(self):
+        assert pick_interval(3600) == "1m"
+        assert pick_interval(86400) == "5m"
+        assert pick_interval(7 * 86400) == "1h"
+        assert pick_interval(365 * 86400) == "1d"
+
+
+class TestRollupHistory:
+    """Serving charts from candles only when they cover the range"""
+
+    @pytest.mark.asyncio
+    async def test_partial_coverage_falls_back_to_upstream(self):
+        recent = int(datetime.now(timezone.utc).timestamp() * 1000)
+        with patch("app.rollups.read_candles", AsyncMock(return_value=[
+                {"timestamp": recent, "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "ticks": 1}])):
+            assert await get_rollup_history("crypto", "BTC", 7 * 86400, MagicMock()) is None
+
+    @pytest.mark.asyncio
+    async def test_covered_range_is_served_from_candles(self):
+        start = datetime.now(timezone.utc) - timedelta(days=7)
+        candles = [{"timestamp": int(start.timestamp() * 1000), "open": 1.0, "high": 2.0,
+                    "low": 0.5, "close": 1.5, "ticks": 60}]
+        with patch("app.rollups.read_candles", AsyncMock(return_value=candles)) as read:
+            assert await get_rollup_history("crypto", "BTC", 7 * 86400, MagicMock()) == candles
+        assert read.call_args.args[2] == "1h"
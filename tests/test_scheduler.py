@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from fastapi.testclient import TestClient
+from app.main import app
+from app.scheduler import Scheduler, register_prefetch_jobs, scheduler
+
+
+class TestScheduler:
+    """Background prefetch jobs"""
+
+    @pytest.mark.asyncio
+    async def test_run_job_records_outcome(self):
+        sched = Scheduler()
+        ok = sched.add_job("ok", 60, AsyncMock(return_value=1))
+        broken = sched.add_job("broken", 60, AsyncMock(side_effect=Exception("API rate limit exceeded")))
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        hung = sched.add_job("hung", 60, hang, timeout=0.05)
+
+        for job in (ok, broken, hung):
+            await sched.run_job(job)
+
+        assert ok.last_status == "success"
+        assert ok.last_run is not None and ok.last_duration_ms is not None
+        assert (broken.last_status, broken.last_error) == ("error", "API rate limit exceeded")
+        assert hung.last_status == "timeout"
+        assert [job["failures"] for job in sched.status()] == [0, 1, 1]
+
+    @pytest.mark.asyncio
+    async def test_job_skipped_when_another_worker_holds_lease(self):
+        mock_redis = AsyncMock()
+        mock_redis.set.return_value = None
+        sched = Scheduler()
+        func = AsyncMock()
+        job = sched.add_job("crypto", 48, func)
+        sched.redis_client = mock_redis
+
+        await sched.run_job(job)
+
+        func.assert_not_awaited()
+        assert job.last_status == "skipped"
+        assert mock_redis.set.call_args.kwargs == {"nx": True, "px": 43200}
+
+    @pytest.mark.asyncio
+    async def test_start_runs_jobs_and_schedules_next(self):
+        sched = Scheduler()
+        func = AsyncMock()
+        job = sched.add_job("news", 3600, func)
+
+        sched.start()
+        await asyncio.sleep(0.01)
+        await sched.stop()
+
+        func.assert_awaited_once()
+        assert job.next_run > job.last_run
+
+    def test_prefetch_cadence_leads_ttls(self):
+        sched = Scheduler()
+        register_prefetch_jobs(sched, AsyncMock())
+
+        assert sched.jobs["crypto"].interval == 48
+        assert sched.jobs["weather"].interval == 240
+        assert {"stocks", "news", "exchange", "coin_index", "cache_sweep"} <= set(sched.jobs)
+
+    def test_low_quota_provider_cadence_fits_its_quota(self):
+        sched = Scheduler()
+        register_prefetch_jobs(sched, AsyncMock())
+
+        # GNews allows 100 calls/day; prefetching gets at most half of them
+        assert 86400 / sched.jobs["news"].interval <= 50
+
+
+def test_scheduler_status_endpoint():
+    scheduler.add_job("crypto", 48, AsyncMock())
+    try:
+        response = TestClient(app).get("/api/metrics/scheduler")
+    finally:
+        scheduler.jobs.clear()
+
+    assert response.status_code == 200
+    job = response.json()["jobs"][0]
+    assert job["name"] == "crypto"
+    assert job["last_run"] is None
+    assert job["next_run"] is None
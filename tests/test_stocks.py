@@ -1,7 +1,9 @@
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from fastapi.testclient import TestClient
 from app.main import app
+from app.cache import decode_entry
 from app.services.stocks_service import StocksService
 import redis.asyncio as redis
 
@@ -13,7 +15,9 @@ def client():
 
 @pytest.fixture
 def mock_redis():
-    return AsyncMock(spec=redis.Redis)
+    mock = AsyncMock(spec=redis.Redis)
+    mock.hget.return_value = None  # cache namespaces at generation 0
+    return mock
 
 
 class TestStocksEndpoint:
@@ -180,7 +184,88 @@ class TestStocksService:
 
             # Verify cache key format
             args, kwargs = mock_redis.setex.call_args
-            assert args[0] == "stock_price:AAPL"
+            assert args[0] == "stock_price:v0:AAPL"
+
+    @pytest.mark.asyncio
+    async def test_historical_columnar_format(self, mock_redis):
+        """format=columnar returns parallel o/h/l/c/v arrays"""
+        with patch("app.services.stocks_service.get_rollup_history", AsyncMock(return_value=None)):
+            data = await StocksService(mock_redis).get_stock_historical_data_by_period(
+                "AAPL", "1D", columnar=True)
+
+        assert "prices" not in data
+        assert set(data) >= {"symbol", "period", "t", "o", "h", "l", "c", "v"}
+        assert len({len(data[column]) for column in "tohlcv"}) == 1
+
+    def test_historical_rejects_unknown_format(self, client):
+        response = client.get("/api/stocks/historical/AAPL?format=xml")
+        assert response.status_code == 400
+
+
+class TestStocksBatchPrices:
+    """Multi-symbol quotes"""
+
+    @pytest.mark.asyncio
+    async def test_cached_symbols_skip_api_and_missing_are_written_back(self, mock_redis):
+        mock_redis.mget = AsyncMock(return_value=[b"189.3", None, None])
+        pipe = MagicMock()
+        pipe.execute = AsyncMock()
+        mock_redis.pipeline = MagicMock()
+        mock_redis.pipeline.return_value.__aenter__.return_value = pipe
+
+        service = StocksService(mock_redis)
+
+        async def fetch(symbol):
+            if symbol == "BAD":
+                raise ValueError(f"Invalid symbol: {symbol}")
+            return 410.5
+
+        with patch.object(service, "_fetch_from_api", side_effect=fetch) as api:
+            prices, errors = await service.get_stock_prices(["aapl", "MSFT", "BAD", "AAPL"])
+
+        assert prices == {"AAPL": 189.3, "MSFT": 410.5}
+        assert errors == {"BAD": "Invalid symbol: BAD"}
+        mock_redis.mget.assert_called_once_with(
+            ["stock_price:v0:AAPL", "stock_price:v0:MSFT", "stock_price:v0:BAD"])
+        assert sorted(call.args[0] for call in api.call_args_list) == ["BAD", "MSFT"]
+        pipe.setex.assert_called_once()
+        assert pipe.setex.call_args[0][0] == "stock_price:v0:MSFT"
+
+    @pytest.mark.asyncio
+    async def test_batch_shares_single_flight_with_single_symbol_requests(self, mock_redis):
+        mock_redis.get = AsyncMock(return_value=None)
+        mock_redis.mget = AsyncMock(return_value=[None])
+        mock_redis.set = AsyncMock(return_value=True)
+        mock_redis.pipeline = MagicMock()
+        mock_redis.pipeline.return_value.__aenter__.return_value = MagicMock(execute=AsyncMock())
+        service = StocksService(mock_redis)
+
+        async def slow_fetch(symbol):
+            await asyncio.sleep(0.01)
+            return 410.5
+
+        with patch.object(service, "_fetch_from_api", side_effect=slow_fetch) as api:
+            (prices, _), price = await asyncio.gather(
+                service.get_stock_prices(["MSFT"]), service.get_stock_price("MSFT"))
+
+        assert prices == {"MSFT": 410.5}
+        assert price == 410.5
+        api.assert_called_once_with("MSFT")
+
+    @patch('app.routes.stocks.StocksService')
+    def test_prices_endpoint(self, mock_service_class, client):
+        mock_service = AsyncMock()
+        mock_service.get_stock_prices.return_value = (
+            {"AAPL": 189.3}, {"BAD": "Invalid symbol: BAD"})
+        mock_service_class.return_value = mock_service
+
+        response = client.get("/api/stocks/prices?symbols=AAPL,BAD")
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "prices": [{"symbol": "AAPL", "price": 189.3}],
+            "errors": {"BAD": "Invalid symbol: BAD"}
+        }
 
 
 class TestStocksRedisIntegration:
@@ -231,9 +316,10 @@ class TestStocksRedisIntegration:
                 service = StocksService(mock_redis)
                 await service.get_stock_price("AAPL")
 
-                # Check TTL is 60 seconds
+                # Check TTL is 60 seconds, with a stale copy kept for an hour
                 args, kwargs = mock_redis.setex.call_args
-                assert args[1] == 60
+                assert decode_entry(args[2]).soft_ttl == 60
+                assert args[1] == 3600
 
 
 class TestStocksDatabaseLogging:
@@ -2,13 +2,16 @@ import pytest
 import asyncio
 from unittest.mock import AsyncMock, patch, MagicMock
 from app.services.stocks_service import StocksService
+from app.cache import decode_entry
 import redis.asyncio as redis
 import httpx
 
 
 @pytest.fixture
 def mock_redis():
-    return AsyncMock(spec=redis.Redis)
+    mock = AsyncMock(spec=redis.Redis)
+    mock.hget.return_value = None  # cache namespaces at generation 0
+    return mock
 
 
 @pytest.fixture
@@ -31,7 +34,7 @@ class TestStocksServiceIntegration:
         result = await service.get_stock_price("AAPL")
 
         # Verify cache was checked
-        mock_redis.get.assert_called_once_with("stock_price:AAPL")
+        mock_redis.get.assert_called_once_with("stock_price:v0:AAPL")
         # Verify API was not called (no httpx calls)
         assert result == 189.30
 
@@ -56,12 +59,16 @@ class TestStocksServiceIntegration:
             result = await service.get_stock_price("AAPL")
 
             # Verify cache was checked
-            mock_redis.get.assert_called_once_with("stock_price:AAPL")
+            mock_redis.get.assert_called_once_with("stock_price:v0:AAPL")
             # Verify API was called
             mock_client_instance.get.assert_called_once()
             # Verify result was cached
-            mock_redis.setex.assert_called_once_with(
-                "stock_price:AAPL", 60, "189.3")
+            mock_redis.setex.assert_called_once()
+            key, ttl, payload = mock_redis.setex.call_args[0]
+            assert key == "stock_price:v0:AAPL"
+            assert ttl == 3600
+            assert decode_entry(payload).value == 189.3
+            assert decode_entry(payload).soft_ttl == 60
             assert result == 189.30
 
     @pytest.mark.asyncio
@@ -182,9 +189,13 @@ class TestStocksServiceIntegration:
             result = await service.get_stock_price("aapl")  # lowercase
 
             # Verify cache key uses uppercase
-            mock_redis.get.assert_called_once_with("stock_price:AAPL")
-            mock_redis.setex.assert_called_once_with(
-                "stock_price:AAPL", 60, "189.3")
+            mock_redis.get.assert_called_once_with("stock_price:v0:AAPL")
+            mock_redis.setex.assert_called_once()
+            key, ttl, payload = mock_redis.setex.call_args[0]
+            assert key == "stock_price:v0:AAPL"
+            assert ttl == 3600
+            assert decode_entry(payload).value == 189.3
+            assert decode_entry(payload).soft_ttl == 60
             assert result == 189.30
 
     @pytest.mark.asyncio
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.cache import LocalCache, TieredCache
+from app.events import CHANNEL, STREAM_KEY, Event, EventBroker, event_broker, replay_events
+from fastapi.testclient import TestClient
+from app.main import app
+from app.routes.stream import event_stream
+
+
+class TestEventBroker:
+    """Fan-out of published events to local subscribers"""
+
+    @pytest.mark.asyncio
+    async def test_dispatch_reaches_every_subscriber(self):
+        broker = EventBroker()
+        event = Event("1-0", "stock_price", '{"key":"AAPL","value":189.3}')
+        async with broker.subscribe() as first, broker.subscribe() as second:
+            broker.dispatch(event)
+            assert first.get_nowait() is event
+            assert second.get_nowait() is event
+        assert broker.stats()["subscribers"] == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_is_told_to_leave(self):
+        broker = EventBroker()
+        with patch("app.events.settings.stream_client_queue", 2):
+            async with broker.subscribe() as queue:
+                for i in range(3):
+                    broker.dispatch(Event(f"{i}-0", "news", "{}"))
+                assert queue.get_nowait() is None
+                assert broker.stats()["subscribers"] == 0
+
+    @pytest.mark.asyncio
+    async def test_replay_reads_after_last_event_id(self):
+        mock_redis = AsyncMock()
+        mock_redis.xrange.return_value = [
+            (b"5-0", {b"topic": b"weather", b"data": b'{"key":"Paris:metric"}'})]
+
+        events = await replay_events(mock_redis, "4-0")
+
+        assert events == [Event("5-0", "weather", '{"key":"Paris:metric"}')]
+        assert mock_redis.xrange.call_args.kwargs["min"] == "(4-0"
+
+
+class TestPublishing:
+    """Cache writes publish change events"""
+
+    @pytest.mark.asyncio
+    async def test_set_publishes_once_to_stream_and_channel(self):
+        mock_redis = AsyncMock()
+        mock_redis.hget.return_value = None
+        cache = TieredCache(mock_redis, namespace="stock_price",
+                            local=LocalCache(10, 1000), publish=True)
+
+        await cache.set("AAPL", 189.3, 60)
+
+        args = mock_redis.eval.call_args[0]
+        assert args[1:4] == (2, STREAM_KEY, CHANNEL)
+        assert args[5] == "stock_price"
+        assert json.loads(args[6]) == {"key": "AAPL", "value": 189.3}
+
+    @pytest.mark.asyncio
+    async def test_unpublished_cache_does_not_publish(self):
+        mock_redis = AsyncMock()
+        cache = TieredCache(mock_redis, local=LocalCache(10, 1000))
+        await cache.set("k", 1, 60)
+        mock_redis.eval.assert_not_called()
+
+
+class TestEventStream:
+    """SSE framing, resume and heartbeats"""
+
+    @pytest.mark.asyncio
+    async def test_resume_replays_then_skips_duplicates(self):
+        mock_redis = AsyncMock()
+        mock_redis.xrange.return_value = [
+            (b"5-0", {b"topic": b"news", b"data": b"{}"})]
+        stream = event_stream(mock_redis, None, "4-0")
+
+        assert await stream.__anext__() == "retry: 3000\n\n"
+        assert await stream.__anext__() == "id: 5-0\nevent: news\ndata: {}\n\n"
+
+        event_broker.dispatch(Event("5-0", "news", "{}"))  # already replayed
+        event_broker.dispatch(Event("6-0", "crypto_prices", "[]"))
+        assert await stream.__anext__() == "id: 6-0\nevent: crypto_prices\ndata: []\n\n"
+        await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_topic_filter_and_heartbeat(self):
+        with patch("app.routes.stream.settings.stream_heartbeat", 0.01):
+            stream = event_stream(AsyncMock(), {"stock_price"}, None)
+            await stream.__anext__()
+            await asyncio.sleep(0)
+            event_broker.dispatch(Event("7-0", "news", "{}"))
+            assert await stream.__anext__() == ": heartbeat\n\n"
+            await stream.aclose()
+
+    def test_malformed_last_event_id_is_rejected(self):
+        response = TestClient(app).get("/api/stream", headers={"Last-Event-ID": "abc"})
+
+        assert response.status_code == 400
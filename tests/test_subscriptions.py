@@ -0,0 +1,140 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.events import Event
+from app.routes.ws import handle_message
+from app.subscriptions import CRYPTO, STOCKS, Subscriber, SymbolHub, symbol_hub
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.send_text = AsyncMock(side_effect=lambda text: self.sent.append(json.loads(text)))
+        self.close = AsyncMock()
+
+
+class TestSymbolHub:
+    """Per-symbol delta fan-out"""
+
+    def test_only_followers_get_changed_fields(self):
+        hub = SymbolHub()
+        btc, aapl = Subscriber(FakeWebSocket()), Subscriber(FakeWebSocket())
+        hub.follow(btc, CRYPTO, ["BTC"])
+        hub.follow(aapl, STOCKS, ["AAPL"])
+
+        hub.apply(Event("1-0", "crypto_prices", json.dumps({"key": "snapshot", "value": [
+            {"symbol": "BTC", "name": "Bitcoin", "price": 50000.0},
+            {"symbol": "ETH", "name": "Ethereum", "price": 3000.0}]})))
+        hub.apply(Event("2-0", "crypto_prices", json.dumps({"key": "snapshot", "value": [
+            {"symbol": "BTC", "name": "Bitcoin", "price": 50100.0},
+            {"symbol": "ETH", "name": "Ethereum", "price": 3001.0}]})))
+
+        assert btc._deltas == {"crypto": {"BTC": {"name": "Bitcoin", "price": 50100.0}}}
+        assert aapl._deltas == {}
+        assert hub.quotes[(CRYPTO, "ETH")]["price"] == 3001.0
+
+    def test_unchanged_quote_sends_nothing(self):
+        hub = SymbolHub()
+        subscriber = Subscriber(FakeWebSocket())
+        hub.follow(subscriber, STOCKS, ["AAPL"])
+        hub.update(STOCKS, "AAPL", {"price": 189.3})
+        subscriber._deltas.clear()
+
+        hub.update(STOCKS, "AAPL", {"price": 189.3})
+
+        assert subscriber._deltas == {}
+
+    def test_remove_drops_every_subscription(self):
+        hub = SymbolHub()
+        subscriber = Subscriber(FakeWebSocket())
+        hub.follow(subscriber, STOCKS, ["AAPL", "MSFT"])
+        hub.remove(subscriber)
+        assert hub.stats() == {"subscribers": 0, "symbols": 0}
+
+
+class TestSubscriber:
+    """Backpressure for slow consumers"""
+
+    @pytest.mark.asyncio
+    async def test_deltas_coalesce_while_client_is_busy(self):
+        websocket = FakeWebSocket()
+        subscriber = Subscriber(websocket)
+        subscriber.push_delta(STOCKS, "AAPL", {"price": 1.0})
+        subscriber.push_delta(STOCKS, "AAPL", {"price": 2.0})
+        subscriber.push_delta(CRYPTO, "BTC", {"price": 3.0})
+
+        sender = asyncio.create_task(subscriber.run())
+        await asyncio.sleep(0.01)
+        sender.cancel()
+
+        assert websocket.sent == [
+            {"type": "delta", "stocks": {"AAPL": {"price": 2.0}}, "crypto": {"BTC": {"price": 3.0}}}]
+
+    @pytest.mark.asyncio
+    async def test_client_that_stops_reading_is_closed(self):
+        async def stalled(text):
+            await asyncio.sleep(10)
+
+        websocket = FakeWebSocket()
+        websocket.send_text = stalled
+        subscriber = Subscriber(websocket)
+        subscriber.push_message({"type": "snapshot"})
+
+        with patch("app.subscriptions.settings.ws_send_timeout", 0.01):
+            with pytest.raises(asyncio.TimeoutError):
+                await subscriber.run()
+        websocket.close.assert_awaited_once_with(code=1013)
+
+
+class TestSubscribeMessages:
+    """Subscribe/unsubscribe protocol"""
+
+    @pytest.fixture(autouse=True)
+    def clean_hub(self):
+        yield
+        symbol_hub.quotes.clear()
+        symbol_hub._followers.clear()
+
+    @pytest.mark.asyncio
+    async def test_subscribe_sends_snapshot_from_cached_quotes(self):
+        subscriber = Subscriber(FakeWebSocket())
+        with patch("app.routes.ws.StocksService") as service_class:
+            service_class.return_value.get_stock_prices = AsyncMock(
+                return_value=({"AAPL": 189.3}, {"BAD": "Invalid symbol: BAD"}))
+            await handle_message(AsyncMock(), subscriber,
+                                 {"action": "subscribe", "stocks": ["aapl", "bad"]})
+
+        assert subscriber._outbox[0] == {
+            "type": "snapshot",
+            "stocks": {"AAPL": {"price": 189.3}},
+            "errors": {"BAD": "Invalid symbol: BAD"}
+        }
+        assert subscriber.following == {(STOCKS, "AAPL"), (STOCKS, "BAD")}
+
+        await handle_message(AsyncMock(), subscriber, {"action": "unsubscribe", "stocks": ["AAPL"]})
+        assert subscriber.following == {(STOCKS, "BAD")}
+
+    @pytest.mark.asyncio
+    async def test_crypto_outside_top_100_is_reported(self):
+        subscriber = Subscriber(FakeWebSocket())
+        with patch("app.routes.ws.CryptoService") as service_class:
+            service_class.return_value.get_crypto_prices = AsyncMock(
+                return_value=[{"symbol": "BTC", "name": "Bitcoin", "price": 67000.0}])
+            await handle_message(AsyncMock(), subscriber,
+                                 {"action": "subscribe", "crypto": ["btc", "pepe"]})
+
+        assert subscriber._outbox[0] == {
+            "type": "snapshot",
+            "crypto": {"BTC": {"name": "Bitcoin", "price": 67000.0}},
+            "errors": {"PEPE": "PEPE is not in the top 100 coins"}
+        }
+
+    @pytest.mark.asyncio
+    async def test_symbol_limit_enforced(self):
+        subscriber = Subscriber(FakeWebSocket())
+        with patch("app.routes.ws.settings.ws_max_symbols", 1):
+            await handle_message(AsyncMock(), subscriber,
+                                 {"action": "subscribe", "crypto": ["BTC", "ETH"]})
+        assert subscriber._outbox[0]["type"] == "error"
+        assert subscriber.following == set()
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.services.crypto_service import CryptoService
+from app.services.stocks_service import StocksService
+from app.synthetic import gbm_ohlcv, seed_for, time_bucket
+
+
+class TestGBM:
+    """Seeded geometric Brownian motion candles"""
+
+    def test_same_seed_same_series(self):
+        first = gbm_ohlcv(seed_for("AAPL", "1M", 0), 0, 60, 500, 200.0, 0.01)
+        second = gbm_ohlcv(seed_for("AAPL", "1M", 0), 0, 60, 500, 200.0, 0.01)
+        other = gbm_ohlcv(seed_for("AAPL", "1M", 60), 0, 60, 500, 200.0, 0.01)
+
+        assert all(np.array_equal(first[name], second[name]) for name in first)
+        assert not np.array_equal(first["c"], other["c"])
+
+    def test_candles_are_consistent(self):
+        candles = gbm_ohlcv(1, 1000, 60, 200_000, 50.0, 0.05)
+
+        assert np.array_equal(np.diff(candles["t"]), np.full(199_999, 60))
+        assert candles["o"][0] == 50.0
+        assert np.array_equal(candles["o"][1:], candles["c"][:-1])
+        assert np.all(candles["h"] >= np.maximum(candles["o"], candles["c"]))
+        assert np.all(candles["l"] <= np.minimum(candles["o"], candles["c"]))
+        assert np.all(candles["l"] > 0) and np.all(candles["v"] > 0)
+
+    def test_log_returns_have_requested_volatility(self):
+        closes = gbm_ohlcv(7, 0, 1, 100_000, 100.0, 0.02)["c"]
+        assert np.std(np.diff(np.log(closes))) == pytest.approx(0.02, rel=0.02)
+
+    def test_time_bucket(self):
+        assert time_bucket(1234.5, 60) == 1200
+
+
+class TestMockData:
+    """Mock fallbacks repeat within a time bucket"""
+
+    @pytest.mark.asyncio
+    async def test_stock_mock_history_is_reproducible(self):
+        service = StocksService(AsyncMock())
+
+        first = await service.get_mock_historical_data("aapl", "1M")
+        second = await service.get_mock_historical_data("AAPL", "1M")
+
+        assert first == second
+        assert len(first["prices"]) == 100
+        assert set(first["prices"][0]) == {"timestamp", "open", "high", "low", "close", "volume"}
+        assert first["prices"][1]["timestamp"] - first["prices"][0]["timestamp"] == 2592000 * 10
+
+    @pytest.mark.asyncio
+    async def test_columnar_stock_mock_skips_rows(self):
+        service = StocksService(AsyncMock())
+
+        with patch("app.services.stocks_service.get_rollup_history", AsyncMock(return_value=None)), \
+                patch("app.services.stocks_service.to_rows") as to_rows:
+            columns = await service.get_stock_historical_data_by_period("AAPL", "1W", columnar=True)
+
+        to_rows.assert_not_called()
+        assert set(columns) == {"symbol", "period", "t", "o", "h", "l", "c", "v"}
+        assert len(columns["c"]) == 100
+
+    @pytest.mark.asyncio
+    async def test_crypto_mock_history_is_reproducible(self):
+        service = CryptoService(AsyncMock())
+
+        first = await service.get_mock_historical_data("BTC", "7")
+        second = await service.get_mock_historical_data("BTC", "7")
+
+        assert first == second
+        assert len(first["prices"]) == 100
+        assert set(first["prices"][0]) == {"timestamp", "price"}
+        assert (await service.get_mock_historical_data("BTC", "0")) == {"prices": []}
+
+    def test_stock_mock_price_is_stable(self):
+        service = StocksService(AsyncMock())
+        price = service._get_mock_price("MSFT")
+
+        assert price == service._get_mock_price("MSFT")
+        assert 360 <= price <= 440
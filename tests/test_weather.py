@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from fastapi.testclient import TestClient
 from app.main import app
+from app.cache import decode_entry
 from app.services.weather_service import WeatherService
 import redis.asyncio as redis
 
@@ -13,7 +14,9 @@ def client():
 
 @pytest.fixture
 def mock_redis():
-    return AsyncMock(spec=redis.Redis)
+    mock = AsyncMock(spec=redis.Redis)
+    mock.hget.return_value = None  # cache namespaces at generation 0
+    return mock
 
 
 class TestWeatherEndpoint:
@@ -128,7 +131,8 @@ class TestWeatherService:
             await service.get_weather("San Francisco")
             # Check TTL is 300 seconds (5 minutes)
             args, kwargs = mock_redis.setex.call_args
-            assert args[1] == 300
+            assert decode_entry(args[2]).soft_ttl == 300
+            assert args[1] == 10800  # hard ttl keeps a stale copy
 
 
 class TestWeatherRedisIntegration:
@@ -191,7 +195,7 @@ class TestWeatherRedisIntegration:
 
                 # Verify cache key format
                 args, kwargs = mock_redis.setex.call_args
-                assert args[0] == "weather:San Francisco:metric"
+                assert args[0] == "weather:v0:San Francisco:metric"
 
 
 class TestWeatherDatabaseLogging: